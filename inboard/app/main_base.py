@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+import base64
 import os
+import secrets
 import sys
 from typing import TYPE_CHECKING
 
+from inboard.metrics import LatencyMiddleware, metrics_app
+
 if TYPE_CHECKING:
     from uvicorn._types import (
         ASGIReceiveCallable,
         ASGISendCallable,
         HTTPResponseBodyEvent,
         HTTPResponseStartEvent,
+        HTTPScope,
         Scope,
     )
 
@@ -25,18 +30,45 @@ def _compose_message() -> str:
     return f"Hello World, from {server} and Python {version}!"
 
 
-async def app(scope: Scope, _: ASGIReceiveCallable, send: ASGISendCallable) -> None:
-    """Define a simple ASGI 3 application.
+def _is_authenticated(scope: HTTPScope) -> bool:
+    """Check the HTTP Basic auth credentials of a request."""
+    basic_auth_username = os.getenv("BASIC_AUTH_USERNAME")
+    basic_auth_password = os.getenv("BASIC_AUTH_PASSWORD")
+    if not (basic_auth_username and basic_auth_password):
+        return False
+    credentials = f"{basic_auth_username}:{basic_auth_password}".encode()
+    expected = b"Basic " + base64.b64encode(credentials)
+    for name, value in scope["headers"]:
+        if name.lower() == b"authorization":
+            return secrets.compare_digest(value, expected)
+    return False
+
+
+async def asgi_app(
+    scope: Scope, receive: ASGIReceiveCallable, send: ASGISendCallable
+) -> None:
+    """Define a simple ASGI 3 application, with metrics at `/metrics`.
+
+    Metrics require HTTP Basic auth, like the protected endpoints of the FastAPI
+    and Starlette apps.
 
     https://asgi.readthedocs.io/en/stable/introduction.html
     https://asgi.readthedocs.io/en/stable/specs/main.html#applications
     """
     assert scope["type"] == "http"
-    message = _compose_message()
+    status, headers = 200, [(b"content-type", b"text/plain")]
+    if scope["path"] == "/metrics":
+        if _is_authenticated(scope):
+            return await metrics_app(scope, receive, send)
+        status = 401
+        headers.append((b"www-authenticate", b"Basic"))
+        message = "Incorrect username or password"
+    else:
+        message = _compose_message()
     start_event: HTTPResponseStartEvent = {
         "type": "http.response.start",
-        "status": 200,
-        "headers": [(b"content-type", b"text/plain")],
+        "status": status,
+        "headers": headers,
         "trailers": False,
     }
     body_event: HTTPResponseBodyEvent = {
@@ -46,3 +78,6 @@ async def app(scope: Scope, _: ASGIReceiveCallable, send: ASGISendCallable) -> N
     }
     await send(start_event)
     await send(body_event)
+
+
+app = LatencyMiddleware(asgi_app)
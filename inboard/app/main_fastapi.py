@@ -2,12 +2,13 @@ import os
 import sys
 from typing import Annotated
 
-from fastapi import Depends, FastAPI, status
+from fastapi import Depends, FastAPI, Response, status
 from fastapi.middleware import Middleware
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 from inboard.app.utilities_fastapi import basic_auth as fastapi_basic_auth
+from inboard.metrics import CONTENT_TYPE, REGISTRY, LatencyMiddleware
 
 BasicAuth = Annotated[str, Depends(fastapi_basic_auth)]
 origin_regex = r"^(https?:\/\/)(localhost|([\w\.]+\.)?br3ndon.land)(:[0-9]+)?$"
@@ -34,13 +35,14 @@ class GetUser(BaseModel):
 
 
 middleware = [
+    Middleware(LatencyMiddleware),
     Middleware(
         CORSMiddleware,
         allow_credentials=True,
         allow_headers=["*"],
         allow_methods=["*"],
         allow_origin_regex=origin_regex,
-    )
+    ),
 ]
 app = FastAPI(middleware=middleware, title="inboard")
 
@@ -55,6 +57,11 @@ async def get_health(_: BasicAuth) -> GetStatus:
     return GetStatus(application=app.title, status="active", message=None)
 
 
+@app.get("/metrics", include_in_schema=False, status_code=status.HTTP_200_OK)
+async def get_metrics(_: BasicAuth) -> Response:
+    return Response(REGISTRY.expose(), media_type=CONTENT_TYPE.decode())
+
+
 @app.get("/status", status_code=status.HTTP_200_OK)
 async def get_status(_: BasicAuth) -> GetStatus:
     return GetStatus(
@@ -8,10 +8,11 @@ from starlette.middleware import Middleware
 from starlette.middleware.authentication import AuthenticationMiddleware
 from starlette.middleware.cors import CORSMiddleware
 from starlette.requests import HTTPConnection, Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 from starlette.routing import Route
 
 from inboard.app.utilities_starlette import BasicAuth
+from inboard.metrics import CONTENT_TYPE, REGISTRY, LatencyMiddleware
 
 origin_regex = r"^(https?:\/\/)(localhost|([\w\.]+\.)?br3ndon.land)(:[0-9]+)?$"
 server = (
@@ -37,6 +38,11 @@ async def get_health(request: Request) -> JSONResponse:
     return JSONResponse({"application": "inboard", "status": "active"})
 
 
+@requires("authenticated")
+async def get_metrics(request: Request) -> Response:
+    return Response(REGISTRY.expose(), media_type=CONTENT_TYPE.decode())
+
+
 @requires("authenticated")
 async def get_status(request: Request) -> JSONResponse:
     message = f"Hello World, from {server}, Starlette, and Python {version}!"
@@ -51,6 +57,7 @@ async def get_current_user(request: Request) -> JSONResponse:
 
 
 middleware = [
+    Middleware(LatencyMiddleware),
     Middleware(
         AuthenticationMiddleware,
         backend=BasicAuth(),
@@ -67,6 +74,7 @@ middleware = [
 routes = [
     Route("/", endpoint=get_root),
     Route("/health", endpoint=get_health),
+    Route("/metrics", endpoint=get_metrics),
     Route("/status", endpoint=get_status),
     Route("/users/me", endpoint=get_current_user),
 ]
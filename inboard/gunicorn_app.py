@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import sys
+
+from gunicorn.app.wsgiapp import WSGIApplication
+
+
+class GunicornApplication(WSGIApplication):
+    """Run Gunicorn in the current process.
+
+    Gunicorn is configured with the arguments in `argv`, as if they were passed to
+    the `gunicorn` command, so configuration files, `GUNICORN_CMD_ARGS`, and the app
+    module are loaded the same way as when Gunicorn runs in a subprocess. The
+    logging configuration already applied in the current process is reused when the
+    Gunicorn configuration file loads it with `inboard.logging_conf.load_logging_conf`.
+    """
+
+    def __init__(self, argv: list[str]) -> None:
+        self.argv: list[str] = argv
+        super().__init__("%(prog)s [OPTIONS] [APP_MODULE]", prog=argv[0])
+
+    def load_config(self) -> None:
+        """Load configuration from `argv` instead of `sys.argv`."""
+        argv, sys.argv = sys.argv, self.argv
+        try:
+            super().load_config()
+        finally:
+            sys.argv = argv
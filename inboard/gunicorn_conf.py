@@ -1,24 +1,329 @@
 from __future__ import annotations
 
-import multiprocessing
+import gc
+import math
 import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+from itertools import zip_longest
+from pathlib import Path
+from typing import TYPE_CHECKING, cast
 
-from inboard.logging_conf import configure_logging
+from inboard.gunicorn_workers import UvicornWorker, WorkerHeartbeat, WorkerLoad
+from inboard.logging_conf import load_logging_conf
+from inboard.metrics import archive_metrics, clear_metrics
+from inboard.resources import (
+    CGROUP_PATH,
+    calculate_workers,
+    get_cpu_count,
+    get_memory_limit,
+    get_worker_memory,
+)
+
+if TYPE_CHECKING:
+    from gunicorn.arbiter import Arbiter
+    from gunicorn.workers.base import Worker
+
+NODE_PATH = Path("/sys/devices/system/node")
+
+
+def parse_cpu_list(cpu_list: str) -> set[int]:
+    """Parse a list of CPUs in the kernel's format, like `"0-3,8-11"`."""
+    cpus: set[int] = set()
+    for cpu_range in cpu_list.strip().split(","):
+        if cpu_range:
+            start, _, end = cpu_range.partition("-")
+            cpus.update(range(int(start), int(end or start) + 1))
+    return cpus
+
+
+def get_numa_nodes(node_path: Path = NODE_PATH) -> list[set[int]]:
+    """Get the CPUs in each NUMA node, from `/sys/devices/system/node`."""
+    nodes: list[set[int]] = []
+    for path in sorted(
+        node_path.glob("node[0-9]*/cpulist"), key=lambda path: int(path.parent.name[4:])
+    ):
+        try:
+            if cpus := parse_cpu_list(path.read_text()):
+                nodes.append(cpus)
+        except (OSError, ValueError):
+            continue
+    return nodes
+
+
+def get_cpu_affinity(
+    affinity: str | None = None,
+    cgroup_path: Path = CGROUP_PATH,
+    node_path: Path = NODE_PATH,
+) -> list[set[int]]:
+    """Get the sets of CPUs to pin workers to, by worker slot.
+
+    - `"cpu"`: pin each worker to one CPU. CPUs alternate between NUMA nodes,
+      so that workers are spread across nodes, and the number of CPUs is limited
+      to the CPU count used to calculate workers (see `get_cpu_count`).
+    - `"node"`: pin each worker to the CPUs of one NUMA node, alternating between
+      nodes.
+
+    Only CPUs the process is allowed to run on are used. Returns an empty list,
+    and workers are not pinned, if `affinity` is not set or if CPU affinity is not
+    supported on the platform.
+    """
+    if not affinity or not hasattr(os, "sched_setaffinity"):
+        return []
+    allowed = os.sched_getaffinity(0)
+    nodes = [cpus & allowed for cpus in get_numa_nodes(node_path) if cpus & allowed]
+    nodes = nodes or [allowed]
+    if affinity.lower() == "node":
+        return nodes
+    if affinity.lower() == "cpu":
+        cores, _ = get_cpu_count(cgroup_path)
+        cpus = (cpu for group in zip_longest(*map(sorted, nodes)) for cpu in group)
+        return [{cpu} for cpu in cpus if cpu is not None][:cores]
+    raise ValueError(f"Invalid CPU affinity: {affinity}")
+
+
+def supports_reuse_port() -> bool:
+    """Check if sockets can be bound with `SO_REUSEPORT`.
+
+    Python may define `socket.SO_REUSEPORT` even if the kernel doesn't support it,
+    so the option is set on a new socket to check.
+    """
+    if not hasattr(socket, "SO_REUSEPORT"):
+        return False
+    try:
+        with socket.socket() as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        return True
+    except OSError:
+        return False
+
+
+class WorkerAutoscaler:
+    """Scale the number of Gunicorn workers up and down with load.
+
+    The autoscaler runs in a thread in the Gunicorn arbiter. Every `load.interval`
+    seconds, it reads the load reported by workers (see `WorkerLoad`) and the
+    depth of the listen queue, and sends `SIGTTIN` or `SIGTTOU` to the arbiter
+    to add or remove a worker.
+
+    A worker is added when the in-flight requests per worker exceed the target,
+    when the event loop lag of any worker exceeds the maximum, or when connections
+    are waiting in the listen queue. A worker is removed when the in-flight requests
+    would be below half of the target with one fewer worker, and the lag is below
+    half of the maximum. The number of workers doesn't change between these
+    thresholds, and doesn't change again until `cooldown` seconds have passed.
+
+    The listen queue depth is only available for the arbiter's sockets. When workers
+    bind their own sockets with `REUSE_PORT`, the arbiter has no sockets, and the
+    backlog is always 0.
+    """
+
+    def __init__(
+        self,
+        min_workers: int,
+        max_workers: int,
+        load: WorkerLoad,
+        target_requests: float = 8,
+        max_lag: float = 0.1,
+        cooldown: float = 30,
+    ) -> None:
+        self.cooldown: float = cooldown
+        self.load: WorkerLoad = load
+        self.max_lag: float = max_lag
+        self.max_workers: int = max_workers
+        self.min_workers: int = min_workers
+        self.scaled_at: float = time.monotonic()
+        self.stopped: threading.Event = threading.Event()
+        self.target_requests: float = target_requests
+
+    def scale(self, workers: int, requests: int, lag: float, backlog: int) -> int:
+        """Get the change in the number of workers for the load: 1, 0 or -1."""
+        if time.monotonic() - self.scaled_at < self.cooldown:
+            return 0
+        if workers < self.min_workers:
+            return 1
+        if workers > self.max_workers:
+            return -1
+        if workers < self.max_workers and (
+            requests > self.target_requests * workers or lag > self.max_lag or backlog
+        ):
+            return 1
+        if (
+            workers > self.min_workers
+            and requests <= self.target_requests * (workers - 1) / 2
+            and lag <= self.max_lag / 2
+            and not backlog
+        ):
+            return -1
+        return 0
+
+    def check(self, server: Arbiter) -> int:
+        """Read the load, and signal the arbiter to add or remove a worker."""
+        workers: list[Worker] = list(server.WORKERS.values())
+        # Workers forked before Gunicorn reloaded the configuration use the old table
+        loads = [
+            worker.load.read(worker.load_slot)
+            for worker in workers
+            if isinstance(worker, UvicornWorker)
+            and worker.load is not None
+            and worker.load_slot is not None
+        ]
+        requests = sum(requests for requests, _ in loads)
+        lag = max((lag for _, lag in loads), default=0.0)
+        backlog = sum(max(listener.get_backlog(), 0) for listener in server.LISTENERS)
+        workers_count: int = server.num_workers
+        if change := self.scale(workers_count, requests, lag, backlog):
+            self.scaled_at = time.monotonic()
+            if server.log is not None:
+                server.log.info(
+                    f"Autoscaling to {workers_count + change} workers "
+                    + f"({requests} requests, {lag:.3f}s lag, {backlog} backlog)."
+                )
+            os.kill(server.pid, signal.SIGTTIN if change > 0 else signal.SIGTTOU)
+        return change
+
+    def run(self, server: Arbiter) -> None:
+        while not self.stopped.wait(self.load.interval):
+            _ = self.check(server)
+
+    def start(self, server: Arbiter) -> None:
+        """Start checking the load in a daemon thread in the arbiter.
+
+        The autoscaler is set as an attribute of the arbiter, which is kept when
+        Gunicorn reloads the configuration, so that it can be stopped on reload.
+        """
+        setattr(server, "autoscaler", self)
+        self.scaled_at = time.monotonic()
+        self.stopped.clear()
+        thread = threading.Thread(
+            target=self.run, args=(server,), name="autoscaler", daemon=True
+        )
+        thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
 
 
-def calculate_workers(
-    max_workers: str | None = None,
-    total_workers: str | None = None,
-    workers_per_core: str = "1",
-) -> int:
-    """Calculate the number of Gunicorn worker processes."""
-    cores = multiprocessing.cpu_count()
-    default = max(int(float(workers_per_core) * cores), 2)
-    use_max = m if max_workers and (m := int(max_workers)) > 0 else False
-    use_total = t if total_workers and (t := int(total_workers)) > 0 else False
-    use_least = min(use_max, use_total) if use_max and use_total else False
-    use_default = min(use_max, default) if use_max else default
-    return use_least or use_total or use_default
+def on_starting(server: Arbiter) -> None:
+    """Log the CPU count and memory used to calculate the number of workers,
+    and whether workers can bind their own sockets if `REUSE_PORT` is set.
+
+    Metrics from previous runs are also removed from `METRICS_DIR`, or a temporary
+    directory is created for metrics if `METRICS_DIR` is not set.
+    """
+    directory = metrics_dir or tempfile.mkdtemp(
+        prefix="inboard-metrics-", dir=worker_tmp_dir
+    )
+    os.environ["METRICS_DIR"] = directory
+    clear_metrics(directory)
+    if server.log is None:
+        return
+    if os.getenv("REUSE_PORT", "").lower() == "true" and not supports_reuse_port():
+        server.log.warning(
+            "SO_REUSEPORT is not supported. Workers will share the arbiter's socket."
+        )
+    cores, source = get_cpu_count()
+    server.log.info(f"Using {cores} CPUs from {source} to calculate workers.")
+    worker_memory = get_worker_memory(os.getenv("WORKER_MEMORY_MB"))
+    if worker_memory and (memory_limit := get_memory_limit()):
+        limit, source = memory_limit
+        server.log.info(
+            f"Using {limit // 2**20} MB of memory from {source} "
+            + f"and {worker_memory:.0f} MB per worker to calculate workers."
+        )
+
+
+def when_ready(server: Arbiter) -> None:
+    """Prepare the arbiter before it spawns workers.
+
+    If the app is preloaded, objects in the arbiter are frozen once, so that garbage
+    collection in workers doesn't write to them, and their memory stays shared
+    copy-on-write. Garbage collection is then enabled again in the arbiter, so that
+    objects it creates later, like the workers it replaces, can be collected.
+
+    The autoscaler is also started, if enabled.
+    """
+    if server.cfg.preload_app:  # pyright: ignore[reportAny]
+        gc.freeze()
+        gc.enable()
+    if autoscaler is not None:
+        autoscaler.start(server)
+
+
+def on_reload(server: Arbiter) -> None:
+    """Replace the autoscaler when Gunicorn reloads the configuration on `HUP`.
+
+    Gunicorn executes a configuration file again when it reloads, which creates a
+    new autoscaler and worker load table, but doesn't run `when_ready` again.
+    The autoscaler started before the reload is stopped, and the new autoscaler,
+    if enabled, is started. A configuration module is not executed again, so its
+    autoscaler keeps running.
+    """
+    previous = cast("WorkerAutoscaler | None", getattr(server, "autoscaler", None))
+    if previous is autoscaler:
+        return
+    if previous is not None:
+        previous.stop()
+    if autoscaler is not None:
+        autoscaler.start(server)
+
+
+def pre_fork(_server: Arbiter, worker: Worker) -> None:
+    """Prepare to fork a worker.
+
+    Each worker is assigned the lowest slot number not used by other workers, so
+    a worker that replaces another worker gets the same slot. The slot is used to
+    pin the worker to CPUs, and to report heartbeats and load to the arbiter in
+    shared memory instead of in a temporary file for each worker.
+    """
+    slots = set(worker_slots.values())
+    slot = next(slot for slot in range(len(slots) + 1) if slot not in slots)
+    worker_slots[worker.age] = slot
+    if slot < worker_load.slots:
+        # Workers don't time out before their first heartbeat, as with temporary files
+        worker_load.beat(slot, math.inf)
+        worker_load.write(slot)
+        worker.tmp.close()
+        worker.tmp = WorkerHeartbeat(worker_load, slot)
+        if isinstance(worker, UvicornWorker):
+            worker.load = worker_load
+            worker.load_slot = slot
+
+
+def post_fork(server: Arbiter, worker: Worker) -> None:
+    """Pin the worker to CPUs for its slot, if `WORKER_CPU_AFFINITY` is set."""
+    if cpu_affinity and (slot := worker_slots.get(worker.age)) is not None:
+        cpus = cpu_affinity[slot % len(cpu_affinity)]
+        os.sched_setaffinity(0, cpus)
+        if server.log is not None:
+            server.log.debug(f"Pinned worker in slot {slot} to CPUs {sorted(cpus)}.")
+
+
+def child_exit(_server: Arbiter, worker: Worker) -> None:
+    """Release the slot of a worker that has exited, and archive its metrics.
+
+    The slot is cleared in the table the worker was forked with, which is a previous
+    table if the worker was forked before Gunicorn reloaded the configuration.
+    """
+    _ = worker_slots.pop(worker.age, None)
+    if isinstance(worker.tmp, WorkerHeartbeat):
+        worker.tmp.load.write(worker.tmp.slot)
+    if directory := os.getenv("METRICS_DIR"):
+        archive_metrics(directory, worker.pid)
+
+
+def on_exit(_server: Arbiter) -> None:
+    """Stop the autoscaler, if enabled, when the arbiter exits, and remove the
+    temporary directory for metrics if it was created in `on_starting`.
+    """
+    if autoscaler is not None:
+        autoscaler.stop()
+    if metrics_dir is None and (directory := os.environ.pop("METRICS_DIR", None)):
+        shutil.rmtree(directory, ignore_errors=True)
 
 
 # Gunicorn settings
@@ -27,12 +332,59 @@ accesslog = os.getenv("ACCESS_LOG", "-")
 errorlog = os.getenv("ERROR_LOG", "-")
 graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "120"))
 keepalive = int(os.getenv("KEEP_ALIVE", "5"))
-logconfig_dict = configure_logging()
+logconfig_dict = load_logging_conf()
 loglevel = os.getenv("LOG_LEVEL", "info")
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER") or max_requests // 10)
+preload_app = bool((value := os.getenv("PRELOAD_APP")) and value.lower() == "true")
+reuse_port = bool(
+    (value := os.getenv("REUSE_PORT"))
+    and value.lower() == "true"
+    and supports_reuse_port()
+)
 timeout = int(os.getenv("TIMEOUT", "120"))
 worker_tmp_dir = "/dev/shm"
+metrics_dir = os.getenv("METRICS_DIR")
 workers = calculate_workers(
     os.getenv("MAX_WORKERS"),
     os.getenv("WEB_CONCURRENCY"),
     workers_per_core=os.getenv("WORKERS_PER_CORE", "1"),
+    worker_memory=os.getenv("WORKER_MEMORY_MB"),
+)
+
+# Worker slots and CPU affinity
+cpu_affinity = get_cpu_affinity(os.getenv("WORKER_CPU_AFFINITY"))
+worker_slots: dict[int, int] = {}
+
+# Avoid creating garbage that would be collected in the arbiter before objects are
+# frozen in `when_ready` (objects are already frozen if Gunicorn reloads the file)
+if preload_app and not gc.get_freeze_count():
+    gc.disable()
+
+# Autoscaling
+autoscale = bool((value := os.getenv("AUTOSCALE")) and value.lower() == "true")
+autoscale_min_workers = int(os.getenv("AUTOSCALE_MIN_WORKERS", "1"))
+autoscale_max_workers = int(os.getenv("AUTOSCALE_MAX_WORKERS") or workers)
+
+# Worker heartbeats and load in shared memory (workers are replaced before old
+# workers exit when Gunicorn reloads, so there are twice as many slots as workers)
+worker_load = WorkerLoad(
+    2 * max(workers, autoscale_max_workers if autoscale else 0),
+    interval=float(os.getenv("AUTOSCALE_INTERVAL", "1")),
+    directory=worker_tmp_dir,
+)
+
+autoscaler = (
+    WorkerAutoscaler(
+        autoscale_min_workers,
+        autoscale_max_workers,
+        worker_load,
+        target_requests=float(os.getenv("AUTOSCALE_TARGET_REQUESTS", "8")),
+        max_lag=float(os.getenv("AUTOSCALE_MAX_LAG", "0.1")),
+        cooldown=float(os.getenv("AUTOSCALE_COOLDOWN", "30")),
+    )
+    if autoscale
+    else None
 )
+if autoscaler is not None:
+    workers = min(max(workers, autoscale_min_workers), autoscale_max_workers)
@@ -29,16 +29,227 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
 import asyncio
+import bisect
+import io
 import logging
+import math
+import mmap
+import os
+import random
 import signal
+import struct
 import sys
-from typing import Any
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast
 
 from gunicorn.arbiter import Arbiter
 from gunicorn.workers.base import Worker
+from gunicorn.workers.workertmp import WorkerTmp
 from uvicorn.config import Config
 from uvicorn.server import Server
 
+from inboard.logging_conf import (
+    flush_log_batches,
+    flush_log_samples,
+    start_log_queues,
+    stop_log_queues,
+)
+from inboard.metrics import REGISTRY, estimate_quantile
+from inboard.uvicorn_conf import get_uvicorn_config_options
+
+if TYPE_CHECKING:
+    from inboard.types import DictConfig
+
+SMAPS_ROLLUP_PATH = Path("/proc/self/smaps_rollup")
+STATM_PATH = Path("/proc/self/statm")
+
+
+class WorkerLoad:
+    """Heartbeats and load reported by Gunicorn workers, in memory shared with the
+    arbiter.
+
+    The arbiter maps a temporary file in `directory` (`worker_tmp_dir`) into memory
+    before forking workers, and assigns each worker a slot. Workers write a heartbeat
+    to their slot when they notify the arbiter (see `WorkerHeartbeat`), and write
+    their number of in-flight requests and their event loop lag every `interval`
+    seconds. The arbiter reads all the slots from memory, without system calls.
+    """
+
+    # The heartbeat, in-flight requests and lag are each 8 bytes, and slots are a
+    # multiple of 8 bytes, so that each value is aligned and written in one store
+    HEARTBEAT: struct.Struct = struct.Struct("=d")
+    LOAD: struct.Struct = struct.Struct("=Qd")
+    SLOT_SIZE: int = HEARTBEAT.size + LOAD.size
+
+    def __init__(
+        self, slots: int, interval: float = 1.0, directory: str | None = None
+    ) -> None:
+        self.file: io.BufferedRandom = tempfile.TemporaryFile(
+            prefix="inboard-", dir=directory
+        )
+        _ = self.file.truncate(self.SLOT_SIZE * slots)
+        self.buffer: mmap.mmap = mmap.mmap(self.file.fileno(), self.SLOT_SIZE * slots)
+        self.interval: float = interval
+        self.slots: int = slots
+
+    def beat(self, slot: int, heartbeat: float | None = None) -> None:
+        """Write the heartbeat of a worker (the current time by default)."""
+        heartbeat = time.monotonic() if heartbeat is None else heartbeat
+        self.HEARTBEAT.pack_into(self.buffer, self.offset(slot), heartbeat)
+
+    def last_beat(self, slot: int) -> float:
+        """Read the time of the last heartbeat of a worker."""
+        (heartbeat,) = cast(
+            "tuple[float]", self.HEARTBEAT.unpack_from(self.buffer, self.offset(slot))
+        )
+        return heartbeat
+
+    def read(self, slot: int) -> tuple[int, float]:
+        """Read the in-flight requests and event loop lag of a worker."""
+        return cast(
+            "tuple[int, float]",
+            self.LOAD.unpack_from(self.buffer, self.offset(slot) + self.HEARTBEAT.size),
+        )
+
+    def write(self, slot: int, requests: int = 0, lag: float = 0.0) -> None:
+        """Write the in-flight requests and event loop lag of a worker."""
+        offset = self.offset(slot) + self.HEARTBEAT.size
+        self.LOAD.pack_into(self.buffer, offset, requests, lag)
+
+    def offset(self, slot: int) -> int:
+        return slot * self.SLOT_SIZE
+
+
+class WorkerHeartbeat(WorkerTmp):  # type: ignore[misc]
+    """A replacement for Gunicorn's `WorkerTmp` that uses a slot in `WorkerLoad`.
+
+    Gunicorn creates a temporary file for each worker. The worker changes the
+    modification time of the file when it notifies the arbiter, and the arbiter
+    checks the modification time of each file with `fstat` to find workers that
+    have timed out. The heartbeat is written to and read from shared memory instead.
+    """
+
+    # `WorkerTmp.__init__` creates the temporary file that the heartbeat replaces
+    def __init__(self, load: WorkerLoad, slot: int) -> None:  # pyright: ignore[reportMissingSuperCall]
+        self.load: WorkerLoad = load
+        self.slot: int = slot
+
+    def notify(self) -> None:
+        self.load.beat(self.slot)
+
+    def last_update(self) -> float:
+        return self.load.last_beat(self.slot)
+
+    def fileno(self) -> int:
+        return self.load.file.fileno()
+
+    def close(self) -> None:
+        """Leave the shared memory open for other workers.
+
+        The arbiter closes the temporary files of other workers after fork.
+        """
+
+
+class LoopLag:
+    """A rolling histogram of event loop lag, in seconds.
+
+    Lag is counted in fixed buckets, by the upper bound of each bucket, over the
+    last `window` measurements. Quantiles are estimated from the upper bounds.
+    """
+
+    BUCKETS: tuple[float, ...] = (
+        0.001,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        math.inf,
+    )
+
+    def __init__(self, window: int = 60) -> None:
+        self.counts: list[int] = [0] * len(self.BUCKETS)
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, lag: float) -> None:
+        """Count a lag measurement, and drop the oldest one outside the window."""
+        if len(self.samples) == self.samples.maxlen:
+            self.counts[self.bucket(self.samples[0])] -= 1
+        self.samples.append(lag)
+        self.counts[self.bucket(lag)] += 1
+
+    def bucket(self, lag: float) -> int:
+        return bisect.bisect_left(self.BUCKETS, lag)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile of the lag, as the upper bound of its bucket."""
+        return estimate_quantile(self.BUCKETS, self.counts, q)
+
+    def format_quantile(self, q: float) -> str:
+        """Format a quantile of the lag in seconds, like `0.05s`, or like `>5s` if it
+        is in the overflow bucket.
+        """
+        if math.isinf(lag := self.quantile(q)):
+            return f">{self.BUCKETS[-2]:g}s"
+        return f"{lag:g}s"
+
+
+LOOP_LAG = REGISTRY.histogram(
+    "inboard_worker_loop_lag_seconds",
+    "Event loop lag measured by Uvicorn workers, in seconds.",
+    buckets=LoopLag.BUCKETS,
+)
+
+
+def get_private_memory(
+    smaps_rollup_path: Path = SMAPS_ROLLUP_PATH, statm_path: Path = STATM_PATH
+) -> int | None:
+    """Get the private resident memory of the current process, in bytes.
+
+    Pages shared with other processes are not counted, so copy-on-write pages
+    inherited from a Gunicorn arbiter that preloaded the app don't count towards
+    the memory of each worker until the worker writes to them. The memory is the
+    sum of `Private_Clean` and `Private_Dirty` in `/proc/self/smaps_rollup`. On
+    kernels without `smaps_rollup` (before Linux 4.14), it is the resident set size
+    minus the shared file-backed pages in `/proc/self/statm`, which still counts
+    copy-on-write pages. Only available on Linux.
+    """
+    try:
+        private_kb = 0
+        for line in smaps_rollup_path.read_bytes().splitlines():
+            if line.startswith((b"Private_Clean:", b"Private_Dirty:")):
+                private_kb += int(line.split()[1])
+        return private_kb * 1024
+    except (IndexError, OSError, ValueError):
+        pass
+    try:
+        _, resident, shared, *_ = statm_path.read_bytes().split()
+        return (int(resident) - int(shared)) * mmap.PAGESIZE
+    except (OSError, ValueError):
+        return None
+
+
+def get_max_rss() -> float | None:
+    """Get the private memory at which a worker restarts, in bytes, with jitter.
+
+    The limit is set in MB with `WORKER_MAX_RSS_MB`, and is lowered by a random
+    amount up to `WORKER_MAX_RSS_JITTER_MB` (10% of the limit by default) for each
+    worker, so that workers don't all restart at the same time.
+    """
+    if not (value := os.getenv("WORKER_MAX_RSS_MB")):
+        return None
+    max_rss = float(value)
+    jitter = float(os.getenv("WORKER_MAX_RSS_JITTER_MB") or max_rss / 10)
+    return (max_rss - random.uniform(0, jitter)) * 2**20
+
 
 class UvicornWorker(Worker):  # type: ignore[misc]
     """
@@ -47,18 +258,57 @@ class UvicornWorker(Worker):  # type: ignore[misc]
     """
 
     CONFIG_KWARGS: dict[str, Any] = {"loop": "auto", "http": "auto"}
+    # Uvicorn options that are set by Gunicorn, or only apply to Uvicorn alone
+    GUNICORN_OPTIONS: frozenset[str] = frozenset(
+        (
+            "app",
+            "app_dir",
+            "env_file",
+            "factory",
+            "fd",
+            "host",
+            "limit_max_requests",
+            "log_config",
+            "log_level",
+            "port",
+            "reload",
+            "reload_delay",
+            "reload_dirs",
+            "reload_excludes",
+            "reload_includes",
+            "uds",
+            "workers",
+        )
+    )
+    MONITOR_INTERVAL: float = 1.0
+    lag_warning: float = 0.5
+    load: WorkerLoad | None = None
+    load_slot: int | None = None
+    loop_lag: LoopLag
+    max_rss: float | None = None
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
+        self.lag_warning = float(os.getenv("WORKER_LAG_WARNING", "0.5"))
+        self.loop_lag = LoopLag()
+        self.max_rss = get_max_rss()
+
+        # Use levels set on Uvicorn loggers by the logging config (`LOG_LEVELS`)
+        logconfig_dict: DictConfig | None = getattr(self.cfg, "logconfig_dict")  # pyright: ignore[reportAny]
+        loggers = logconfig_dict.get("loggers", {}) if logconfig_dict else {}
 
         logger = logging.getLogger("uvicorn.error")
         logger.handlers = self.log.error_log.handlers
-        logger.setLevel(self.log.error_log.level)
+        logger.setLevel(
+            loggers.get("uvicorn.error", {}).get("level", self.log.error_log.level)
+        )
         logger.propagate = False
 
         logger = logging.getLogger("uvicorn.access")
         logger.handlers = self.log.access_log.handlers
-        logger.setLevel(self.log.access_log.level)
+        logger.setLevel(
+            loggers.get("uvicorn.access", {}).get("level", self.log.access_log.level)
+        )
         logger.propagate = False
 
         config_kwargs: dict[str, Any] = {
@@ -87,11 +337,24 @@ class UvicornWorker(Worker):  # type: ignore[misc]
             config_kwargs["backlog"] = self.cfg.settings["backlog"].value
 
         config_kwargs.update(self.CONFIG_KWARGS)
+        # Options in `UVICORN_CONFIG_OPTIONS` take precedence, as with Uvicorn alone
+        uvicorn_options = get_uvicorn_config_options()
+        if "limit_max_requests" in uvicorn_options:
+            self.log.warning(
+                "Ignoring limit_max_requests in UVICORN_CONFIG_OPTIONS. Set "
+                + "MAX_REQUESTS and MAX_REQUESTS_JITTER to restart Gunicorn workers."
+            )
+        config_kwargs.update(
+            (name, value)
+            for name, value in uvicorn_options.items()
+            if name not in self.GUNICORN_OPTIONS
+        )
 
         self.config: Config = Config(**config_kwargs)
 
     def init_process(self) -> None:
         self.config.setup_event_loop()
+        start_log_queues()
         super().init_process()
 
     def init_signals(self) -> None:
@@ -115,16 +378,74 @@ class UvicornWorker(Worker):  # type: ignore[misc]
         loop = asyncio.get_running_loop()
         loop.add_signal_handler(signal.SIGQUIT, self.handle_exit, signal.SIGQUIT, None)
 
+    async def _monitor(self, server: Server) -> None:
+        """Monitor the worker while it serves requests.
+
+        Every `interval` seconds, the worker measures event loop lag, which is the
+        time the event loop takes to wake up after the interval, beyond the interval
+        itself. Lag increases when sync code blocks the event loop. Lag is counted in
+        `loop_lag`, sent to StatsD as the `inboard.worker.loop_lag` histogram if
+        Gunicorn is configured to use StatsD, recorded in the
+        `inboard_worker_loop_lag_seconds` metric (see `inboard.metrics`), and
+        logged as a warning if it exceeds `lag_warning`.
+
+        The worker also reports in-flight requests and lag to the arbiter (see
+        `WorkerLoad`), and exits gracefully if its private memory exceeds `max_rss`.
+        """
+        interval = self.load.interval if self.load else self.MONITOR_INTERVAL
+        loop = asyncio.get_running_loop()
+        while not server.should_exit:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(loop.time() - start - interval, 0.0)
+            self.loop_lag.observe(lag)
+            LOOP_LAG.observe(lag)
+            self.log.debug(
+                f"Event loop lag: {lag * 1000:.1f} ms",
+                extra={
+                    "metric": "inboard.worker.loop_lag",
+                    "value": lag * 1000,
+                    "mtype": "histogram",
+                },
+            )
+            if self.lag_warning and lag > self.lag_warning:
+                self.log.warning(
+                    f"Event loop blocked for {lag:.3f}s, exceeding "
+                    + f"{self.lag_warning:.3f}s. Check for sync code in async "
+                    + f"functions (p50 {self.loop_lag.format_quantile(0.5)}, "
+                    + f"p99 {self.loop_lag.format_quantile(0.99)} over the last "
+                    + f"{len(self.loop_lag.samples)} checks)."
+                )
+            if self.load is not None and self.load_slot is not None:
+                self.load.write(self.load_slot, len(server.server_state.tasks), lag)
+            if (
+                self.max_rss
+                and (memory := get_private_memory())
+                and memory > self.max_rss
+            ):
+                self.log.info(
+                    f"Worker private memory {memory / 2**20:.0f} MB exceeds "
+                    + f"{self.max_rss / 2**20:.0f} MB. Restarting worker."
+                )
+                server.should_exit = True
+
     async def _serve(self) -> None:
         self.config.app = self.wsgi
         server = Server(config=self.config)
         self._install_sigquit_handler()
+        monitor = asyncio.create_task(self._monitor(server))
         await server.serve(sockets=self.sockets)
+        _ = monitor.cancel()
         if not server.started:
             sys.exit(Arbiter.WORKER_BOOT_ERROR)
 
     def run(self) -> None:
-        return asyncio.run(self._serve())
+        try:
+            return asyncio.run(self._serve())
+        finally:
+            flush_log_samples()
+            stop_log_queues()
+            flush_log_batches()
 
     async def callback_notify(self) -> None:
         self.notify()
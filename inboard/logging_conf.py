@@ -1,19 +1,44 @@
 from __future__ import annotations
 
+import atexit
+import base64
+import contextlib
 import importlib.util
+import json.encoder
 import logging
 import logging.config
+import logging.handlers
 import os
+import pickle
+import queue
+import re
 import sys
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict, deque
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal, NamedTuple, TextIO, cast
 
 if TYPE_CHECKING:
-    from inboard.types import DictConfig
+    from collections.abc import Sequence
+
+    from inboard.types import AccessLogFilters, DictConfig
+
+UVICORN_ACCESS_LOG_FORMAT = '%s - "%s %s HTTP/%s" %d'
+
+
+_logging_conf_cache: dict[tuple[str, int], DictConfig] = {}
 
 
 def find_and_load_logging_conf(logging_conf: str) -> DictConfig:
-    """Find and load a logging configuration module or file."""
+    """Find and load a logging configuration module or file.
+
+    Loaded configurations are cached, keyed on the path to the module or file
+    and its modification time, so the module or file is only run again if it has
+    been modified since it was last loaded.
+    """
     logging_conf_path = Path(logging_conf)
     spec = (
         importlib.util.spec_from_file_location("confspec", logging_conf_path)
@@ -22,6 +47,13 @@ def find_and_load_logging_conf(logging_conf: str) -> DictConfig:
     )
     if not spec:
         raise ImportError(f"Unable to import {logging_conf_path}")
+    cache_key = (
+        (str(origin.resolve()), origin.stat().st_mtime_ns)
+        if spec.origin and (origin := Path(spec.origin)).is_file()
+        else None
+    )
+    if cache_key and (cached := _logging_conf_cache.get(cache_key)) is not None:
+        return cached
     logging_conf_module = importlib.util.module_from_spec(spec)
     exec_module = getattr(spec.loader, "exec_module")  # pyright: ignore[reportAny]
     exec_module(logging_conf_module)
@@ -30,23 +62,61 @@ def find_and_load_logging_conf(logging_conf: str) -> DictConfig:
     logging_conf_dict = getattr(logging_conf_module, "LOGGING_CONFIG")  # pyright: ignore[reportAny]
     if not isinstance(logging_conf_dict, dict):
         raise TypeError("LOGGING_CONFIG is not a dictionary instance")
+    if cache_key:
+        _logging_conf_cache[cache_key] = logging_conf_dict  # pyright: ignore[reportArgumentType]
     return logging_conf_dict  # pyright: ignore[reportReturnType, reportUnknownVariableType]
 
 
+def dump_logging_conf(logging_conf_dict: DictConfig) -> str | None:
+    """Serialize a logging configuration dictionary to a string.
+
+    The string can be passed to child processes in the `LOGGING_CONF_SNAPSHOT`
+    environment variable, so they don't need to load the configuration again.
+    Returns None if the dictionary can't be serialized, such as when it includes
+    classes defined in a logging configuration file.
+    """
+    try:
+        return base64.b64encode(pickle.dumps(logging_conf_dict)).decode()
+    except (AttributeError, pickle.PicklingError, TypeError):
+        return None
+
+
+def load_logging_conf(logging_conf: str | None = None) -> DictConfig:
+    """Load a logging configuration dictionary without applying it.
+
+    If a logging module or file is not provided, the dictionary is loaded from
+    a snapshot in the `LOGGING_CONF_SNAPSHOT` environment variable if one was
+    passed from a parent process, or otherwise from `LOGGING_CONF`. The snapshot
+    is removed from the environment when it is loaded, so that later loads (like
+    when Gunicorn runs a configuration file again on `HUP`) pick up changes to
+    `LOGGING_CONF`, and child processes don't inherit the snapshot.
+    """
+    snapshot = None if logging_conf else os.environ.pop("LOGGING_CONF_SNAPSHOT", None)
+    if snapshot:
+        try:
+            logging_conf_dict: DictConfig = pickle.loads(base64.b64decode(snapshot))  # pyright: ignore[reportAny]
+            return logging_conf_dict
+        except (
+            AttributeError,
+            EOFError,
+            ImportError,
+            pickle.UnpicklingError,
+            ValueError,
+        ):
+            pass
+    logging_conf = logging_conf or os.getenv("LOGGING_CONF")
+    return find_and_load_logging_conf(logging_conf) if logging_conf else LOGGING_CONFIG
+
+
 def configure_logging(
     logger: logging.Logger | None = None,
     logging_conf: str | None = None,
 ) -> DictConfig:
     """Configure Python logging given the name of a logging module or file."""
     logger = logger or logging.getLogger()
-    logging_conf = logging_conf or os.getenv("LOGGING_CONF")
     try:
-        if not logging_conf:
-            logging_conf_path = __name__
-            logging_conf_dict: DictConfig = LOGGING_CONFIG
-        else:
-            logging_conf_path = logging_conf
-            logging_conf_dict = find_and_load_logging_conf(logging_conf_path)
+        logging_conf_path = logging_conf or os.getenv("LOGGING_CONF") or __name__
+        logging_conf_dict = load_logging_conf(logging_conf)
         logging.config.dictConfig(dict(logging_conf_dict))
         logger.debug(f"Logging dict config loaded from {logging_conf_path}.")
         return logging_conf_dict
@@ -55,6 +125,41 @@ def configure_logging(
         raise
 
 
+class AccessLogFields(NamedTuple):
+    """Structured fields from a Uvicorn or Gunicorn access log record."""
+
+    client: str
+    method: str
+    path: str
+    http_version: str
+    status: int
+
+
+def get_access_log_fields(record: logging.LogRecord) -> AccessLogFields | None:
+    """Get structured fields from an access log record without formatting it.
+
+    Uvicorn access log records have a known message template and a tuple of
+    arguments. Gunicorn access log records have a mapping of "atoms" as arguments.
+    Returns `None` if the record is not an access log record.
+    """
+    args = record.args
+    if (
+        record.msg == UVICORN_ACCESS_LOG_FORMAT
+        and type(args) is tuple
+        and len(args) == 5
+    ):
+        return AccessLogFields._make(args)
+    if record.name == "gunicorn.access" and isinstance(args, dict) and "U" in args:
+        return AccessLogFields(
+            str(args["h"]),
+            str(args["m"]),
+            str(args["U"]),
+            str(args["H"]).removeprefix("HTTP/"),
+            int(str(args["s"])),
+        )
+    return None
+
+
 class LogFilter(logging.Filter):
     """Subclass of `logging.Filter` used to filter log messages.
     ---
@@ -67,30 +172,85 @@ class LogFilter(logging.Filter):
     comma-separated string, like `LOG_FILTERS="/health, /heartbeat"`. To then
     add the filters to a class instance, the `LogFilter.set_filters()`
     method can produce the set of filters from the environment variable value.
+
+    The filters are compiled into a single regular expression alternation when the
+    class is instantiated, so each log message is searched with one call to the
+    regular expression engine, instead of one substring search per filter. The
+    engine still tries each filter, so filtering gets slower as filters are added,
+    but more slowly than with a substring search per filter.
+
+    Access log records can also be filtered on their structured fields (path, path
+    prefix, status class, and method) with the `LOG_ACCESS_FILTERS` environment
+    variable, like `LOG_ACCESS_FILTERS="path=/health, prefix=/metrics, status=3xx"`.
+    Access filters are checked before the log message is formatted, so access log
+    records that are filtered out never have their message strings built.
     """
 
-    __slots__: tuple[str, str, str] = "name", "nlen", "filters"
+    __slots__: tuple[str, ...] = "name", "nlen", "filters", "pattern", "access_filters"
 
     def __init__(
         self,
         name: str = "",
         filters: set[str] | None = None,
+        access_filters: AccessLogFilters | None = None,
     ) -> None:
         """Initialize a filter."""
         super().__init__(name=name)
         self.name: str
         self.nlen: int
         self.filters: set[str] | None = filters
+        self.pattern: re.Pattern[str] | None = self.compile_filters(filters)
+        self.access_filters: AccessLogFilters | None = access_filters
 
     def filter(self, record: logging.LogRecord) -> bool:
         """Determine if the specified record is to be logged.
 
         Returns True if the record should be logged, or False otherwise.
         """
-        if self.filters is None:
+        if self.access_filters is not None:
+            args = record.args
+            if (
+                record.msg == UVICORN_ACCESS_LOG_FORMAT
+                and type(args) is tuple
+                and len(args) == 5
+            ):
+                _, method, path, _, status = cast(
+                    "tuple[str, str, str, str, int]", args
+                )
+                if self.match_access_log(method, path, status):
+                    return False
+            elif (fields := get_access_log_fields(record)) is not None:
+                if self.match_access_log(fields.method, fields.path, fields.status):
+                    return False
+        if self.pattern is None:
             return True
-        message = record.getMessage()
-        return all(match not in message for match in self.filters)
+        return self.pattern.search(record.getMessage()) is None
+
+    def match_access_log(self, method: str, path: str, status: int) -> bool:
+        """Determine if the fields of an access log record match any access filters."""
+        access_filters = self.access_filters
+        if access_filters is None:
+            return False
+        if "?" in path:
+            path = path.partition("?")[0]
+        return (
+            path in access_filters["paths"]
+            or path.startswith(access_filters["path_prefixes"])
+            or status // 100 in access_filters["status_classes"]
+            or method in access_filters["methods"]
+        )
+
+    @staticmethod
+    def compile_filters(filters: set[str] | None) -> re.Pattern[str] | None:
+        """Compile log message filters into a single regular expression.
+
+        Filters are escaped, so they are matched as plain substrings. Filters are
+        sorted, so that the pattern doesn't depend on the iteration order of the set.
+        """
+        if not filters:
+            return None
+        escaped = (re.escape(match) for match in sorted(filters))
+        return re.compile("|".join(escaped))
 
     @staticmethod
     def set_filters(input_filters: str | None = None) -> set[str] | None:
@@ -111,7 +271,710 @@ class LogFilter(logging.Filter):
             else None
         )
 
+    @staticmethod
+    def set_access_filters(
+        input_filters: str | None = None,
+    ) -> AccessLogFilters | None:
+        """Set access log filters.
+
+        Access filters identify access log records to filter out based on the
+        structured fields of the record. The argument to this method should be
+        supplied as a comma-separated string of `field=value` rules, where the
+        field is one of `path` (exact path, ignoring query strings), `prefix`
+        (path prefix), `status` (status class, like `2xx`), or `method`. If any
+        rule matches an access log record, the logger will not log the record.
+        """
+        if not (access_filters := input_filters or os.getenv("LOG_ACCESS_FILTERS")):
+            return None
+        paths: set[str] = set()
+        path_prefixes: set[str] = set()
+        status_classes: set[int] = set()
+        methods: set[str] = set()
+        for rule in str(access_filters).split(sep=","):
+            field, _, value = (item.strip() for item in rule.partition("="))
+            if field == "path" and value:
+                paths.add(value)
+            elif field == "prefix" and value:
+                path_prefixes.add(value)
+            elif field == "status" and re.fullmatch(r"[1-5]xx", value.lower()):
+                status_classes.add(int(value[0]))
+            elif field == "method" and value:
+                methods.add(value.upper())
+            else:
+                raise ValueError(f"Invalid access log filter: {rule.strip()!r}")
+        return {
+            "paths": frozenset(paths),
+            "path_prefixes": tuple(path_prefixes),
+            "status_classes": frozenset(status_classes),
+            "methods": frozenset(methods),
+        }
+
+
+class LogSampleFilter(logging.Filter):
+    """Subclass of `logging.Filter` used to sample access log records.
+    ---
+
+    Sample rates are set per response status class, so that a fraction of access log
+    records with a status class are logged, and the rest are dropped. Status classes
+    without a sample rate are always logged, as are records other than access log
+    records. The environment variable `LOG_SAMPLE_RATES` can be used to specify sample
+    rates as a comma-separated string, like `LOG_SAMPLE_RATES="2xx=0.01, 3xx=0.1"`.
+
+    Sampling is deterministic. If a record has a request ID, either as a
+    `request_id` attribute (added with `extra={"request_id": ...}` or a filter)
+    or as an `X-Request-ID` header in a Gunicorn access log record, the record is
+    kept or dropped based on a CRC32 hash of the request ID, so each request ID is
+    kept or dropped in every process. Otherwise, records are kept at even intervals.
+
+    Records dropped in each status class are counted, and a summary is logged to the
+    access logger at most once per `interval` seconds, so that the total number
+    of records can still be reconstructed. The summary is logged at `INFO`, or at
+    the level of the access logger if it is higher, so it is not dropped by the
+    logger level. Counts that have not been summarized yet are logged by
+    `flush_log_samples`, when a Gunicorn worker or the Python process exits.
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        rates: dict[int, float] | None = None,
+        interval: float = 60,
+    ) -> None:
+        """Initialize a filter."""
+        super().__init__(name=name)
+        self.counts: dict[int, int] = {}
+        self.dropped: dict[int, int] = {}
+        self.interval: float = interval
+        self.logger_name: str = "uvicorn.access"
+        self.next_summary: float = 0
+        self.rates: dict[int, float] | None = rates
+        _log_sample_filters.add(self)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Determine if the specified record is to be logged.
+
+        Returns True if the record should be logged, or False otherwise.
+        """
+        if not self.rates or (fields := get_access_log_fields(record)) is None:
+            return True
+        if record.created >= self.next_summary:
+            self.summarize(record)
+        status_class = fields.status // 100
+        if (rate := self.rates.get(status_class)) is None:
+            keep = True
+        elif (request_id := self.get_request_id(record)) is not None:
+            keep = zlib.crc32(request_id.encode()) < rate * 0x100000000
+        else:
+            count = self.counts.get(status_class, 0)
+            self.counts[status_class] = count + 1
+            keep = int((count + 1) * rate) > int(count * rate)
+        if not keep:
+            self.dropped[status_class] = self.dropped.get(status_class, 0) + 1
+            self.logger_name = record.name
+        return keep
+
+    def summarize(self, record: logging.LogRecord) -> None:
+        """Log a summary of the records dropped since the previous summary."""
+        self.next_summary = record.created + self.interval
+        self.flush()
+
+    def flush(self) -> None:
+        """Log a summary of the records dropped since the previous summary, if any."""
+        if not (dropped := self.dropped):
+            return
+        self.dropped = {}
+        counts = ", ".join(f"{key}xx={dropped[key]}" for key in sorted(dropped))
+        logger = logging.getLogger(self.logger_name)
+        logger.log(
+            max(logging.INFO, logger.getEffectiveLevel()),
+            "Access log sampling dropped %d records (%s).",
+            sum(dropped.values()),
+            counts,
+        )
+
+    @staticmethod
+    def get_request_id(record: logging.LogRecord) -> str | None:
+        """Get the request ID from a log record, if present."""
+        if (request_id := getattr(record, "request_id", None)) is not None:
+            return str(request_id)  # pyright: ignore[reportAny]
+        if isinstance(args := record.args, dict):
+            request_id = args.get("{x-request-id}i")
+            return None if request_id is None else str(request_id)
+        return None
+
+    @staticmethod
+    def set_sample_rates(input_rates: str | None = None) -> dict[int, float] | None:
+        """Set access log sample rates.
+
+        The argument to this method should be supplied as a comma-separated string
+        of `status_class=rate` pairs, where the status class is formatted like `2xx`,
+        and the rate is a number from 0 (drop all records) to 1 (log all records).
+        """
+        if not (sample_rates := input_rates or os.getenv("LOG_SAMPLE_RATES")):
+            return None
+        rates: dict[int, float] = {}
+        for sample_rate in str(sample_rates).split(sep=","):
+            status_class, _, rate = (
+                item.strip() for item in sample_rate.partition("=")
+            )
+            try:
+                if not re.fullmatch(r"[1-5]xx", status_class.lower()):
+                    raise ValueError(f"Invalid status class {status_class!r}")
+                if not 0 <= (value := float(rate)) <= 1:
+                    raise ValueError(f"Sample rate {rate} is not between 0 and 1")
+            except ValueError as e:
+                raise ValueError(f"Invalid log sample rate {sample_rate!r}: {e}") from e
+            rates[int(status_class[0])] = value
+        return rates
+
+
+_log_sample_filters: weakref.WeakSet[LogSampleFilter] = weakref.WeakSet()
+
+
+def flush_log_samples() -> None:
+    """Log summaries of dropped records for all log sample filters in the current
+    process.
+    """
+    for sample_filter in list(_log_sample_filters):
+        sample_filter.flush()
+
 
+_ = atexit.register(flush_log_samples)
+
+
+class JsonFormatter(logging.Formatter):
+    """Subclass of `logging.Formatter` used to format log records as JSON.
+    ---
+
+    Each log record is formatted as one line of JSON with a fixed key layout:
+    `time`, `level`, `logger`, `process`, and `message`. Uvicorn and Gunicorn access
+    log records also include `client`, `method`, `path`, `http_version`, and `status`
+    from the structured fields of the record, and records with exceptions include
+    `exc_info`. Select this formatter with `LOG_FORMAT="json"`.
+
+    The line is built from a template, and only string values are encoded with the
+    C string encoder from the standard library `json` module, so a dictionary does
+    not need to be built and serialized for each record. The timestamp is formatted
+    once per second and reused for other records logged within the same second.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a formatter."""
+        super().__init__()
+        self.second: int = -1
+        self.time_prefix: str = ""
+        self.time_zone: str = ""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format the specified record as a line of JSON."""
+        encode = json.encoder.encode_basestring
+        if (second := int(record.created)) != self.second:
+            time_struct = self.converter(second)
+            self.second = second
+            self.time_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time_struct)
+            self.time_zone = time.strftime("%z", time_struct)
+        line = (
+            f'{{"time":"{self.time_prefix}.{int(record.msecs):03d}{self.time_zone}",'
+            f'"level":{encode(record.levelname)},"logger":{encode(record.name)},'
+            f'"process":{"null" if record.process is None else record.process},'
+            f'"message":{encode(record.getMessage())}'
+        )
+        if (fields := get_access_log_fields(record)) is not None:
+            line += (
+                f',"client":{encode(fields.client)},"method":{encode(fields.method)},'
+                f'"path":{encode(fields.path)},'
+                f'"http_version":{encode(fields.http_version)},'
+                f'"status":{fields.status}'
+            )
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line += f',"exc_info":{encode(record.exc_text)}'
+        if record.stack_info:
+            line += f',"stack_info":{encode(self.formatStack(record.stack_info))}'
+        return line + "}"
+
+
+def get_handlers(handlers: Sequence[logging.Handler | str]) -> list[logging.Handler]:
+    """Get handler instances from handler instances or names of configured handlers.
+
+    Handlers configured by `logging.config.dictConfig` are registered by name.
+    """
+    named: dict[str, logging.Handler] = getattr(logging, "_handlers")  # pyright: ignore[reportAny]
+    return [
+        handler if isinstance(handler, logging.Handler) else named[handler]
+        for handler in handlers
+    ]
+
+
+class _LogDedupEntry:
+    __slots__: tuple[str, ...] = (
+        "created",
+        "expires",
+        "last_seen",
+        "levelno",
+        "message",
+        "name",
+        "suppressed",
+    )
+
+    def __init__(self, record: logging.LogRecord, expires: float) -> None:
+        self.created: float = record.created
+        self.expires: float = expires
+        self.last_seen: float = record.created
+        self.levelno: int = record.levelno
+        try:
+            self.message: str = record.getMessage()
+        except Exception:  # the target handlers report formatting errors
+            self.message = str(record.msg)
+        self.name: str = record.name
+        self.suppressed: int = 0
+
+
+class LogDedupFilter(logging.Filter):
+    """Subclass of `logging.Filter` used to suppress duplicate log messages.
+    ---
+
+    Records at or above `min_level` are identified by a fingerprint of the logger name,
+    the message template (before formatting with arguments), and the exception type.
+    The first record with a fingerprint is logged, and further records with the same
+    fingerprint are suppressed until `window` seconds have passed. When the window
+    ends, a summary record like "Message repeated 999 times in 9.8 seconds: ..."
+    is added to `summaries`, for `LogDedupHandler` to pass to its target handlers.
+    The summary includes the first message, and the time from the first message
+    to the last suppressed message.
+
+    Fingerprints are kept in a cache of at most `maxsize` items, ordered by when they
+    were first seen, which is also when their windows end. Every record, at any
+    level, removes expired fingerprints from the front of the cache, so summaries
+    are added soon after their windows end. When the cache is full, the oldest
+    fingerprint is removed and summarized.
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        window: float = 10,
+        maxsize: int = 1024,
+        min_level: int | str = logging.WARNING,
+    ) -> None:
+        """Initialize a filter."""
+        super().__init__(name=name)
+        self.entries: OrderedDict[tuple[str, str, object], _LogDedupEntry] = (
+            OrderedDict()
+        )
+        self.min_level: int = (
+            logging.getLevelNamesMapping()[min_level.upper()]
+            if isinstance(min_level, str)
+            else min_level
+        )
+        self.maxsize: int = maxsize
+        self.summaries: deque[logging.LogRecord] = deque(maxlen=maxsize)
+        self.window: float = window
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Determine if the specified record is to be logged.
+
+        Returns True if the record should be logged, or False otherwise.
+        """
+        self.expire(record.created)
+        if record.levelno < self.min_level or getattr(record, "dedup_summary", False):
+            return True
+        exc_type = record.exc_info[0] if record.exc_info else None
+        fingerprint = (record.name, str(record.msg), exc_type)
+        if (entry := self.entries.get(fingerprint)) is not None:
+            entry.last_seen = record.created
+            entry.suppressed += 1
+            return False
+        self.entries[fingerprint] = _LogDedupEntry(record, record.created + self.window)
+        if len(self.entries) > self.maxsize:
+            self.summarize(self.entries.popitem(last=False)[1])
+        return True
+
+    def expire(self, now: float) -> None:
+        """Remove fingerprints with windows that have ended, and add summaries."""
+        entries = self.entries
+        while entries and next(iter(entries.values())).expires <= now:
+            self.summarize(entries.popitem(last=False)[1])
+
+    def summarize(self, entry: _LogDedupEntry) -> None:
+        """Add a summary record if any records with a fingerprint were suppressed."""
+        if not entry.suppressed:
+            return
+        summary = logging.LogRecord(
+            entry.name,
+            entry.levelno,
+            __file__,
+            0,
+            "Message repeated %d times in %.1f seconds: %s",
+            (entry.suppressed, entry.last_seen - entry.created, entry.message),
+            None,
+        )
+        summary.dedup_summary = True
+        self.summaries.append(summary)
+
+
+class LogDedupHandler(logging.Handler):
+    """Subclass of `logging.Handler` used to suppress duplicate log messages.
+    ---
+
+    This handler wraps target handlers with a `LogDedupFilter`. Records that are
+    not suppressed are passed to the target handlers, along with any summaries of
+    suppressed records. Summaries are passed on as records are handled, even if the
+    record itself is suppressed, and any remaining summaries are passed on when the
+    handler is flushed or closed.
+
+    Like `LogQueueHandler`, the target handlers can be handler instances, or names
+    of handlers configured by `logging.config.dictConfig`.
+    """
+
+    def __init__(
+        self,
+        handlers: Sequence[logging.Handler | str],
+        window: float = 10,
+        maxsize: int = 1024,
+        min_level: int | str = logging.WARNING,
+    ) -> None:
+        """Initialize a handler."""
+        super().__init__()
+        self.dedup: LogDedupFilter = LogDedupFilter(
+            window=window, maxsize=maxsize, min_level=min_level
+        )
+        self.targets: Sequence[logging.Handler | str] = handlers
+        self.target_handlers: list[logging.Handler] | None = None
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        """Filter the record, then pass it and any summaries to the target handlers."""
+        self.acquire()
+        try:
+            result = bool(self.filter(record)) and self.dedup.filter(record)
+            self.emit_summaries()
+            if result:
+                self.emit(record)
+        finally:
+            self.release()
+        return result
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Pass a record to the target handlers."""
+        if self.target_handlers is None:
+            self.target_handlers = get_handlers(self.targets)
+        for handler in self.target_handlers:
+            if record.levelno >= handler.level:
+                _ = handler.handle(record)
+
+    def emit_summaries(self) -> None:
+        """Pass summaries of suppressed records to the target handlers."""
+        summaries = self.dedup.summaries
+        while summaries:
+            self.emit(summaries.popleft())
+
+    def flush(self) -> None:
+        """Pass summaries of all suppressed records to the target handlers."""
+        self.acquire()
+        try:
+            self.dedup.expire(float("inf"))
+            self.emit_summaries()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        """Flush summaries and close the handler."""
+        self.flush()
+        super().close()
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """Subclass of `logging.handlers.QueueHandler` used to log off the event loop.
+    ---
+
+    Log records are put on a bounded queue, and a `logging.handlers.QueueListener`
+    running in a background thread passes them to the target handlers. Writes to
+    the log stream therefore do not block the thread that emitted the record.
+
+    The target handlers can be handler instances, or names of handlers configured
+    by `logging.config.dictConfig`. Handler names are resolved when the listener
+    starts, so the target handlers can be configured after this handler.
+
+    The listener starts when the first record is emitted, or when `start()` is called.
+    Threads do not survive `os.fork()`, so the queue is reset in child processes,
+    and the listener is started again in the child process. When the queue is full,
+    the `overflow` policy determines whether to `"block"` until there is space
+    in the queue, or to `"drop"` the record. The number of dropped records
+    is logged when there is space in the queue again.
+    """
+
+    def __init__(
+        self,
+        handlers: Sequence[logging.Handler | str],
+        maxsize: int = 10000,
+        overflow: Literal["block", "drop"] = "block",
+    ) -> None:
+        """Initialize a queue handler."""
+        if overflow not in {"block", "drop"}:
+            raise ValueError("Log queue overflow policy must be block or drop")
+        self.log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize)
+        super().__init__(self.log_queue)
+        self.dropped: int = 0
+        self.listener: logging.handlers.QueueListener | None = None
+        self.maxsize: int = maxsize
+        self.overflow: Literal["block", "drop"] = overflow
+        self.targets: Sequence[logging.Handler | str] = handlers
+        _log_queue_handlers.add(self)
+
+    def start(self) -> None:
+        """Start the queue listener, if it has not already been started."""
+        if self.listener is not None:
+            return
+        self.listener = logging.handlers.QueueListener(
+            self.queue, *get_handlers(self.targets), respect_handler_level=True
+        )
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Stop the queue listener after it has handled all queued records."""
+        if (listener := self.listener) is not None:
+            self.listener = None
+            listener.stop()
+
+    def reset(self) -> None:
+        """Reset the queue and the listener in a child process after a fork."""
+        self.dropped = 0
+        self.listener = None
+        self.log_queue = queue.Queue(self.maxsize)
+        self.queue = self.log_queue  # pyright: ignore[reportUnannotatedClassAttribute]
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Prepare a record for queuing.
+
+        The queue is only used within the process, so the record does not need to be
+        formatted and stripped of its arguments before it is queued. Formatting
+        happens in the listener thread, after filtering on the emitting thread.
+        """
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Enqueue a record, applying the overflow policy if the queue is full."""
+        if self.listener is None:
+            self.start()
+        log_queue = self.log_queue
+        if self.overflow == "block":
+            log_queue.put(record)
+            return
+        try:
+            log_queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped:
+            message = "Dropped %d log records because the log queue was full."
+            dropped_record = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0, message, (self.dropped,), None
+            )
+            try:
+                log_queue.put_nowait(dropped_record)
+                self.dropped = 0
+            except queue.Full:
+                pass
+
+    def close(self) -> None:
+        """Stop the queue listener and close the handler."""
+        self.stop()
+        super().close()
+
+
+_log_queue_handlers: weakref.WeakSet[LogQueueHandler] = weakref.WeakSet()
+
+
+def start_log_queues() -> None:
+    """Start listeners for all log queue handlers in the current process."""
+    for handler in list(_log_queue_handlers):
+        handler.start()
+
+
+def stop_log_queues() -> None:
+    """Stop listeners for all log queue handlers, flushing any queued records."""
+    for handler in list(_log_queue_handlers):
+        handler.stop()
+
+
+def _reset_log_queues() -> None:
+    for handler in list(_log_queue_handlers):
+        handler.reset()
+
+
+class LogBatchHandler(logging.Handler):
+    """Subclass of `logging.Handler` used to write log records to a stream in batches.
+    ---
+
+    `logging.StreamHandler` writes each record to its stream separately, which
+    means one `write` system call per record. This handler formats and encodes
+    records into a buffer, and writes the buffer to the stream's file descriptor
+    in one `os.writev` call when it reaches `maxsize` bytes, when the oldest
+    buffered record is `maxage` seconds old, or immediately when a record at or
+    above `flush_level` is emitted, so that warnings and errors are not delayed.
+
+    A daemon thread flushes the buffer when records are buffered but no further
+    records are emitted. The buffer is flushed before `os.fork()`, so records are
+    not duplicated in child processes, and the thread is started again in the child
+    process. Streams without file descriptors (or platforms without `os.writev`)
+    are written to with one `write` call per batch instead.
+    """
+
+    terminator: str = "\n"
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        maxsize: int = 65536,
+        maxage: float = 0.5,
+        flush_level: int | str = logging.WARNING,
+    ) -> None:
+        """Initialize a batch handler."""
+        super().__init__()
+        self.buffer: list[bytes] = []
+        self.buffer_size: int = 0
+        self.buffer_time: float = 0
+        self.closed: threading.Event = threading.Event()
+        self.flusher: threading.Thread | None = None
+        self.flush_level: int = (
+            logging.getLevelNamesMapping()[flush_level.upper()]
+            if isinstance(flush_level, str)
+            else flush_level
+        )
+        self.maxage: float = maxage
+        self.maxsize: int = maxsize
+        self.stream: TextIO = stream or sys.stdout
+        try:
+            fileno = self.stream.fileno() if hasattr(os, "writev") else None
+        except (AttributeError, OSError, ValueError):
+            fileno = None
+        self.fileno: int | None = fileno
+        _log_batch_handlers.add(self)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Add a formatted record to the buffer, and flush the buffer if needed."""
+        try:
+            data = (self.format(record) + self.terminator).encode(errors="replace")
+            if not self.buffer:
+                self.buffer_time = record.created
+            self.buffer.append(data)
+            self.buffer_size += len(data)
+            if (
+                record.levelno >= self.flush_level
+                or self.buffer_size >= self.maxsize
+                or record.created - self.buffer_time >= self.maxage
+            ):
+                self.flush()
+            elif self.flusher is None:
+                self.start()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def start(self) -> None:
+        """Start the thread that flushes the buffer after `maxage` seconds."""
+        self.flusher = threading.Thread(
+            target=self._flush_periodically, name="LogBatchHandler", daemon=True
+        )
+        self.flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while not self.closed.wait(self.maxage):
+            with contextlib.suppress(OSError, ValueError):
+                self.flush()
+
+    def flush(self) -> None:
+        """Write the buffer to the stream."""
+        self.acquire()
+        try:
+            if not self.buffer:
+                return
+            buffer, self.buffer, self.buffer_size = self.buffer, [], 0
+            self.write(buffer)
+        finally:
+            self.release()
+
+    def write(self, buffer: list[bytes]) -> None:
+        """Write buffered records to the stream with as few system calls as possible."""
+        self.stream.flush()
+        if self.fileno is None:
+            _ = self.stream.write(b"".join(buffer).decode())
+            self.stream.flush()
+            return
+        while buffer:
+            batch = buffer[:_IOV_MAX]
+            written = os.writev(self.fileno, batch)
+            for i, data in enumerate(batch):
+                if written < len(data):
+                    buffer = [data[written:], *buffer[i + 1 :]]
+                    break
+                written -= len(data)
+            else:
+                buffer = buffer[len(batch) :]
+
+    def reset(self) -> None:
+        """Reset the buffer and the flusher thread in a child process after a fork."""
+        self.buffer, self.buffer_size = [], 0
+        self.flusher = None
+        if not self.closed.is_set():
+            self.closed = threading.Event()
+
+    def close(self) -> None:
+        """Flush the buffer, stop the flusher thread, and close the handler."""
+        self.closed.set()
+        _log_batch_handlers.discard(self)
+        try:
+            self.flush()
+        finally:
+            super().close()
+
+
+_IOV_MAX = min(os.sysconf("SC_IOV_MAX"), 1024) if hasattr(os, "sysconf") else 1024
+_log_batch_handlers: weakref.WeakSet[LogBatchHandler] = weakref.WeakSet()
+
+
+def flush_log_batches() -> None:
+    """Write buffered records for all log batch handlers in the current process."""
+    for handler in list(_log_batch_handlers):
+        with contextlib.suppress(OSError, ValueError):
+            handler.flush()
+
+
+def _reset_log_batches() -> None:
+    for handler in list(_log_batch_handlers):
+        handler.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_log_queues)
+    os.register_at_fork(before=flush_log_batches, after_in_child=_reset_log_batches)
+
+
+def set_log_levels(input_levels: str | None = None) -> dict[str, str]:
+    """Set log levels for individual loggers.
+
+    The argument to this function should be supplied as a comma-separated string
+    of `logger=level` items, like `uvicorn.access=warning,fastapi=debug`.
+    The levels are set on the loggers themselves, rather than on the handlers,
+    so that records below a logger's level are not created at all.
+    """
+    if not (log_levels := input_levels or os.getenv("LOG_LEVELS")):
+        return {}
+    level_names = logging.getLevelNamesMapping()
+    levels: dict[str, str] = {}
+    for item in str(log_levels).split(sep=","):
+        name, _, level = (part.strip() for part in item.partition("="))
+        if not name or level.upper() not in level_names:
+            raise ValueError(f"Invalid log level: {item.strip()!r}")
+        levels[name] = level.upper()
+    return levels
+
+
+LOG_BATCH = bool((value := os.getenv("LOG_BATCH")) and value.lower() == "true")
+LOG_BATCH_AGE = float(os.getenv("LOG_BATCH_AGE", "0.5"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "65536"))
 LOG_COLORS = (
     True
     if (value := os.getenv("LOG_COLORS")) and value.lower() == "true"
@@ -119,15 +982,40 @@ LOG_COLORS = (
     if value and value.lower() == "false"
     else sys.stdout.isatty()
 )
+LOG_ACCESS_FILTERS = LogFilter.set_access_filters()
 LOG_FILTERS = LogFilter.set_filters()
 LOG_FORMAT = str(os.getenv("LOG_FORMAT", "simple"))
 LOG_LEVEL = str(os.getenv("LOG_LEVEL", "info")).upper()
+LOG_LEVELS = set_log_levels()
+LOG_HANDLER_LEVEL = min(
+    (LOG_LEVEL, *LOG_LEVELS.values()), key=logging.getLevelNamesMapping().__getitem__
+)
+LOG_SAMPLE_INTERVAL = float(os.getenv("LOG_SAMPLE_INTERVAL", "60"))
+LOG_SAMPLE_RATES = LogSampleFilter.set_sample_rates()
+LOG_QUEUE = bool((value := os.getenv("LOG_QUEUE")) and value.lower() == "true")
+LOG_QUEUE_OVERFLOW = str(os.getenv("LOG_QUEUE_OVERFLOW", "block")).lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_DEDUP_LEVEL = str(os.getenv("LOG_DEDUP_LEVEL", "warning")).upper()
+LOG_DEDUP_MAXSIZE = int(os.getenv("LOG_DEDUP_MAXSIZE", "1024"))
+LOG_DEDUP_WINDOW = float(os.getenv("LOG_DEDUP_WINDOW", "0"))
+LOG_DEDUP_HANDLERS = ["queue"] if LOG_QUEUE else ["default"]
+LOG_HANDLERS = ["dedup"] if LOG_DEDUP_WINDOW else LOG_DEDUP_HANDLERS
+LOG_HANDLER_FILTERS = ["filter_log_message", "sample_access_log"]
 LOGGING_CONFIG: DictConfig = {
     "version": 1,
     "disable_existing_loggers": False,
     "incremental": False,
     "filters": {
-        "filter_log_message": {"()": LogFilter, "filters": LOG_FILTERS},
+        "filter_log_message": {
+            "()": LogFilter,
+            "access_filters": LOG_ACCESS_FILTERS,
+            "filters": LOG_FILTERS,
+        },
+        "sample_access_log": {
+            "()": LogSampleFilter,
+            "interval": LOG_SAMPLE_INTERVAL,
+            "rates": LOG_SAMPLE_RATES,
+        },
     },
     "formatters": {
         "simple": {
@@ -152,20 +1040,59 @@ LOGGING_CONFIG: DictConfig = {
             "format": "%(levelprefix)s %(message)s",
             "use_colors": LOG_COLORS,
         },
+        "json": {"()": JsonFormatter},
     },
     "handlers": {
+        **(
+            {
+                "dedup": {
+                    "()": LogDedupHandler,
+                    "filters": LOG_HANDLER_FILTERS,
+                    "handlers": LOG_DEDUP_HANDLERS,
+                    "level": LOG_HANDLER_LEVEL,
+                    "maxsize": LOG_DEDUP_MAXSIZE,
+                    "min_level": LOG_DEDUP_LEVEL,
+                    "window": LOG_DEDUP_WINDOW,
+                }
+            }
+            if LOG_DEDUP_WINDOW
+            else {}
+        ),
         "default": {
-            "class": "logging.StreamHandler",
-            "filters": ["filter_log_message"],
+            **(
+                {
+                    "()": LogBatchHandler,
+                    "maxage": LOG_BATCH_AGE,
+                    "maxsize": LOG_BATCH_SIZE,
+                }
+                if LOG_BATCH
+                else {"class": "logging.StreamHandler"}
+            ),
+            "filters": LOG_HANDLER_FILTERS if LOG_HANDLERS == ["default"] else [],
             "formatter": LOG_FORMAT,
-            "level": LOG_LEVEL,
+            "level": LOG_HANDLER_LEVEL,
             "stream": "ext://sys.stdout",
-        }
+        },
+        **(
+            {
+                "queue": {
+                    "()": LogQueueHandler,
+                    "filters": LOG_HANDLER_FILTERS if LOG_HANDLERS == ["queue"] else [],
+                    "handlers": ["default"],
+                    "level": LOG_HANDLER_LEVEL,
+                    "maxsize": LOG_QUEUE_SIZE,
+                    "overflow": LOG_QUEUE_OVERFLOW,
+                }
+            }
+            if LOG_QUEUE
+            else {}
+        ),
     },
-    "root": {"handlers": ["default"], "level": LOG_LEVEL},
+    "root": {"handlers": LOG_HANDLERS, "level": LOG_LEVEL},
     "loggers": {
+        **{name: {"propagate": True} for name in LOG_LEVELS},
         "fastapi": {"propagate": True},
-        "gunicorn.access": {"handlers": ["default"], "propagate": True},
+        "gunicorn.access": {"handlers": LOG_HANDLERS, "propagate": True},
         "gunicorn.error": {"propagate": True},
         "uvicorn": {"propagate": True},
         "uvicorn.access": {"propagate": True},
@@ -173,3 +1100,5 @@ LOGGING_CONFIG: DictConfig = {
         "uvicorn.error": {"propagate": True},
     },
 }
+for logger_name, logger_level in LOG_LEVELS.items():
+    LOGGING_CONFIG["loggers"][logger_name]["level"] = logger_level
@@ -0,0 +1,566 @@
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar, cast
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping, Sequence
+
+    from uvicorn._types import (
+        ASGI3Application,
+        ASGIReceiveCallable,
+        ASGISendCallable,
+        ASGISendEvent,
+        HTTPResponseBodyEvent,
+        HTTPResponseStartEvent,
+        Scope,
+    )
+
+ARCHIVE_FILE = "archive.metrics"
+CONTENT_TYPE = b"text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LATENCY_BUCKETS = (
+    *(2.0**exponent * (1 + i / 4) for exponent in range(-10, 6) for i in range(4)),
+    math.inf,
+)
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+
+class MetricFile:
+    """Values of metrics recorded by one process, in a memory-mapped file.
+
+    The file starts with the number of bytes used, followed by entries with the
+    length of a key, the key, padding to 8 bytes, and a float value. Entries are only
+    appended, and the number of bytes used is written after each entry, so other
+    processes can read the file while it's written. If `path` is not set, the file is
+    a temporary file that is only used by the current process.
+    """
+
+    HEADER: struct.Struct = struct.Struct("=Q")
+    LENGTH: struct.Struct = struct.Struct("=I")
+    VALUE: struct.Struct = struct.Struct("=d")
+
+    def __init__(self, path: Path | None = None, size: int = 2**16) -> None:
+        if path:
+            self.fd: int = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        else:
+            self.fd, name = tempfile.mkstemp(prefix="inboard-", suffix=".metrics")
+            os.unlink(name)
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.buffer: mmap.mmap = mmap.mmap(self.fd, os.fstat(self.fd).st_size)
+        self.lock: threading.Lock = threading.Lock()
+        self.path: Path | None = path
+        self.pid: int = os.getpid()
+        if not self.used:
+            self.HEADER.pack_into(self.buffer, 0, self.HEADER.size)
+        self.offsets: dict[str, int] = {
+            key: offset for key, offset, _ in self.entries(self.buffer)
+        }
+
+    @property
+    def used(self) -> int:
+        (used,) = cast("tuple[int]", self.HEADER.unpack_from(self.buffer, 0))
+        return used
+
+    @classmethod
+    def entries(cls, buffer: bytes | mmap.mmap) -> Iterator[tuple[str, int, float]]:
+        """Read the key, offset of the value, and value of each entry."""
+        if len(buffer) < cls.HEADER.size:
+            return
+        (used,) = cast("tuple[int]", cls.HEADER.unpack_from(buffer, 0))
+        position = cls.HEADER.size
+        while position < min(used, len(buffer)):
+            (length,) = cast("tuple[int]", cls.LENGTH.unpack_from(buffer, position))
+            start = position + cls.LENGTH.size
+            key = bytes(buffer[start : start + length]).decode()
+            offset = cls.padded(cls.LENGTH.size + length) + position
+            (value,) = cast("tuple[float]", cls.VALUE.unpack_from(buffer, offset))
+            yield key, offset, value
+            position = offset + cls.VALUE.size
+
+    @classmethod
+    def read(cls, path: Path) -> dict[str, float]:
+        """Read the values in a file written by another process."""
+        values: dict[str, float] = {}
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return values
+        for key, _, value in cls.entries(data):
+            values[key] = values.get(key, 0.0) + value
+        return values
+
+    @staticmethod
+    def padded(size: int) -> int:
+        return (size + 7) & ~7
+
+    def add(self, key: str, amount: float) -> None:
+        """Add an amount to the value of a key."""
+        with self.lock:
+            if (offset := self.offsets.get(key)) is None:
+                offset = self.append(key)
+            (value,) = cast("tuple[float]", self.VALUE.unpack_from(self.buffer, offset))
+            self.VALUE.pack_into(self.buffer, offset, value + amount)
+
+    def append(self, key: str) -> int:
+        """Append an entry for a key, and return the offset of its value."""
+        encoded = key.encode()
+        used = self.used
+        offset = used + self.padded(self.LENGTH.size + len(encoded))
+        if (end := offset + self.VALUE.size) > len(self.buffer):
+            size = max(2 * len(self.buffer), self.padded(end))
+            os.ftruncate(self.fd, size)
+            self.buffer.close()
+            self.buffer = mmap.mmap(self.fd, size)
+        self.LENGTH.pack_into(self.buffer, used, len(encoded))
+        start = used + self.LENGTH.size
+        self.buffer[start : start + len(encoded)] = encoded
+        self.VALUE.pack_into(self.buffer, offset, 0.0)
+        self.HEADER.pack_into(self.buffer, 0, end)
+        self.offsets[key] = offset
+        return offset
+
+    def values(self) -> dict[str, float]:
+        """Read the values in this file."""
+        return {key: value for key, _, value in self.entries(self.buffer)}
+
+    def close(self) -> None:
+        self.buffer.close()
+        os.close(self.fd)
+
+
+def estimate_quantile(
+    buckets: Sequence[float], counts: Sequence[int], q: float
+) -> float:
+    """Estimate a quantile from counts in buckets, as the upper bound of its bucket.
+
+    Returns 0 if there are no counts.
+    """
+    rank = max(math.ceil(q * sum(counts)), 1)
+    total = 0
+    for bound, count in zip(buckets, counts):
+        total += count
+        if total >= rank:
+            return bound
+    return 0.0
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def format_labels(labels: Sequence[Sequence[str]]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\""))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metric:
+    """A metric with samples recorded in the `MetricFile` of each process.
+
+    Samples are stored with keys that are JSON arrays of the sample name and its
+    labels, so samples with the same key can be added up across processes. Keys are
+    cached for each set of label values.
+    """
+
+    TYPE: ClassVar[str]
+
+    def __init__(
+        self,
+        registry: Registry,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        self.documentation: str = documentation
+        self.labelnames: tuple[str, ...] = tuple(labelnames)
+        self.name: str = name
+        self.registry: Registry = registry
+
+    @property
+    def sample_names(self) -> tuple[str, ...]:
+        return (self.name,)
+
+    def labels(self, labelvalues: Sequence[str]) -> list[list[str]]:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"Incorrect label values for {self.name}: {labelvalues}")
+        return [[name, str(value)] for name, value in zip(self.labelnames, labelvalues)]
+
+    def expose(self, samples: list[tuple[str, list[list[str]], float]]) -> list[str]:
+        return [
+            f"{name}{format_labels(labels)} {format_value(value)}"
+            for name, labels, value in sorted(samples)
+        ]
+
+
+class Counter(Metric):
+    """A counter that adds up across processes."""
+
+    TYPE: ClassVar[str] = "counter"
+
+    def __init__(
+        self,
+        registry: Registry,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(registry, name, documentation, labelnames)
+        self.keys: dict[tuple[str, ...], str] = {}
+
+    def inc(self, amount: float = 1.0, labelvalues: Sequence[str] = ()) -> None:
+        if (key := self.keys.get(tuple(labelvalues))) is None:
+            key = json.dumps([self.name, self.labels(labelvalues)])
+            self.keys[tuple(labelvalues)] = key
+        self.registry.file().add(key, amount)
+
+
+class Histogram(Metric):
+    """A histogram with fixed buckets that adds up across processes.
+
+    Each process counts observations in the bucket they fall into, and counts are
+    added up into cumulative buckets when metrics are exposed.
+    """
+
+    TYPE: ClassVar[str] = "histogram"
+
+    def __init__(
+        self,
+        registry: Registry,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        if "le" in labelnames:
+            raise ValueError("Histograms can't have an le label")
+        super().__init__(registry, name, documentation, labelnames)
+        bounds = sorted(float(bound) for bound in buckets)
+        self.buckets: tuple[float, ...] = tuple(
+            bounds if bounds and math.isinf(bounds[-1]) else [*bounds, math.inf]
+        )
+        self.keys: dict[tuple[str, ...], tuple[str, ...]] = {}
+
+    @property
+    def sample_names(self) -> tuple[str, ...]:
+        return (f"{self.name}_bucket", f"{self.name}_count", f"{self.name}_sum")
+
+    def observe(self, value: float, labelvalues: Sequence[str] = ()) -> None:
+        if (keys := self.keys.get(tuple(labelvalues))) is None:
+            labels = self.labels(labelvalues)
+            keys = (
+                *(
+                    json.dumps([f"{self.name}_bucket", [*labels, ["le", le]]])
+                    for le in map(format_value, self.buckets)
+                ),
+                json.dumps([f"{self.name}_count", labels]),
+                json.dumps([f"{self.name}_sum", labels]),
+            )
+            self.keys[tuple(labelvalues)] = keys
+        file = self.registry.file()
+        file.add(keys[bisect.bisect_left(self.buckets, value)], 1.0)
+        file.add(keys[-2], 1.0)
+        file.add(keys[-1], value)
+
+    def expose(self, samples: list[tuple[str, list[list[str]], float]]) -> list[str]:
+        """Add up the counts of each bucket into cumulative buckets for each set
+        of labels.
+        """
+        groups: dict[str, tuple[list[list[str]], dict[str, float]]] = {}
+        for name, labels, value in samples:
+            others = [label for label in labels if label[0] != "le"]
+            values = groups.setdefault(json.dumps(others), (others, {}))[1]
+            key = next((le for label, le in labels if label == "le"), name)
+            values[key] = values.get(key, 0.0) + value
+        lines: list[str] = []
+        for _, (labels, values) in sorted(groups.items()):
+            cumulative = 0.0
+            for le in map(format_value, self.buckets):
+                cumulative += values.get(le, 0.0)
+                bucket_labels = format_labels([*labels, ["le", le]])
+                lines.append(
+                    f"{self.name}_bucket{bucket_labels} {format_value(cumulative)}"
+                )
+            for name in (f"{self.name}_count", f"{self.name}_sum"):
+                value = format_value(values.get(name, 0.0))
+                lines.append(f"{name}{format_labels(labels)} {value}")
+        return lines
+
+
+class Registry:
+    """Metrics recorded by all processes.
+
+    Each process records metrics in its own `MetricFile` in `directory` (or the
+    directory in `METRICS_DIR`), named with the process ID, and samples are added up
+    across files when metrics are collected. The directory is read when a process
+    first records metrics, so that Gunicorn can set it after the app is preloaded and
+    before workers are forked. If there is no directory, metrics are only recorded in
+    memory for the current process.
+    """
+
+    def __init__(self, directory: str | None = None) -> None:
+        self.directory: str | None = directory
+        self.lock: threading.Lock = threading.Lock()
+        self.metrics: dict[str, Metric] = {}
+        self.metric_file: MetricFile | None = None
+
+    def get_directory(self) -> str | None:
+        return self.directory or os.getenv("METRICS_DIR") or None
+
+    def file(self) -> MetricFile:
+        """Get the file for the current process, opening a new file after fork."""
+        if (metric_file := self.metric_file) is None or metric_file.pid != os.getpid():
+            with self.lock:
+                metric_file = self.metric_file
+                if metric_file is None or metric_file.pid != os.getpid():
+                    directory = self.get_directory()
+                    path = (
+                        Path(directory, f"{os.getpid()}.metrics") if directory else None
+                    )
+                    self.metric_file = metric_file = MetricFile(path)
+        return metric_file
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self.metrics[metric.name] = metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        self.register(counter := Counter(self, name, documentation, labelnames))
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        histogram = Histogram(self, name, documentation, labelnames, buckets)
+        self.register(histogram)
+        return histogram
+
+    def collect(self) -> dict[str, float]:
+        """Add up the values of samples across the files of all processes."""
+        if not (directory := self.get_directory()):
+            return self.file().values() if self.metric_file else {}
+        values: dict[str, float] = {}
+        for path in sorted(Path(directory).glob("*.metrics")):
+            for key, value in MetricFile.read(path).items():
+                values[key] = values.get(key, 0.0) + value
+        return values
+
+    def expose(self) -> str:
+        """Expose metrics in the Prometheus text format."""
+        metrics = {
+            sample_name: metric
+            for metric in self.metrics.values()
+            for sample_name in metric.sample_names
+        }
+        samples: dict[str, list[tuple[str, list[list[str]], float]]] = {}
+        for key, value in self.collect().items():
+            sample_name, labels = cast("tuple[str, list[list[str]]]", json.loads(key))
+            if metric := metrics.get(sample_name):
+                samples.setdefault(metric.name, []).append((sample_name, labels, value))
+        lines: list[str] = []
+        for name, metric in sorted(self.metrics.items()):
+            documentation = metric.documentation.replace("\\", r"\\")
+            documentation = documentation.replace("\n", r"\n")
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric.TYPE}")
+            lines.extend(metric.expose(samples.get(name, [])))
+        return "\n".join(lines) + "\n"
+
+
+class MetricsApp:
+    """An ASGI app that responds with metrics from all processes.
+
+    Metrics are exposed in the Prometheus text format, so that scraping any worker
+    returns metrics from all workers.
+    """
+
+    def __init__(self, registry: Registry | None = None) -> None:
+        self.registry: Registry = registry or REGISTRY
+
+    async def __call__(
+        self, scope: Scope, _: ASGIReceiveCallable, send: ASGISendCallable
+    ) -> None:
+        assert scope["type"] == "http"
+        body = self.registry.expose().encode()
+        start_event: HTTPResponseStartEvent = {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", CONTENT_TYPE),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "trailers": False,
+        }
+        body_event: HTTPResponseBodyEvent = {
+            "type": "http.response.body",
+            "body": body,
+            "more_body": False,
+        }
+        await send(start_event)
+        await send(body_event)
+
+
+class _LatencySend:
+    """Send wrapper that records the latency of one request."""
+
+    __slots__: tuple[str, ...] = "middleware", "scope", "send", "start", "status"
+
+    def __init__(
+        self, middleware: LatencyMiddleware, scope: Scope, send: ASGISendCallable
+    ) -> None:
+        self.middleware: LatencyMiddleware = middleware
+        self.scope: Scope = scope
+        self.send: ASGISendCallable = send
+        self.start: int = time.perf_counter_ns()
+        self.status: int = 0
+
+    async def __call__(self, message: ASGISendEvent) -> None:
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        await self.send(message)
+        if message["type"] == "http.response.body" and not message.get(
+            "more_body", False
+        ):
+            duration_ns = time.perf_counter_ns() - self.start
+            self.middleware.record(self.scope, self.status, duration_ns)
+            self.start = 0
+
+
+class LatencyMiddleware:
+    """ASGI middleware that records the latency of HTTP requests.
+
+    Latency is measured from when the app is called until the final response body
+    is sent, and recorded in `histogram` by route template and status class.
+    Buckets are log-linear, like an HDR histogram, with four buckets for each power
+    of two, so that the relative error is at most 25% from about 1 ms to 1 minute.
+    Requests that don't match a route, including all requests to apps without
+    routes, are recorded with an empty route.
+
+    Each process also keeps its own counts, and logs a summary of the median and
+    99th percentile latency for each route every `interval` seconds (or the number
+    of seconds in `LATENCY_SUMMARY_INTERVAL`), if the interval is not zero.
+    """
+
+    def __init__(
+        self,
+        app: ASGI3Application,
+        histogram: Histogram | None = None,
+        interval: float | None = None,
+    ) -> None:
+        self.app: ASGI3Application = app
+        self.counts: dict[tuple[str, str], list[int]] = {}
+        self.histogram: Histogram = histogram or REQUEST_DURATION
+        self.interval: float = (
+            float(os.getenv("LATENCY_SUMMARY_INTERVAL", "60"))
+            if interval is None
+            else interval
+        )
+        self.next_summary: float = time.monotonic() + self.interval
+
+    async def __call__(
+        self, scope: Scope, receive: ASGIReceiveCallable, send: ASGISendCallable
+    ) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        send_with_latency = _LatencySend(self, scope, send)
+        try:
+            await self.app(scope, receive, send_with_latency)
+        except Exception:
+            if start := send_with_latency.start:
+                self.record(scope, 500, time.perf_counter_ns() - start)
+            raise
+
+    def record(self, scope: Scope, status: int, duration_ns: int) -> None:
+        """Record the latency of a request, and log a summary if it's time."""
+        items: Mapping[str, object] = scope
+        path = getattr(items.get("route"), "path", "")
+        labels = (
+            path if isinstance(path, str) else "",
+            STATUS_CLASSES[min(max(status // 100, 1), 5) - 1],
+        )
+        duration = duration_ns / 1e9
+        self.histogram.observe(duration, labels)
+        if not self.interval:
+            return
+        if (counts := self.counts.get(labels)) is None:
+            counts = self.counts[labels] = [0] * len(self.histogram.buckets)
+        counts[bisect.bisect_left(self.histogram.buckets, duration)] += 1
+        if (now := time.monotonic()) >= self.next_summary:
+            self.summarize(now)
+
+    def summarize(self, now: float) -> None:
+        """Log a summary of latency since the previous summary, and reset counts."""
+        self.next_summary = now + self.interval
+        counts, self.counts = self.counts, {}
+        logger = logging.getLogger(__name__)
+        for (route, status), route_counts in sorted(counts.items()):
+            p50 = estimate_quantile(self.histogram.buckets, route_counts, 0.5)
+            p99 = estimate_quantile(self.histogram.buckets, route_counts, 0.99)
+            logger.info(
+                "Latency of %s %s responses: p50 %.1f ms, p99 %.1f ms "
+                + "(%d requests in %.0fs).",
+                route or "unmatched",
+                status,
+                p50 * 1000,
+                p99 * 1000,
+                sum(route_counts),
+                self.interval,
+            )
+
+
+def archive_metrics(directory: str, pid: int | str) -> None:
+    """Add the metrics of a process that has exited to the archive, and remove its file.
+
+    Counters and histograms would go down if the file were only removed, so their
+    values are kept in the archive file, which is collected like other files.
+    """
+    path = Path(directory, f"{pid}.metrics")
+    if not path.is_file():
+        return
+    archive = MetricFile(Path(directory, ARCHIVE_FILE))
+    try:
+        for key, value in MetricFile.read(path).items():
+            archive.add(key, value)
+    finally:
+        archive.close()
+    path.unlink(missing_ok=True)
+
+
+def clear_metrics(directory: str) -> None:
+    """Remove the metric files of all processes, including the archive."""
+    for path in Path(directory).glob("*.metrics"):
+        path.unlink(missing_ok=True)
+
+
+REGISTRY = Registry()
+REQUEST_DURATION = REGISTRY.histogram(
+    "inboard_request_duration_seconds",
+    "Latency of HTTP requests, by route template and status class, in seconds.",
+    labelnames=("route", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+metrics_app = MetricsApp()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import functools
+import math
+import multiprocessing
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+CGROUP_PATH = Path("/sys/fs/cgroup")
+
+
+def get_cgroup_cpu_quota(cgroup_path: Path = CGROUP_PATH) -> tuple[float, str] | None:
+    """Get the CPU quota of the cgroup, and the file it was read from.
+
+    The quota is read from cgroup v2 `cpu.max`, or from cgroup v1
+    `cpu.cfs_quota_us` and `cpu.cfs_period_us`. Returns None if there is no quota.
+    """
+    try:
+        quota, period = (cgroup_path / "cpu.max").read_text().split()
+        return (int(quota) / int(period), "cgroup cpu.max") if quota != "max" else None
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((cgroup_path / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((cgroup_path / "cpu" / "cpu.cfs_period_us").read_text())
+        return (quota / period, "cgroup cpu.cfs_quota_us") if quota > 0 else None
+    except (OSError, ValueError, ZeroDivisionError):
+        return None
+
+
+def get_cpu_count(cgroup_path: Path = CGROUP_PATH) -> tuple[int, str]:
+    """Get the number of CPUs available to the process, and where it came from.
+
+    `multiprocessing.cpu_count()` returns the number of CPUs on the host, even when
+    a container is limited to fewer CPUs. The CPU count is therefore the least of
+    the host CPU count, the number of CPUs the process may run on (which reflects
+    cpusets), and the cgroup CPU quota, rounded up to a whole number of CPUs.
+    """
+    cpu_counts = [(multiprocessing.cpu_count(), "cpu_count")]
+    if hasattr(os, "sched_getaffinity"):
+        cpu_counts.append((len(os.sched_getaffinity(0)), "sched_getaffinity"))
+    if cpu_quota := get_cgroup_cpu_quota(cgroup_path):
+        quota, source = cpu_quota
+        cpu_counts.append((max(math.ceil(quota), 1), source))
+    return min(cpu_counts, key=lambda cpu_count: cpu_count[0])
+
+
+def get_memory_limit(cgroup_path: Path = CGROUP_PATH) -> tuple[int, str] | None:
+    """Get the memory available to the process, in bytes, and where it came from.
+
+    The memory limit is the lesser of the physical memory on the host, and the cgroup
+    memory limit from cgroup v2 `memory.max` or cgroup v1 `memory.limit_in_bytes`.
+    cgroup v1 reports no limit as a very large number, so the physical memory will
+    be used instead.
+    """
+    memory_limits: list[tuple[int, str]] = []
+    try:
+        physical_memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        memory_limits.append((physical_memory, "physical memory"))
+    except (AttributeError, OSError, ValueError):
+        pass
+    for name in ("memory.max", "memory/memory.limit_in_bytes"):
+        try:
+            limit = int((cgroup_path / name).read_text())
+            memory_limits.append((limit, f"cgroup {Path(name).name}"))
+            break
+        except (OSError, ValueError):
+            continue
+    return min(memory_limits, key=lambda limit: limit[0]) if memory_limits else None
+
+
+@functools.cache
+def measure_worker_memory(app_module: str) -> float:
+    """Measure the memory used by a worker, in MB, by importing the app once.
+
+    The app module is imported in a subprocess, and the peak resident set size
+    of the subprocess is used as an estimate of the memory used by each worker.
+    """
+    code = (
+        "import importlib, resource, sys; importlib.import_module(sys.argv[1]); "
+        "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    )
+    module = app_module.split(sep=":")[0]
+    process = subprocess.run(
+        [sys.executable, "-c", code, module], capture_output=True, check=True, text=True
+    )
+    max_rss = int(process.stdout)
+    return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 2**10
+
+
+def get_worker_memory(
+    worker_memory: str | None = None, app_module: str | None = None
+) -> float | None:
+    """Get the memory used by each worker, in MB.
+
+    The memory can be set as a number, or as `"auto"` to measure it by importing
+    the app module.
+    """
+    if not worker_memory:
+        return None
+    if worker_memory.lower() != "auto":
+        return float(worker_memory)
+    app_module = app_module or os.getenv("APP_MODULE") or os.getenv("UVICORN_APP")
+    return measure_worker_memory(app_module) if app_module else None
+
+
+def calculate_workers(
+    max_workers: str | None = None,
+    total_workers: str | None = None,
+    workers_per_core: str = "1",
+    worker_memory: str | None = None,
+) -> int:
+    """Calculate the number of worker processes for Gunicorn or Uvicorn."""
+    cores, _ = get_cpu_count()
+    default = max(int(float(workers_per_core) * cores), 2)
+    if (memory := get_worker_memory(worker_memory)) and (limit := get_memory_limit()):
+        default = min(default, max(int(limit[0] / 2**20 // memory), 1))
+    use_max = m if max_workers and (m := int(max_workers)) > 0 else False
+    use_total = t if total_workers and (t := int(total_workers)) > 0 else False
+    use_least = min(use_max, use_total) if use_max and use_total else False
+    use_default = min(use_max, default) if use_max else default
+    return use_least or use_total or use_default
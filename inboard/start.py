@@ -2,37 +2,147 @@
 from __future__ import annotations
 
 import importlib.util
-import json
 import logging
 import os
+import pickle
+import runpy
+import signal
 import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import TYPE_CHECKING
 
 import uvicorn
 
-from inboard.logging_conf import configure_logging
+from inboard.logging_conf import configure_logging, dump_logging_conf
+from inboard.resources import calculate_workers
 from inboard.types import UvicornOptions
+from inboard.uvicorn_conf import UvicornSupervisor, get_uvicorn_config_options
 
 if TYPE_CHECKING:
+    from types import FrameType
+
     from inboard.types import DictConfig
 
 
+def _get_pre_start_paths(
+    pre_start_path: str, logger: logging.Logger
+) -> list[list[Path]]:
+    """Get groups of pre-start script paths, skipping paths that aren't files."""
+    groups: list[list[Path]] = []
+    missing: list[str] = []
+    for group in pre_start_path.split(sep=";"):
+        paths: list[Path] = []
+        for item in (item.strip() for item in group.split(sep=",")):
+            if item and Path(item).is_file():
+                paths.append(Path(item))
+            elif item:
+                missing.append(item)
+        if paths:
+            groups.append(paths)
+    for item in missing if groups else ():
+        logger.debug(f"No pre-start script found at {item}.")
+    return groups
+
+
+def _run_pre_start_process(
+    path: Path, timeout: float | None, logger: logging.Logger
+) -> str:
+    """Run a pre-start script in a subprocess, with `python` or `sh`."""
+    process = "python" if path.suffix == ".py" else "sh"
+    logger.debug(f"Running pre-start script with {process} {path}.")
+    start = time.perf_counter()
+    _ = subprocess.run([process, str(path)], check=True, timeout=timeout)
+    elapsed = time.perf_counter() - start
+    message = f"Ran pre-start script with {process} {path} in {elapsed:.2f}s."
+    logger.debug(message)
+    return message
+
+
+def _run_pre_start_module(
+    path: Path, timeout: float | None, logger: logging.Logger
+) -> str:
+    """Run a Python pre-start script in the current process with `runpy`.
+
+    `runpy` temporarily replaces `sys.modules["__main__"]` and `sys.argv[0]`, so
+    scripts run in the current process have to run one at a time, in the main
+    thread. The timeout is applied with `SIGALRM`, which raises `TimeoutError` in the
+    script when the timeout expires.
+    """
+
+    def handle_timeout(_signum: int, _frame: FrameType | None) -> None:
+        raise TimeoutError(f"Pre-start script {path} timed out after {timeout}s")
+
+    timer = timeout if hasattr(signal, "setitimer") else None
+    logger.debug(f"Running pre-start script with runpy {path}.")
+    start = time.perf_counter()
+    sys.path.insert(0, str(path.parent))
+    handler = signal.signal(signal.SIGALRM, handle_timeout) if timer else None
+    previous = signal.setitimer(signal.ITIMER_REAL, timer) if timer else None
+    try:
+        _ = runpy.run_path(str(path), run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise
+    finally:
+        if timer:
+            # Restore the previous handler, and the remaining time of a previous timer
+            _ = signal.setitimer(signal.ITIMER_REAL, 0)
+            _ = signal.signal(signal.SIGALRM, handler or signal.SIG_DFL)
+            if previous and previous[0]:
+                remaining = previous[0] - (time.perf_counter() - start)
+                _ = signal.setitimer(
+                    signal.ITIMER_REAL, max(remaining, 0.001), previous[1]
+                )
+        sys.path.remove(str(path.parent))
+    elapsed = time.perf_counter() - start
+    message = f"Ran pre-start script with runpy {path} in {elapsed:.2f}s."
+    logger.debug(message)
+    return message
+
+
 def run_pre_start_script(logger: logging.Logger | None = None) -> str:
-    """Run a pre-start script at the provided path."""
+    """Run pre-start scripts at the provided paths.
+
+    `PRE_START_PATH` can list several scripts. Scripts separated by commas run
+    concurrently, and groups of scripts separated by semicolons run in order, so
+    that scripts can depend on the scripts in previous groups. Scripts run in
+    subprocesses, or in the current process with `runpy` for Python scripts if
+    `PRE_START_IN_PROCESS` is set. Each script has to finish within
+    `PRE_START_TIMEOUT` seconds, if set. If a script raises an error or exits with
+    a nonzero code, the error is raised after the other scripts in its group finish.
+    """
     logger = logger or logging.getLogger()
     pre_start_path = os.getenv("PRE_START_PATH")
     logger.debug("Checking for pre-start script.")
     if not pre_start_path:
         message = "No pre-start script specified."
-    elif Path(pre_start_path).is_file():
-        process = "python" if Path(pre_start_path).suffix == ".py" else "sh"
-        run_message = f"Running pre-start script with {process} {pre_start_path}."
-        logger.debug(run_message)
-        _ = subprocess.run([process, pre_start_path], check=True)
-        message = f"Ran pre-start script with {process} {pre_start_path}."
-    else:
+    elif not (groups := _get_pre_start_paths(pre_start_path, logger)):
         message = "No pre-start script found."
+    else:
+        in_process = bool(
+            (value := os.getenv("PRE_START_IN_PROCESS")) and value.lower() == "true"
+        )
+        timeout = float(value) if (value := os.getenv("PRE_START_TIMEOUT")) else None
+        start = time.perf_counter()
+        messages: list[str] = []
+        for paths in groups:
+            modules = [path for path in paths if in_process and path.suffix == ".py"]
+            with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+                futures = [
+                    executor.submit(_run_pre_start_process, path, timeout, logger)
+                    for path in paths
+                    if path not in modules
+                ]
+                for path in modules:
+                    messages.append(_run_pre_start_module(path, timeout, logger))
+                messages.extend(future.result() for future in futures)
+        if len(messages) == 1:
+            return messages[0]
+        elapsed = time.perf_counter() - start
+        message = f"Ran {len(messages)} pre-start scripts in {elapsed:.2f}s."
     logger.debug(message)
     return message
 
@@ -78,9 +188,7 @@ def _update_uvicorn_options(uvicorn_options: UvicornOptions) -> UvicornOptions:
         uvicorn_options["reload_delay"] = reload_delay
         uvicorn_options["reload_includes"] = reload_includes
         uvicorn_options["reload_excludes"] = reload_excludes
-    if value := os.getenv("UVICORN_CONFIG_OPTIONS"):
-        uvicorn_options_json = json.loads(value)  # pyright: ignore[reportAny]
-        uvicorn_options.update(uvicorn_options_json)  # pyright: ignore[reportAny]
+    uvicorn_options.update(get_uvicorn_config_options())  # pyright: ignore[reportCallIssue, reportArgumentType]
     return uvicorn_options
 
 
@@ -91,7 +199,15 @@ def set_uvicorn_options(
     """Set options for running the Uvicorn server."""
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "80"))
-    log_level = os.getenv("LOG_LEVEL", "info")
+    # Uvicorn sets `log_level` on its loggers after applying the logging config,
+    # so don't set it if the logging config already sets levels on these loggers.
+    loggers = log_config.get("loggers", {}) if log_config else {}
+    uvicorn_loggers = ("uvicorn.access", "uvicorn.asgi", "uvicorn.error")
+    log_level = (
+        None
+        if any("level" in loggers.get(name, {}) for name in uvicorn_loggers)
+        else os.getenv("LOG_LEVEL", "info")
+    )
     reload_dirs = _split_uvicorn_option("RELOAD_DIRS")
     use_reload = bool((value := os.getenv("WITH_RELOAD")) and value.lower() == "true")
     uvicorn_options = UvicornOptions(
@@ -103,7 +219,48 @@ def set_uvicorn_options(
         reload=use_reload,
         reload_dirs=reload_dirs,
     )
-    return _update_uvicorn_options(uvicorn_options)
+    uvicorn_options = _update_uvicorn_options(uvicorn_options)
+    if not uvicorn_options.get("reload") and "workers" not in uvicorn_options:
+        uvicorn_options["workers"] = calculate_workers(
+            os.getenv("MAX_WORKERS"),
+            os.getenv("WEB_CONCURRENCY"),
+            workers_per_core=os.getenv("WORKERS_PER_CORE", "1"),
+            worker_memory=os.getenv("WORKER_MEMORY_MB"),
+        )
+    return uvicorn_options
+
+
+def run_uvicorn_workers(
+    uvicorn_options: UvicornOptions, logger: logging.Logger | None = None
+) -> None:
+    """Run Uvicorn worker processes that share the listening socket, and restart
+    worker processes that exit.
+
+    The Uvicorn configuration is pickled to send it to each worker process. If the
+    configuration can't be pickled, like when a logging configuration file defines
+    its own classes, a single Uvicorn process is run instead.
+    """
+    logger = logger or logging.getLogger()
+    options = uvicorn_options.copy()
+    if (app_dir := options.pop("app_dir", None)) is not None:
+        sys.path.insert(0, app_dir)
+    config = uvicorn.Config(**options)  # type: ignore[arg-type,call-arg] # pyright: ignore[reportCallIssue]
+    server = uvicorn.Server(config)
+    try:
+        try:
+            _ = pickle.dumps(config)
+        except (AttributeError, TypeError, pickle.PicklingError) as e:
+            logger.warning(
+                "Running a single Uvicorn process, because the Uvicorn configuration "
+                + f"can't be sent to worker processes: {e.__class__.__name__} {e}."
+            )
+            server.run()
+            return
+        sock = config.bind_socket()
+        UvicornSupervisor(config, target=server.run, sockets=[sock]).run()
+    finally:
+        if config.uds:
+            Path(config.uds).unlink(missing_ok=True)
 
 
 def start_server(
@@ -122,13 +279,32 @@ def start_server(
                 if any("uvicorn" in option.casefold() for option in gunicorn_options)
                 else "Running Gunicorn."
             )
-            _ = subprocess.run(gunicorn_options)
+            if (value := os.getenv("GUNICORN_EMBEDDED")) and value.lower() == "true":
+                from inboard.gunicorn_app import GunicornApplication
+
+                GunicornApplication(gunicorn_options).run()
+                return
+            # The default logging configuration doesn't need a snapshot to load
+            snapshot = (
+                logging_conf_dict
+                and os.getenv("LOGGING_CONF")
+                and dump_logging_conf(logging_conf_dict)
+            )
+            env = (
+                {**os.environ, "LOGGING_CONF_SNAPSHOT": snapshot} if snapshot else None
+            )
+            _ = subprocess.run(gunicorn_options, env=env)
         elif process_manager == "uvicorn":
             logger.debug("Running Uvicorn without Gunicorn.")
             uvicorn_options: UvicornOptions = set_uvicorn_options(
                 app_module, log_config=logging_conf_dict
             )
-            uvicorn.run(**uvicorn_options)  # type: ignore[arg-type] # pyright: ignore[reportArgumentType]
+            workers = uvicorn_options.get("workers")
+            if workers and workers > 1 and not uvicorn_options.get("reload"):
+                logger.debug(f"Running {workers} Uvicorn worker processes.")
+                run_uvicorn_workers(uvicorn_options, logger=logger)
+            else:
+                uvicorn.run(**uvicorn_options)  # type: ignore[arg-type] # pyright: ignore[reportArgumentType]
         else:
             raise NameError("Process manager needs to be either uvicorn or gunicorn")
     except Exception as e:
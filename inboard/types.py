@@ -52,6 +52,21 @@ _FilterConfiguration = (
 _HandlerConfiguration = dict[str, Any]  # pyright: ignore[reportExplicitAny]
 
 
+class AccessLogFilters(TypedDict):
+    """Access log filters used by `inboard.logging_conf.LogFilter`.
+    ---
+
+    Each field is checked against the structured fields of an access log record.
+    Paths are matched exactly (ignoring query strings), path prefixes are matched
+    with `str.startswith`, and status classes are the first digit of the status code.
+    """
+
+    paths: frozenset[str]
+    path_prefixes: tuple[str, ...]
+    status_classes: frozenset[int]
+    methods: frozenset[str]
+
+
 class DictConfig(TypedDict):
     """Python standard library logging module dict config type.
     ---
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import time
+from typing import TYPE_CHECKING, cast
+
+from uvicorn._subprocess import get_subprocess
+from uvicorn.supervisors.multiprocess import Multiprocess
+
+from inboard.types import UvicornOptions
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from socket import socket
+
+    from uvicorn.config import Config
+
+logger = logging.getLogger("uvicorn.error")
+
+# Exit code used by the Gunicorn arbiter when a worker fails to boot
+WORKER_BOOT_ERROR = 3
+
+_OPTION_TYPES: dict[str, tuple[type, ...]] = {
+    "None": (type(None),),
+    "bool": (bool,),
+    "float": (float, int),
+    "int": (int,),
+    "str": (str,),
+}
+
+
+def get_uvicorn_config_options() -> dict[str, object]:
+    """Get Uvicorn options from the `UVICORN_CONFIG_OPTIONS` JSON object.
+
+    Options are validated against `inboard.types.UvicornOptions`. Each option must
+    be a field of `UvicornOptions`. Values of fields with simple types (`bool`,
+    `float`, `int`, `str` and `None`) must have one of the field's types.
+    """
+    if not (value := os.getenv("UVICORN_CONFIG_OPTIONS")):
+        return {}
+    options: object = json.loads(value)  # pyright: ignore[reportAny]
+    if not isinstance(options, dict):
+        raise TypeError("UVICORN_CONFIG_OPTIONS must be a JSON object")
+    options = cast("dict[str, object]", options)
+    annotations: dict[str, object] = UvicornOptions.__annotations__
+    for name, option in options.items():
+        if (annotation := annotations.get(name)) is None:
+            raise ValueError(f"Invalid Uvicorn option: {name}")
+        forward_arg: object = getattr(annotation, "__forward_arg__", annotation)
+        names = str(forward_arg).split(" | ")
+        if not all(type_name in _OPTION_TYPES for type_name in names):
+            continue
+        types = tuple(t for type_name in names for t in _OPTION_TYPES[type_name])
+        if not isinstance(option, types) or (
+            isinstance(option, bool) and "bool" not in names
+        ):
+            raise TypeError(
+                f"Invalid type for Uvicorn option {name}: {option!r} "
+                + f"(expected {' | '.join(names)})"
+            )
+    return options
+
+
+class UvicornSupervisor(Multiprocess):
+    """Run Uvicorn worker processes that share the listening sockets, and restart
+    worker processes that exit.
+
+    The Uvicorn multiprocess supervisor starts `config.workers` processes and waits
+    for a signal to stop them, but does not replace processes that crash or exit
+    after reaching `limit_max_requests`. This supervisor checks the processes every
+    `interval` seconds, and starts a new process in place of each process that has
+    exited, so that the number of processes matches `config.workers`.
+
+    A process that exits within `boot_timeout` seconds of starting has failed to
+    boot. If processes fail to boot `max_boot_failures` times in a row, like when
+    the app can't be imported, the supervisor stops and exits with the same exit
+    code as the Gunicorn arbiter, instead of restarting processes indefinitely.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        target: Callable[[list[socket] | None], None],
+        sockets: list[socket],
+        interval: float = 0.5,
+        boot_timeout: float = 10,
+        max_boot_failures: int = 5,
+    ) -> None:
+        super().__init__(config, target=target, sockets=sockets)
+        self.boot_failures: int = 0
+        self.boot_timeout: float = boot_timeout
+        self.interval: float = interval
+        self.max_boot_failures: int = max_boot_failures
+        self.started_at: list[float] = []
+
+    def run(self) -> None:
+        self.startup()
+        self.started_at = [time.monotonic()] * len(self.processes)
+        while not self.should_exit.wait(self.interval):
+            self.restart_workers()
+        self.shutdown()
+        if self.boot_failures >= self.max_boot_failures:
+            sys.exit(WORKER_BOOT_ERROR)
+
+    def restart_workers(self) -> None:
+        """Start new worker processes in place of processes that have exited."""
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            process.join()
+            now = time.monotonic()
+            booted = now - self.started_at[index] >= self.boot_timeout
+            self.boot_failures = 0 if booted else self.boot_failures + 1
+            if self.boot_failures >= self.max_boot_failures:
+                logger.error(
+                    f"Worker processes failed to boot {self.boot_failures} times "
+                    + "in a row. Stopping."
+                )
+                self.should_exit.set()
+                return
+            logger.warning(
+                f"Worker process [{process.pid}] exited with code {process.exitcode}. "
+                + "Starting a new worker process."
+            )
+            new_process = get_subprocess(
+                config=self.config, target=self.target, sockets=self.sockets
+            )
+            new_process.start()
+            self.processes[index] = new_process
+            self.started_at[index] = now
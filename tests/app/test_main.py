@@ -145,6 +145,39 @@ class TestEndpoints:
             client_asgi.get("/")
         assert "Process manager needs to be either uvicorn or gunicorn" in str(e.value)
 
+    def test_get_asgi_metrics(
+        self, basic_auth: tuple[str, str], client_asgi: TestClient
+    ) -> None:
+        """Test a `GET` request to the metrics endpoint of the base ASGI app,
+        which requires HTTP Basic auth.
+        """
+        for auth in (None, ("test_user", "incorrect_password")):
+            error_response = client_asgi.get("/metrics", auth=auth)
+            assert error_response.status_code == 401
+            assert error_response.headers["www-authenticate"] == "Basic"
+        response = client_asgi.get("/metrics", auth=basic_auth)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE inboard_worker_loop_lag_seconds histogram" in response.text
+
+    def test_get_asgi_metrics_no_credentials(self, client_asgi: TestClient) -> None:
+        """Test a `GET` request to the metrics endpoint of the base ASGI app
+        without HTTP Basic auth credentials set.
+        """
+        response = client_asgi.get("/metrics", auth=("user", "pass"))
+        assert response.status_code == 401
+        assert response.text == "Incorrect username or password"
+
+    def test_get_metrics(self, basic_auth: tuple[str, str], client: TestClient) -> None:
+        """Test a `GET` request to the metrics endpoint, which requires HTTP Basic
+        auth.
+        """
+        assert client.get("/metrics").status_code in {401, 403}
+        response = client.get("/metrics", auth=basic_auth)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE inboard_worker_loop_lag_seconds histogram" in response.text
+
     def test_get_root(self, client: TestClient) -> None:
         """Test a `GET` request to the root endpoint."""
         response = client.get("/")
@@ -166,7 +199,7 @@ class TestEndpoints:
         assert response_json["application"] == "inboard"
         assert response_json["status"] == "active"
 
-    @pytest.mark.parametrize("endpoint", ("/health", "/status"))
+    @pytest.mark.parametrize("endpoint", ("/health", "/metrics", "/status"))
     def test_gets_with_basic_auth_no_credentials(
         self, client: TestClient, endpoint: str
     ) -> None:
@@ -193,7 +226,7 @@ class TestEndpoints:
             ("test_user", "incorrect_password"),
         ),
     )
-    @pytest.mark.parametrize("endpoint", ("/health", "/status"))
+    @pytest.mark.parametrize("endpoint", ("/health", "/metrics", "/status"))
     def test_gets_with_basic_auth_incorrect_credentials(
         self,
         basic_auth_incorrect: tuple[str, str],
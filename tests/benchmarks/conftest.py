@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from importlib.metadata import version
+from pathlib import Path
+from typing import TYPE_CHECKING, Protocol, TypedDict
+
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+BENCHMARK_RECORDS = 10_000
+
+
+class BenchmarkResult(TypedDict):
+    name: str
+    records: int
+    seconds: float
+    records_per_second: float
+    bytes_per_record: int
+    blocks_per_record: float
+
+
+class Benchmark(Protocol):
+    def __call__(
+        self, func: Callable[[], object], records: int = BENCHMARK_RECORDS
+    ) -> float: ...
+
+
+benchmark_results_key = pytest.StashKey[list[BenchmarkResult]]()
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.stash[benchmark_results_key] = []
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    """Write benchmark results to the JSON file at `BENCHMARK_JSON`, if set.
+
+    The Python and inboard versions are included, so that results can be compared
+    across upgrades.
+    """
+    results = session.config.stash[benchmark_results_key]
+    if results and (path := os.getenv("BENCHMARK_JSON")):
+        output = {
+            "inboard": version("inboard"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "results": results,
+        }
+        _ = Path(path).write_text(json.dumps(output, indent=2) + "\n")
+
+
+def pytest_terminal_summary(
+    terminalreporter: pytest.TerminalReporter, config: pytest.Config
+) -> None:
+    """Report benchmark throughput and allocations after the test session."""
+    results = config.stash[benchmark_results_key]
+    if results:
+        terminalreporter.section("benchmarks")
+    for result in results:
+        name, records_per_second = result["name"], result["records_per_second"]
+        bytes_per_record = result["bytes_per_record"]
+        terminalreporter.write_line(
+            f"{name:<60} {records_per_second:>12,.0f} records/s "
+            + f"{bytes_per_record:>8,d} bytes/record"
+        )
+
+
+def _measure_allocations(func: Callable[[], object], records: int) -> tuple[int, float]:
+    """Measure the memory allocated to handle one record, and the memory retained.
+
+    Returns the peak number of bytes allocated by `tracemalloc` while handling
+    one record, and the number of memory blocks still allocated per record after
+    handling all the records (which should be close to zero).
+    """
+    tracemalloc.start()
+    try:
+        _ = func()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        _ = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    blocks = sys.getallocatedblocks()
+    for _ in range(records):
+        _ = func()
+    return peak - current, (sys.getallocatedblocks() - blocks) / records
+
+
+@pytest.fixture
+def benchmark(request: pytest.FixtureRequest) -> Benchmark:
+    """Run a callable once per record and return the number of records per second.
+
+    Allocations are measured separately, because tracing allocations slows down
+    the callable. Results are saved and reported in the terminal summary after
+    the test session.
+    """
+
+    node: pytest.Item = getattr(request, "node")  # pyright: ignore[reportAny]
+
+    def run(func: Callable[[], object], records: int = BENCHMARK_RECORDS) -> float:
+        start = time.perf_counter()
+        for _ in range(records):
+            _ = func()
+        seconds = time.perf_counter() - start
+        bytes_per_record, blocks_per_record = _measure_allocations(func, records)
+        result = BenchmarkResult(
+            name=node.name,
+            records=records,
+            seconds=seconds,
+            records_per_second=records / seconds,
+            bytes_per_record=bytes_per_record,
+            blocks_per_record=blocks_per_record,
+        )
+        request.config.stash[benchmark_results_key].append(result)
+        return result["records_per_second"]
+
+    return run
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import logging.config
+import os
+import random
+import string
+import sys
+from typing import TYPE_CHECKING
+
+import pytest
+
+from inboard import logging_conf
+from tests.benchmarks.conftest import (
+    BenchmarkResult,
+    benchmark_results_key,
+    pytest_sessionfinish,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+    from typing import TextIO
+
+    from pytest_mock import MockerFixture
+
+    from inboard.types import DictConfig
+    from tests.benchmarks.conftest import Benchmark
+
+pytestmark = pytest.mark.benchmark
+
+
+UVICORN_ACCESS_LOG_ARGS = ("127.0.0.1:60364", "GET", "/api/v1/users/me", "1.1", 200)
+
+
+@pytest.fixture
+def null_sink() -> Generator[TextIO, None, None]:
+    """Yield a stream that discards output, for benchmarking the handler chain."""
+    with open(os.devnull, "w") as stream:
+        yield stream
+
+
+@pytest.fixture
+def null_sink_logging_conf_dict(null_sink: TextIO) -> Generator[DictConfig, None, None]:
+    """Yield a copy of the logging configuration that logs to the null sink.
+
+    The logging configuration is applied again after the test, so that handlers
+    do not keep logging to the closed null sink.
+    """
+    logging_conf_dict = copy.deepcopy(logging_conf.LOGGING_CONFIG)
+    logging_conf_dict["handlers"]["default"]["stream"] = null_sink
+    yield logging_conf_dict
+    logging.config.dictConfig(dict(logging_conf.LOGGING_CONFIG))
+
+
+def _uvicorn_access_log_record(path: str) -> logging.LogRecord:
+    args = ("127.0.0.1:60364", "GET", path, "1.1", 200)
+    return logging.LogRecord(
+        "uvicorn.access",
+        logging.INFO,
+        __file__,
+        0,
+        '%s - "%s %s HTTP/%s" %d',
+        args,
+        None,
+    )
+
+
+@pytest.mark.parametrize("method", ("pattern", "substrings"))
+@pytest.mark.parametrize("filter_count", (1, 10, 100, 300))
+def test_log_filter_throughput(
+    benchmark: Benchmark, filter_count: int, method: str
+) -> None:
+    """Benchmark `LogFilter.filter` as the number of filters grows.
+
+    The record is not filtered out, so every filter must be checked. Filters are
+    random strings, so they don't share a prefix that the regular expression engine
+    could search for instead of each filter. The `substrings` method searches for
+    each filter in the message separately, as `LogFilter` did before filters were
+    compiled into a regular expression, for comparison.
+    """
+    characters = string.ascii_lowercase + string.digits
+    rng = random.Random(filter_count)
+    filters = {
+        "/" + "".join(rng.choices(characters, k=rng.randint(4, 12)))
+        for _ in range(filter_count)
+    }
+    log_filter = logging_conf.LogFilter(filters=filters)
+    record = _uvicorn_access_log_record("/api/v1/users/me?fields=username")
+    assert log_filter.filter(record) is True
+
+    def filter_pattern() -> bool:
+        return log_filter.filter(record)
+
+    def filter_substrings() -> bool:
+        message = record.getMessage()
+        return all(match not in message for match in filters)
+
+    func = filter_pattern if method == "pattern" else filter_substrings
+    assert benchmark(func) > 0
+
+
+@pytest.mark.parametrize("filter_type", ("access_filters", "filters"))
+def test_log_filter_access_throughput(benchmark: Benchmark, filter_type: str) -> None:
+    """Benchmark filtering out access log records on structured fields or messages.
+
+    Access filters drop the record without formatting the log message.
+    """
+    log_filter = (
+        logging_conf.LogFilter(
+            access_filters=logging_conf.LogFilter.set_access_filters("path=/health")
+        )
+        if filter_type == "access_filters"
+        else logging_conf.LogFilter(filters={"/health"})
+    )
+    record = _uvicorn_access_log_record("/health")
+    assert log_filter.filter(record) is False
+    assert benchmark(lambda: log_filter.filter(record)) > 0
+
+
+@pytest.mark.parametrize("formatter_name", logging_conf.LOGGING_CONFIG["formatters"])
+def test_formatter_throughput(benchmark: Benchmark, formatter_name: str) -> None:
+    """Benchmark each formatter in the logging configuration with access log records.
+
+    Formatters are created from the logging configuration dictionary in the same way
+    as `logging.config.dictConfig`.
+    """
+    configurator = logging.config.DictConfigurator(dict(logging_conf.LOGGING_CONFIG))
+    formatter_config = dict(logging_conf.LOGGING_CONFIG["formatters"][formatter_name])
+    formatter: logging.Formatter = configurator.configure_formatter(formatter_config)
+    record = _uvicorn_access_log_record("/api/v1/users/me?fields=username")
+    assert "/api/v1/users/me" in formatter.format(record)
+    assert benchmark(lambda: formatter.format(record)) > 0
+
+
+@pytest.mark.parametrize("logger_name", ("inboard.benchmarks", "uvicorn.access"))
+def test_handler_chain_throughput(
+    benchmark: Benchmark,
+    logger_name: str,
+    null_sink_logging_conf_dict: DictConfig,
+) -> None:
+    """Benchmark logging through the configured loggers, filters, handlers,
+    and formatter, writing to a null sink.
+    """
+    logging.config.dictConfig(dict(null_sink_logging_conf_dict))
+    logger = logging.getLogger(logger_name)
+    message = '%s - "%s %s HTTP/%s" %d'
+    assert logger.isEnabledFor(logging.INFO)
+    assert benchmark(lambda: logger.info(message, *UVICORN_ACCESS_LOG_ARGS)) > 0
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires unix")
+def test_uvicorn_worker_access_log_throughput(
+    benchmark: Benchmark,
+    null_sink_logging_conf_dict: DictConfig,
+) -> None:
+    """Benchmark Uvicorn access log records emitted through `UvicornWorker`'s logger
+    wiring, where the `uvicorn.access` logger uses Gunicorn's access log handlers.
+    """
+    from gunicorn.config import Config
+    from gunicorn.glogging import Logger
+
+    from inboard.gunicorn_workers import UvicornWorker
+
+    cfg = Config()
+    cfg.set("logconfig_dict", null_sink_logging_conf_dict)
+    worker = UvicornWorker(0, os.getpid(), [], None, 30, cfg, Logger(cfg))
+    logger = logging.getLogger("uvicorn.access")
+    try:
+        assert logger.handlers == logging.getLogger("gunicorn.access").handlers
+        message = '%s - "%s %s HTTP/%s" %d'
+        assert benchmark(lambda: logger.info(message, *UVICORN_ACCESS_LOG_ARGS)) > 0
+    finally:
+        worker.tmp.close()
+        logger.handlers = []
+        logger.propagate = True
+        logger.setLevel(logging.NOTSET)
+
+
+def test_benchmark_json(
+    mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Test that benchmark results are written to the JSON file at `BENCHMARK_JSON`.
+
+    The session is stubbed, so that the results of this test are not added to the
+    results of the test session.
+    """
+    result = BenchmarkResult(
+        name="test_benchmark",
+        records=10,
+        seconds=0.5,
+        records_per_second=20.0,
+        bytes_per_record=100,
+        blocks_per_record=0.0,
+    )
+    stash = pytest.Stash()
+    stash[benchmark_results_key] = [result]
+    session = mocker.Mock(config=mocker.Mock(stash=stash))
+    path = tmp_path / "benchmarks.json"
+    monkeypatch.setenv("BENCHMARK_JSON", str(path))
+    pytest_sessionfinish(session)
+    output: dict[str, object] = json.loads(path.read_text())  # pyright: ignore[reportAny]
+    assert {"inboard", "platform", "python", "results"} <= output.keys()
+    assert output["results"] == [result]
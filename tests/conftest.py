@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import contextlib
 import os
 import shutil
+import socket
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -10,6 +12,7 @@ from fastapi.testclient import TestClient
 
 from inboard import gunicorn_conf as gunicorn_conf_module
 from inboard import logging_conf as logging_conf_module
+from inboard import resources
 from inboard.app import prestart as pre_start_module
 from inboard.app.main_base import app as base_app
 from inboard.app.main_fastapi import app as fastapi_app
@@ -99,6 +102,20 @@ def gunicorn_conf_tmp_file_path(tmp_path_factory: pytest.TempPathFactory) -> Pat
     return tmp_file
 
 
+@pytest.fixture(autouse=True)
+def logging_conf_cache(
+    monkeypatch: pytest.MonkeyPatch,
+) -> dict[tuple[str, int], DictConfig]:
+    """Use an empty logging configuration cache for each test.
+
+    Tests load the same temporary logging configuration files with different
+    environment variables, so cached configurations can't be reused across tests.
+    """
+    cache: dict[tuple[str, int], DictConfig] = {}
+    monkeypatch.setattr(logging_conf_module, "_logging_conf_cache", cache)
+    return cache
+
+
 @pytest.fixture
 def logging_conf_dict(mocker: MockerFixture) -> DictConfig:
     """Load logging configuration dictionary from logging configuration module."""
@@ -205,6 +222,17 @@ def pre_start_script_error(request: pytest.FixtureRequest, tmp_path: Path) -> Pa
     return Path(tmp_file)
 
 
+def _unused_port(socket_type: int) -> int:
+    with contextlib.closing(socket.socket(type=socket_type)) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])  # pyright: ignore[reportAny]
+
+
+@pytest.fixture
+def unused_tcp_port() -> int:
+    return _unused_port(socket.SOCK_STREAM)
+
+
 @pytest.fixture(scope="session")
 def uvicorn_options_default() -> UvicornOptions:
     """Return default options used by `uvicorn.run()` for use in test assertions."""
@@ -219,6 +247,7 @@ def uvicorn_options_default() -> UvicornOptions:
         reload_dirs=None,
         reload_excludes=None,
         reload_includes=None,
+        workers=resources.calculate_workers(),
     )
 
 
@@ -1,78 +1,588 @@
 from __future__ import annotations
 
-import multiprocessing
+import gc
+import math
+import os
+import runpy
+import signal
+import socket
 import subprocess
+import threading
+import time
+import weakref
+from pathlib import Path
 from typing import TYPE_CHECKING
 
+import httpxyz
 import pytest
+from gunicorn.arbiter import Arbiter
+from gunicorn.workers.workertmp import WorkerTmp
 
-from inboard import gunicorn_conf
+from inboard import gunicorn_conf, resources
+from inboard.gunicorn_workers import UvicornWorker, WorkerHeartbeat, WorkerLoad
+from inboard.metrics import ARCHIVE_FILE, MetricFile
 
 if TYPE_CHECKING:
-    from pathlib import Path
+    from collections.abc import Callable
 
+    from pytest_mock import MockerFixture
 
-class TestCalculateWorkers:
-    """Test calculation of the number of Gunicorn worker processes.
+
+@pytest.fixture(autouse=True)
+def metrics_dir(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Use a temporary directory for metrics, and restore `METRICS_DIR` after tests
+    that run Gunicorn server hooks.
+    """
+    metrics_dir = tmp_path / "metrics"
+    metrics_dir.mkdir()
+    monkeypatch.setattr(gunicorn_conf, "metrics_dir", str(metrics_dir))
+    monkeypatch.setenv("METRICS_DIR", str(metrics_dir))
+    return metrics_dir
+
+
+class TestCPUCount:
+    """Test detection of the number of CPUs available to Gunicorn.
     ---
     """
 
-    def test_calculate_workers_default(self) -> None:
-        """Test default number of Gunicorn worker processes."""
-        cores = multiprocessing.cpu_count()
-        assert gunicorn_conf.workers >= 2
-        assert gunicorn_conf.workers == max(cores, 2)
+    def test_on_starting(self, mocker: MockerFixture) -> None:
+        """Test that the CPU count and its source are logged when Gunicorn starts."""
+        _ = mocker.patch.object(
+            gunicorn_conf, "get_cpu_count", return_value=(2, "cgroup cpu.max")
+        )
+        info = mocker.Mock()
+        server = mocker.Mock(log=mocker.Mock(info=info))
+        gunicorn_conf.on_starting(server)
+        info.assert_called_once_with(
+            "Using 2 CPUs from cgroup cpu.max to calculate workers."
+        )
+
+
+class TestMemoryLimit:
+    """Test detection of the memory available to Gunicorn workers.
+    ---
+    """
+
+    def test_on_starting(
+        self, mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that the memory limit and worker memory are logged on start."""
+        _ = mocker.patch.object(
+            gunicorn_conf, "get_cpu_count", return_value=(2, "cgroup cpu.max")
+        )
+        _ = mocker.patch.object(
+            gunicorn_conf, "get_memory_limit", return_value=(2**30, "cgroup memory.max")
+        )
+        monkeypatch.setenv("WORKER_MEMORY_MB", "256")
+        info = mocker.Mock()
+        server = mocker.Mock(log=mocker.Mock(info=info))
+        gunicorn_conf.on_starting(server)
+        info.assert_called_with(
+            "Using 1024 MB of memory from cgroup memory.max "
+            + "and 256 MB per worker to calculate workers."
+        )
+
+    def test_on_starting_without_log(self, mocker: MockerFixture) -> None:
+        """Test that nothing is logged if the Gunicorn server has no logger."""
+        get_cpu_count = mocker.patch.object(gunicorn_conf, "get_cpu_count")
+        gunicorn_conf.on_starting(mocker.Mock(log=None))
+        get_cpu_count.assert_not_called()
+
+
+class TestReusePort:
+    """Test binding a socket in each Gunicorn worker with `SO_REUSEPORT`.
+    ---
+    """
+
+    def test_supports_reuse_port(
+        self, mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test checking for `SO_REUSEPORT` support in Python and in the kernel."""
+        expected = hasattr(socket, "SO_REUSEPORT")
+        assert gunicorn_conf.supports_reuse_port() is expected
+        _ = mocker.patch.object(socket.socket, "setsockopt", side_effect=OSError)
+        assert gunicorn_conf.supports_reuse_port() is False
+        monkeypatch.delattr(socket, "SO_REUSEPORT", raising=False)
+        assert gunicorn_conf.supports_reuse_port() is False
+
+    def test_on_starting_without_reuse_port(
+        self, mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a warning is logged if `SO_REUSEPORT` is not supported."""
+        _ = mocker.patch.object(
+            gunicorn_conf, "supports_reuse_port", return_value=False
+        )
+        monkeypatch.setenv("REUSE_PORT", "true")
+        warning = mocker.Mock()
+        server = mocker.Mock(log=mocker.Mock(warning=warning))
+        gunicorn_conf.on_starting(server)
+        warning.assert_called_once_with(
+            "SO_REUSEPORT is not supported. Workers will share the arbiter's socket."
+        )
+
+
+@pytest.fixture
+def worker_slots(monkeypatch: pytest.MonkeyPatch) -> dict[int, int]:
+    """Reset the slots assigned to workers by the Gunicorn configuration."""
+    worker_slots: dict[int, int] = {}
+    monkeypatch.setattr(gunicorn_conf, "worker_slots", worker_slots)
+    return worker_slots
+
+
+@pytest.fixture
+def worker_load(monkeypatch: pytest.MonkeyPatch) -> WorkerLoad:
+    """Replace the shared memory for worker heartbeats and load with 3 slots."""
+    worker_load = WorkerLoad(3)
+    monkeypatch.setattr(gunicorn_conf, "worker_load", worker_load)
+    return worker_load
+
+
+@pytest.fixture
+def new_worker(mocker: MockerFixture) -> Callable[[int], UvicornWorker]:
+    """Create Uvicorn workers with a temporary file, without starting them."""
+    cfg = mocker.Mock(umask=0, worker_tmp_dir=None, uid=os.geteuid(), gid=os.getegid())
+
+    def new_worker(age: int) -> UvicornWorker:
+        worker = UvicornWorker.__new__(UvicornWorker)
+        worker.age = age
+        worker.pid = str(1000 + age)
+        worker.tmp = WorkerTmp(cfg)
+        return worker
+
+    return new_worker
+
+
+@pytest.mark.usefixtures("worker_load", "worker_slots")
+class TestWorkerSlots:
+    """Test assigning slots to Gunicorn workers for heartbeats, load, and CPUs.
+    ---
+    """
+
+    def test_worker_slots(
+        self,
+        mocker: MockerFixture,
+        new_worker: Callable[[int], UvicornWorker],
+        worker_load: WorkerLoad,
+        worker_slots: dict[int, int],
+    ) -> None:
+        """Test that a worker replacing another worker gets the same slot."""
+        server = mocker.Mock(cfg=mocker.Mock(preload_app=False))
+        workers = [new_worker(age) for age in range(1, 6)]
+        for worker in workers[:4]:
+            gunicorn_conf.pre_fork(server, worker)
+        assert worker_slots == {1: 0, 2: 1, 3: 2, 4: 3}
+        assert [worker.load_slot for worker in workers[:4]] == [0, 1, 2, None]
+        assert all(worker.load is worker_load for worker in workers[:3])
+        assert isinstance(workers[3].tmp, WorkerTmp)
+        assert not isinstance(workers[3].tmp, WorkerHeartbeat)
+        worker_load.write(1, 5, 0.5)
+        gunicorn_conf.child_exit(server, workers[1])
+        gunicorn_conf.child_exit(server, workers[3])
+        assert worker_load.read(1) == (0, 0.0)
+        gunicorn_conf.pre_fork(server, workers[4])
+        assert worker_slots == {1: 0, 3: 2, 5: 1}
+        assert workers[4].load_slot == 1
+
+    def test_worker_heartbeat(
+        self, mocker: MockerFixture, new_worker: Callable[[int], UvicornWorker]
+    ) -> None:
+        """Test that workers notify the arbiter with heartbeats in shared memory."""
+        server = mocker.Mock(cfg=mocker.Mock(preload_app=False))
+        worker = new_worker(1)
+        worker_tmp = worker.tmp
+        gunicorn_conf.pre_fork(server, worker)
+        with pytest.raises(ValueError, match="closed file"):
+            _ = worker_tmp.fileno()
+        heartbeat = worker.tmp
+        assert isinstance(heartbeat, WorkerHeartbeat)
+        assert heartbeat.last_update() == math.inf
+        heartbeat.close()
+        start = time.monotonic()
+        worker.notify()
+        assert start <= heartbeat.last_update() <= time.monotonic()
+        assert heartbeat.fileno() == gunicorn_conf.worker_load.file.fileno()
+
+    @pytest.mark.parametrize("heartbeat,killed", ((-30.0, True), (-10.0, False)))
+    def test_murder_workers(
+        self,
+        heartbeat: float,
+        killed: bool,
+        mocker: MockerFixture,
+        new_worker: Callable[[int], UvicornWorker],
+    ) -> None:
+        """Test that the arbiter reads heartbeats to find workers that timed out."""
+        kill_worker = mocker.Mock()
+        server = mocker.Mock(
+            cfg=mocker.Mock(preload_app=False), kill_worker=kill_worker, timeout=20
+        )
+        worker = new_worker(1)
+        gunicorn_conf.pre_fork(server, worker)
+        worker.aborted = False
+        gunicorn_conf.worker_load.beat(0, time.monotonic() + heartbeat)
+        server.WORKERS = {123: worker}
+        Arbiter.murder_workers(server)
+        assert worker.aborted is killed
+        assert kill_worker.called is killed
+
+    @pytest.mark.parametrize("slot,expected", ((0, {0, 1}), (3, {2, 3})))
+    def test_post_fork(
+        self,
+        expected: set[int],
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        new_worker: Callable[[int], UvicornWorker],
+        slot: int,
+        worker_slots: dict[int, int],
+    ) -> None:
+        """Test that workers are pinned to CPUs by slot."""
+        sched_setaffinity = mocker.patch.object(os, "sched_setaffinity", create=True)
+        monkeypatch.setattr(gunicorn_conf, "cpu_affinity", [{0, 1}, {2, 3}])
+        worker_slots[5] = slot
+        debug = mocker.Mock()
+        server = mocker.Mock(log=mocker.Mock(debug=debug))
+        gunicorn_conf.post_fork(server, new_worker(5))
+        sched_setaffinity.assert_called_once_with(0, expected)
+        debug.assert_called_once_with(
+            f"Pinned worker in slot {slot} to CPUs {sorted(expected)}."
+        )
+
+    def test_post_fork_without_cpu_affinity(
+        self,
+        mocker: MockerFixture,
+        new_worker: Callable[[int], UvicornWorker],
+        worker_slots: dict[int, int],
+    ) -> None:
+        """Test that workers are not pinned if `WORKER_CPU_AFFINITY` is not set."""
+        sched_setaffinity = mocker.patch.object(os, "sched_setaffinity", create=True)
+        assert gunicorn_conf.cpu_affinity == []
+        worker_slots[1] = 0
+        gunicorn_conf.post_fork(mocker.Mock(), new_worker(1))
+        sched_setaffinity.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "cpu_list,expected",
+        (("0", {0}), ("0-3,8-9\n", {0, 1, 2, 3, 8, 9}), ("\n", set[int]())),
+    )
+    def test_parse_cpu_list(self, cpu_list: str, expected: set[int]) -> None:
+        """Test parsing lists of CPUs in the kernel's format."""
+        assert gunicorn_conf.parse_cpu_list(cpu_list) == expected
+
+    def test_get_numa_nodes(self, tmp_path: Path) -> None:
+        """Test reading NUMA nodes in order, and skipping invalid nodes."""
+        node_cpu_lists = {"node0": "0-1,4", "node10": "5", "node2": "2-3", "node3": "x"}
+        for node, cpu_list in node_cpu_lists.items():
+            (path := tmp_path / node).mkdir()
+            _ = (path / "cpulist").write_text(cpu_list)
+        _ = (tmp_path / "possible").write_text("0-5")
+        nodes = gunicorn_conf.get_numa_nodes(tmp_path)
+        assert nodes == [{0, 1, 4}, {2, 3}, {5}]
+
+    @pytest.mark.parametrize(
+        "affinity,cores,expected",
+        (
+            (None, 8, []),
+            ("node", 8, [{0, 1, 2}, {4, 5}]),
+            ("cpu", 8, [{0}, {4}, {1}, {5}, {2}]),
+            ("CPU", 3, [{0}, {4}, {1}]),
+        ),
+    )
+    def test_get_cpu_affinity(
+        self,
+        affinity: str | None,
+        cores: int,
+        expected: list[set[int]],
+        mocker: MockerFixture,
+        tmp_path: Path,
+    ) -> None:
+        """Test spreading workers across the allowed CPUs of NUMA nodes."""
+        _ = mocker.patch.object(os, "sched_setaffinity", create=True)
+        _ = mocker.patch.object(
+            os, "sched_getaffinity", create=True, return_value={0, 1, 2, 4, 5}
+        )
+        _ = mocker.patch.object(
+            gunicorn_conf, "get_cpu_count", return_value=(cores, "cpu_count")
+        )
+        for node, cpu_list in (("node0", "0-3"), ("node1", "4-7"), ("node2", "8-9")):
+            (path := tmp_path / node).mkdir()
+            _ = (path / "cpulist").write_text(cpu_list)
+        cpu_affinity = gunicorn_conf.get_cpu_affinity(affinity, tmp_path, tmp_path)
+        assert cpu_affinity == expected
+
+    def test_get_cpu_affinity_without_numa_nodes(
+        self, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        """Test that the allowed CPUs are used if NUMA nodes are not available."""
+        _ = mocker.patch.object(os, "sched_setaffinity", create=True)
+        _ = mocker.patch.object(
+            os, "sched_getaffinity", create=True, return_value={0, 1}
+        )
+        assert gunicorn_conf.get_cpu_affinity("node", node_path=tmp_path) == [{0, 1}]
+
+    def test_get_cpu_affinity_unsupported(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that workers are not pinned if CPU affinity is not supported."""
+        monkeypatch.delattr(os, "sched_setaffinity", raising=False)
+        assert gunicorn_conf.get_cpu_affinity("cpu") == []
+
+    def test_get_cpu_affinity_incorrect(self) -> None:
+        """Test that an invalid CPU affinity raises an error."""
+        with pytest.raises(ValueError, match="Invalid CPU affinity: socket"):
+            _ = gunicorn_conf.get_cpu_affinity("socket")
+
+
+class TestWorkerAutoscaler:
+    """Test scaling the number of Gunicorn workers with load.
+    ---
+    """
+
+    @pytest.fixture
+    def autoscaler(self) -> gunicorn_conf.WorkerAutoscaler:
+        autoscaler = gunicorn_conf.WorkerAutoscaler(
+            2, 4, WorkerLoad(8), target_requests=8
+        )
+        autoscaler.scaled_at = -math.inf
+        return autoscaler
+
+    @pytest.mark.parametrize(
+        "workers,requests,lag,backlog,expected",
+        (
+            (1, 0, 0.0, 0, 1),
+            (5, 100, 0.0, 0, -1),
+            (2, 17, 0.0, 0, 1),
+            (2, 0, 0.2, 0, 1),
+            (2, 0, 0.0, 3, 1),
+            (4, 100, 1.0, 3, 0),
+            (3, 9, 0.0, 0, 0),
+            (3, 8, 0.0, 0, -1),
+            (3, 8, 0.06, 0, 0),
+            (2, 0, 0.0, 0, 0),
+        ),
+    )
+    def test_scale(
+        self,
+        autoscaler: gunicorn_conf.WorkerAutoscaler,
+        backlog: int,
+        expected: int,
+        lag: float,
+        requests: int,
+        workers: int,
+    ) -> None:
+        """Test scaling up and down between thresholds and bounds."""
+        assert autoscaler.scale(workers, requests, lag, backlog) == expected
+
+    def test_scale_cooldown(self, autoscaler: gunicorn_conf.WorkerAutoscaler) -> None:
+        """Test that the number of workers doesn't change during the cooldown."""
+        autoscaler.scaled_at = time.monotonic()
+        assert autoscaler.scale(2, 100, 0.0, 0) == 0
+
+    @pytest.mark.parametrize(
+        "requests,expected_signal",
+        ((26, signal.SIGTTIN), (0, signal.SIGTTOU), (12, None)),
+    )
+    def test_check(
+        self,
+        autoscaler: gunicorn_conf.WorkerAutoscaler,
+        expected_signal: signal.Signals | None,
+        mocker: MockerFixture,
+        requests: int,
+    ) -> None:
+        """Test that the arbiter is signaled to add or remove a worker.
 
-    @pytest.mark.parametrize("max_workers", (None, "1", "2", "5", "10"))
-    def test_calculate_workers_max(self, max_workers: str | None) -> None:
-        """Test Gunicorn worker process calculation with custom maximum."""
-        cores = multiprocessing.cpu_count()
-        default = max(cores, 2)
-        result = gunicorn_conf.calculate_workers(max_workers, None)
-        if max_workers and default > (m := int(max_workers)):
-            assert result == m
+        The load of each worker is read from the table the worker was forked with,
+        like a previous table for a worker forked before Gunicorn reloaded.
+        """
+        kill = mocker.patch.object(os, "kill")
+        previous_load = WorkerLoad(8)
+        workers = {}
+        for pid in range(3):
+            load = previous_load if pid == 2 else autoscaler.load
+            worker = mocker.Mock(spec=UvicornWorker, load=load, load_slot=pid)
+            load.write(pid, requests // 2 if pid else 0, 0.0)
+            workers[pid] = worker
+        workers[3] = mocker.Mock(spec=UvicornWorker, load_slot=None)
+        workers[4] = mocker.Mock()
+        workers[5] = mocker.Mock(spec=UvicornWorker, load=None, load_slot=5)
+        listeners = [mocker.Mock(get_backlog=mocker.Mock(return_value=-1))]
+        info = mocker.Mock()
+        server = mocker.Mock(
+            LISTENERS=listeners,
+            WORKERS=workers,
+            log=mocker.Mock(info=info),
+            num_workers=3,
+            pid=1,
+        )
+        change = autoscaler.check(server)
+        if expected_signal is None:
+            assert change == 0
+            kill.assert_not_called()
         else:
-            assert result == default
-
-    @pytest.mark.parametrize("total_workers", (None, "1", "2", "5", "10"))
-    def test_calculate_workers_total(self, total_workers: str | None) -> None:
-        """Test Gunicorn worker process calculation with custom total."""
-        cores = multiprocessing.cpu_count()
-        result = gunicorn_conf.calculate_workers(None, total_workers)
-        assert result == int(total_workers) if total_workers else max(cores, 2)
-
-    @pytest.mark.parametrize("workers_per_core", ("0.5", "1.5", "5", "10"))
-    def test_calculate_workers_per_core(self, workers_per_core: str) -> None:
-        """Test Gunicorn worker process calculation with custom workers per core.
-        Worker number should be the greater of 2 or the workers per core setting.
+            kill.assert_called_once_with(1, expected_signal)
+            info.assert_called_once()
+
+    def test_run(
+        self, autoscaler: gunicorn_conf.WorkerAutoscaler, mocker: MockerFixture
+    ) -> None:
+        """Test that the load is checked periodically until the autoscaler stops."""
+        autoscaler.load.interval = 0.01
+        checked = threading.Event()
+
+        def check_load(_: object) -> None:
+            checked.set()
+
+        check = mocker.patch.object(autoscaler, "check", side_effect=check_load)
+        server = mocker.Mock()
+        autoscaler.start(server)
+        assert checked.wait(timeout=1)
+        autoscaler.stop()
+        check.assert_called_with(server)
+
+    def test_hooks(
+        self,
+        autoscaler: gunicorn_conf.WorkerAutoscaler,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test that Gunicorn server hooks start and stop the autoscaler."""
+        start = mocker.patch.object(autoscaler, "start")
+        monkeypatch.setattr(gunicorn_conf, "autoscaler", autoscaler)
+        server = mocker.Mock(cfg=mocker.Mock(preload_app=False))
+        gunicorn_conf.when_ready(server)
+        start.assert_called_once_with(server)
+        gunicorn_conf.on_exit(server)
+        assert autoscaler.stopped.is_set()
+
+    def test_hooks_without_autoscaler(self, mocker: MockerFixture) -> None:
+        """Test that Gunicorn server hooks do nothing if autoscaling is disabled."""
+        assert gunicorn_conf.autoscaler is None
+        server = mocker.Mock(autoscaler=None, cfg=mocker.Mock(preload_app=False))
+        gunicorn_conf.when_ready(server)
+        gunicorn_conf.on_reload(server)
+        gunicorn_conf.on_exit(server)
+        assert not server.mock_calls
+
+    def test_on_reload(
+        self,
+        autoscaler: gunicorn_conf.WorkerAutoscaler,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test that the autoscaler started before Gunicorn reloads the configuration
+        is stopped, and the autoscaler of the new configuration is started.
         """
-        cores = multiprocessing.cpu_count()
-        result = gunicorn_conf.calculate_workers(workers_per_core=workers_per_core)
-        assert result == max(int(float(workers_per_core) * cores), 2)
+        previous = gunicorn_conf.WorkerAutoscaler(2, 4, WorkerLoad(8))
+        server = mocker.Mock()
+        previous.start(server)
+        assert server.autoscaler is previous
+        monkeypatch.setattr(gunicorn_conf, "autoscaler", autoscaler)
+        gunicorn_conf.on_reload(server)
+        assert previous.stopped.is_set()
+        assert server.autoscaler is autoscaler
+        gunicorn_conf.on_reload(server)
+        assert not autoscaler.stopped.is_set()
+        monkeypatch.setattr(gunicorn_conf, "autoscaler", None)
+        gunicorn_conf.on_reload(server)
+        assert autoscaler.stopped.is_set()
 
-    @pytest.mark.parametrize("max_workers", ("1", "2", "5", "10"))
-    @pytest.mark.parametrize("total_workers", ("1", "2", "5", "10"))
-    def test_calculate_workers_both_max_and_total(
-        self, max_workers: str, total_workers: str
+    @pytest.mark.parametrize("preload_app", (False, True))
+    @pytest.mark.usefixtures("worker_load", "worker_slots")
+    def test_when_ready_preload_app(
+        self,
+        mocker: MockerFixture,
+        new_worker: Callable[[int], UvicornWorker],
+        preload_app: bool,
     ) -> None:
-        """Test Gunicorn worker process calculation if max workers and total workers
-        (web concurrency) are both set. Worker number should be the lesser of the two.
+        """Test that objects are frozen once before workers are forked if the app is
+        preloaded, and that garbage collection is enabled again in the arbiter, so
+        that workers the arbiter replaces can be collected.
         """
-        result = gunicorn_conf.calculate_workers(max_workers, total_workers)
-        assert result == min(int(max_workers), int(total_workers))
+        freeze = mocker.patch.object(gc, "freeze")
+        server = mocker.Mock(cfg=mocker.Mock(preload_app=preload_app))
+        gc.disable()
+        try:
+            gunicorn_conf.when_ready(server)
+            assert gc.isenabled() is preload_app
+        finally:
+            gc.enable()
+        worker = new_worker(1)
+        gunicorn_conf.pre_fork(server, worker)
+        gunicorn_conf.child_exit(server, worker)
+        assert freeze.call_count == int(preload_app)
+        # Workers are in a reference cycle through the Uvicorn config callback
+        reference = weakref.ref(worker)
+        del worker
+        _ = gc.collect()
+        assert reference() is None
 
-    @pytest.mark.parametrize("max_workers", ("1", "2", "5", "10"))
-    @pytest.mark.parametrize("workers_per_core", ("0.5", "1.5", "5", "10"))
-    def test_calculate_workers_both_max_and_workers_per_core(
-        self, max_workers: str, workers_per_core: str
+    @pytest.mark.parametrize("freeze_count,disabled", ((0, True), (1, False)))
+    def test_preload_app_gc(
+        self,
+        disabled: bool,
+        freeze_count: int,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
     ) -> None:
-        """Test Gunicorn worker process calculation if max workers and workers per core
-        are both set. Worker number should always be less than the maximum.
+        """Test that garbage collection is disabled when the configuration file is
+        loaded with `PRELOAD_APP`, but not when Gunicorn loads it again on reload,
+        after objects have been frozen.
         """
-        result = gunicorn_conf.calculate_workers(
-            max_workers, None, workers_per_core=workers_per_core
-        )
-        assert result <= int(max_workers)
+        disable = mocker.patch.object(gc, "disable")
+        _ = mocker.patch.object(gc, "get_freeze_count", return_value=freeze_count)
+        monkeypatch.setenv("PRELOAD_APP", "true")
+        _ = runpy.run_path(gunicorn_conf.__file__)
+        assert disable.called is disabled
+
+
+class TestMetrics:
+    """Test preparing the directory for metrics from Gunicorn workers.
+    ---
+    """
+
+    def test_hooks(self, metrics_dir: Path, mocker: MockerFixture) -> None:
+        """Test that metrics from previous runs are removed when Gunicorn starts,
+        and that metrics from workers that exit are archived.
+        """
+        (metrics_dir / "1.metrics").touch()
+        server = mocker.Mock(log=None)
+        gunicorn_conf.on_starting(server)
+        assert not list(metrics_dir.iterdir())
+        metric_file = MetricFile(metrics_dir / "1001.metrics")
+        metric_file.add("key", 1.0)
+        metric_file.close()
+        gunicorn_conf.child_exit(server, mocker.Mock(age=1, pid="1001"))
+        assert [path.name for path in metrics_dir.iterdir()] == [ARCHIVE_FILE]
+        gunicorn_conf.on_exit(server)
+        assert metrics_dir.is_dir()
+
+    def test_hooks_temporary_directory(
+        self, mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        """Test that a temporary directory is used for metrics if `METRICS_DIR` is
+        not set, and removed when Gunicorn exits.
+        """
+        monkeypatch.setattr(gunicorn_conf, "metrics_dir", None)
+        monkeypatch.setattr(gunicorn_conf, "worker_tmp_dir", str(tmp_path))
+        server = mocker.Mock(log=None)
+        gunicorn_conf.on_starting(server)
+        directory = Path(os.environ["METRICS_DIR"])
+        assert directory.parent == tmp_path
+        assert directory.name.startswith("inboard-metrics-")
+        gunicorn_conf.on_exit(server)
+        assert not directory.exists()
+        assert "METRICS_DIR" not in os.environ
+        gunicorn_conf.child_exit(server, mocker.Mock(age=1, pid="1001"))
+
+
+class TestCalculateWorkers:
+    """Test calculation of the number of Gunicorn worker processes.
+    ---
+    """
+
+    def test_calculate_workers_default(self) -> None:
+        """Test default number of Gunicorn worker processes."""
+        cores, _ = resources.get_cpu_count()
+        assert gunicorn_conf.workers >= 2
+        assert gunicorn_conf.workers == max(cores, 2)
 
 
 class TestGunicornSettings:
@@ -108,7 +618,8 @@ class TestGunicornSettings:
         assert "keepalive=5" in captured_and_cleaned
         assert "loglevel=info" in captured_and_cleaned
         assert "timeout=120" in captured_and_cleaned
-        assert f"workers={max(multiprocessing.cpu_count(), 2)}" in captured_and_cleaned
+        cores, _ = resources.get_cpu_count()
+        assert f"workers={max(cores, 2)}" in captured_and_cleaned
 
     @pytest.mark.parametrize("module", ("base", "fastapi", "starlette"))
     @pytest.mark.timeout(2)
@@ -129,6 +640,7 @@ class TestGunicornSettings:
         monkeypatch.setenv("LOG_FORMAT", "verbose")
         monkeypatch.setenv("LOG_LEVEL", "debug")
         monkeypatch.setenv("LOGGING_CONF", logging_conf_file)
+        monkeypatch.setenv("MAX_REQUESTS", "1000")
         monkeypatch.setenv("MAX_WORKERS", "10")
         monkeypatch.setenv("TIMEOUT", "240")
         monkeypatch.setenv("WEB_CONCURRENCY", "15")
@@ -151,5 +663,134 @@ class TestGunicornSettings:
         assert "graceful_timeout=240" in captured_and_cleaned
         assert "keepalive=10" in captured_and_cleaned
         assert "loglevel=debug" in captured_and_cleaned
+        assert "max_requests=1000" in captured_and_cleaned
+        assert "max_requests_jitter=100" in captured_and_cleaned
         assert "timeout=240" in captured_and_cleaned
         assert "workers=10" in captured_and_cleaned
+
+    @pytest.mark.timeout(2)
+    def test_gunicorn_config_with_autoscale(
+        self, capfd: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that the initial number of workers is within the autoscaling bounds."""
+        monkeypatch.setenv("AUTOSCALE", "true")
+        monkeypatch.setenv("AUTOSCALE_MAX_WORKERS", "3")
+        monkeypatch.setenv("WEB_CONCURRENCY", "5")
+        gunicorn_options = [
+            "gunicorn",
+            "--print-config",
+            "-c",
+            gunicorn_conf.__file__,
+            "inboard.app.main_base:app",
+        ]
+        _ = subprocess.run(gunicorn_options)
+        captured = capfd.readouterr()
+        assert "workers=3" in captured.out.replace(" ", "").splitlines()
+
+    @pytest.mark.subprocess
+    @pytest.mark.timeout(10)
+    def test_gunicorn_autoscale(
+        self, monkeypatch: pytest.MonkeyPatch, unused_tcp_port: int
+    ) -> None:
+        """Test that an idle Gunicorn server scales down to the minimum workers."""
+        monkeypatch.setenv("AUTOSCALE", "true")
+        monkeypatch.setenv("AUTOSCALE_COOLDOWN", "0")
+        monkeypatch.setenv("AUTOSCALE_INTERVAL", "0.2")
+        monkeypatch.setenv("AUTOSCALE_MIN_WORKERS", "1")
+        monkeypatch.setenv("PORT", str(unused_tcp_port))
+        monkeypatch.setenv("WEB_CONCURRENCY", "2")
+        gunicorn_options = [
+            "gunicorn",
+            "-c",
+            gunicorn_conf.__file__,
+            "-k",
+            "inboard.gunicorn_workers.UvicornWorker",
+            "inboard.app.main_base:app",
+        ]
+        with subprocess.Popen(
+            gunicorn_options,
+            stderr=subprocess.STDOUT,
+            stdout=subprocess.PIPE,
+            text=True,
+        ) as process:
+            time.sleep(3)
+            process.terminate()
+            output, _ = process.communicate(timeout=5)
+        assert "Autoscaling to 1 workers" in output
+
+    @pytest.mark.timeout(2)
+    def test_gunicorn_config_with_preload_app(
+        self, capfd: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that the app is preloaded if `PRELOAD_APP` is set."""
+        monkeypatch.setenv("PRELOAD_APP", "true")
+        gunicorn_options = [
+            "gunicorn",
+            "--print-config",
+            "-c",
+            gunicorn_conf.__file__,
+            "inboard.app.main_base:app",
+        ]
+        _ = subprocess.run(gunicorn_options)
+        captured = capfd.readouterr()
+        assert "preload_app=True" in captured.out.replace(" ", "").splitlines()
+
+    @pytest.mark.subprocess
+    @pytest.mark.timeout(10)
+    def test_gunicorn_preload_app(
+        self, monkeypatch: pytest.MonkeyPatch, unused_tcp_port: int
+    ) -> None:
+        """Test that workers serve requests with an app preloaded in the arbiter."""
+        monkeypatch.setenv("PORT", str(unused_tcp_port))
+        monkeypatch.setenv("PRELOAD_APP", "true")
+        monkeypatch.setenv("WEB_CONCURRENCY", "2")
+        gunicorn_options = [
+            "gunicorn",
+            "-c",
+            gunicorn_conf.__file__,
+            "-k",
+            "inboard.gunicorn_workers.UvicornWorker",
+            "inboard.app.main_base:app",
+        ]
+        with subprocess.Popen(gunicorn_options) as process:
+            time.sleep(3)
+            response = httpxyz.get(f"http://127.0.0.1:{unused_tcp_port}/")
+            process.terminate()
+            _ = process.wait(timeout=5)
+        assert response.status_code == 200
+
+    @pytest.mark.skipif(
+        not gunicorn_conf.supports_reuse_port(), reason="requires SO_REUSEPORT"
+    )
+    @pytest.mark.subprocess
+    @pytest.mark.timeout(10)
+    def test_gunicorn_reuse_port(
+        self,
+        capfd: pytest.CaptureFixture[str],
+        monkeypatch: pytest.MonkeyPatch,
+        unused_tcp_port: int,
+    ) -> None:
+        """Test that workers serve requests from their own `SO_REUSEPORT` sockets."""
+        monkeypatch.setenv("PORT", str(unused_tcp_port))
+        monkeypatch.setenv("REUSE_PORT", "true")
+        monkeypatch.setenv("WEB_CONCURRENCY", "2")
+        gunicorn_options = [
+            "gunicorn",
+            "-c",
+            gunicorn_conf.__file__,
+            "-k",
+            "inboard.gunicorn_workers.UvicornWorker",
+            "inboard.app.main_base:app",
+        ]
+        _ = subprocess.run(
+            [*gunicorn_options[:3], "--print-config", *gunicorn_options[3:]]
+        )
+        assert "reuse_port=True" in capfd.readouterr().out.replace(" ", "").splitlines()
+        with subprocess.Popen(gunicorn_options) as process:
+            time.sleep(3)
+            responses = [
+                httpxyz.get(f"http://127.0.0.1:{unused_tcp_port}/") for _ in range(4)
+            ]
+            process.terminate()
+            _ = process.wait(timeout=5)
+        assert all(response.status_code == 200 for response in responses)
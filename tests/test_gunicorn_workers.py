@@ -1,14 +1,18 @@
 from __future__ import annotations
 
-import contextlib
+import asyncio
+import logging
+import math
+import mmap
+import os
+import re
 import signal
-import socket
 import ssl
 import subprocess
 import sys
 import tempfile
 import time
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, cast
 
 import httpxyz
 import pytest
@@ -16,9 +20,11 @@ import trustme
 
 if TYPE_CHECKING:
     from collections.abc import Generator
+    from pathlib import Path
     from ssl import SSLContext
     from typing import IO
 
+    from pytest_mock import MockerFixture
     from uvicorn._types import (
         ASGIReceiveCallable,
         ASGISendCallable,
@@ -28,6 +34,8 @@ if TYPE_CHECKING:
         Scope,
     )
 
+    from inboard.gunicorn_workers import UvicornWorker
+
 pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="requires unix")
 pytestmarks = [pytest.mark.subprocess, pytest.mark.timeout(60)]
 gunicorn_arbiter = pytest.importorskip("gunicorn.arbiter", reason="requires gunicorn")
@@ -127,17 +135,6 @@ def tls_certificate_server_cert_path(
         yield cert_pem_path
 
 
-def _unused_port(socket_type: int) -> int:
-    with contextlib.closing(socket.socket(type=socket_type)) as sock:
-        sock.bind(("127.0.0.1", 0))
-        return int(sock.getsockname()[1])
-
-
-@pytest.fixture
-def unused_tcp_port() -> int:
-    return _unused_port(socket.SOCK_STREAM)
-
-
 @pytest.fixture(
     params=(
         pytest.param(gunicorn_workers_gasgi.ASGIWorker, marks=pytestmarks),
@@ -331,3 +328,211 @@ def test_worker_get_request(gunicorn_process: Process) -> None:
     assert response.status_code == 204
     assert "gunicorn" in output_text
     assert "Listening" in output_text
+
+
+@pytest.fixture
+def uvicorn_worker() -> Generator[UvicornWorker, None, None]:
+    """Yield a Uvicorn worker instance that has not been forked or initialized."""
+    from gunicorn.config import Config
+    from gunicorn.glogging import Logger
+
+    from inboard.gunicorn_workers import UvicornWorker
+
+    cfg = Config()
+    worker = UvicornWorker(0, os.getpid(), [], None, 30, cfg, Logger(cfg))
+    yield worker
+    worker.tmp.close()
+    for name in ("uvicorn.access", "uvicorn.error"):
+        logger = logging.getLogger(name)
+        logger.handlers = []
+        logger.propagate = True
+        logger.setLevel(logging.NOTSET)
+
+
+def test_worker_uvicorn_config_options(
+    mocker: MockerFixture,
+    monkeypatch: pytest.MonkeyPatch,
+    request: pytest.FixtureRequest,
+) -> None:
+    """Test that options in `UVICORN_CONFIG_OPTIONS` are passed to Uvicorn, except
+    for options that are set by Gunicorn, like `limit_max_requests`, which is set
+    from `MAX_REQUESTS` and `MAX_REQUESTS_JITTER`.
+    """
+    from gunicorn.glogging import Logger
+
+    options = (
+        '{"http": "h11", "limit_concurrency": 100, "limit_max_requests": 10, '
+        + '"port": 9000, "reload": true}'
+    )
+    monkeypatch.setenv("UVICORN_CONFIG_OPTIONS", options)
+    warning = mocker.patch.object(Logger, "warning")
+    uvicorn_worker = cast("UvicornWorker", request.getfixturevalue("uvicorn_worker"))
+    assert uvicorn_worker.config.http == "h11"
+    assert uvicorn_worker.config.limit_concurrency == 100
+    assert uvicorn_worker.config.limit_max_requests == uvicorn_worker.max_requests
+    assert uvicorn_worker.config.port == 8000
+    assert uvicorn_worker.config.reload is False
+    warning.assert_called_once()
+    assert "Ignoring limit_max_requests" in warning.call_args.args[0]
+
+
+def test_worker_load(tmp_path: Path) -> None:
+    """Test writing and reading worker heartbeats and load in shared memory.
+
+    Values are aligned to 8 bytes, so that each value is written in one store.
+    """
+    from inboard.gunicorn_workers import WorkerLoad
+
+    assert WorkerLoad.HEARTBEAT.size == 8
+    assert WorkerLoad.SLOT_SIZE == 24
+    load = WorkerLoad(2, directory=str(tmp_path))
+    assert not list(tmp_path.iterdir())
+    load.write(1, 5, 0.25)
+    load.beat(1, 100.0)
+    assert load.read(0) == (0, 0.0)
+    assert load.read(1) == (5, 0.25)
+    assert load.last_beat(0) == 0.0
+    assert load.last_beat(1) == 100.0
+    load.beat(1)
+    assert 100.0 < load.last_beat(1) <= time.monotonic()
+    load.write(1)
+    assert load.read(1) == (0, 0.0)
+
+
+def test_worker_report_load(
+    mocker: MockerFixture, uvicorn_worker: UvicornWorker
+) -> None:
+    """Test that the worker reports in-flight requests and event loop lag."""
+    from inboard.gunicorn_workers import WorkerLoad
+
+    uvicorn_worker.load = load = WorkerLoad(1, interval=0.01)
+    uvicorn_worker.load_slot = 0
+    server = mocker.Mock(server_state=mocker.Mock(tasks={mocker.Mock()}))
+    server.should_exit = False
+
+    def write(slot: int, requests: int, lag: float) -> None:
+        server.should_exit = True
+        WorkerLoad.write(load, slot, requests, lag)
+
+    _ = mocker.patch.object(load, "write", side_effect=write)
+    asyncio.run(uvicorn_worker._monitor(server))  # pyright: ignore[reportPrivateUsage]
+    requests, lag = load.read(0)
+    assert requests == 1
+    assert lag >= 0
+
+
+def test_worker_loop_lag(mocker: MockerFixture, uvicorn_worker: UvicornWorker) -> None:
+    """Test that the worker measures event loop lag, and warns if it's blocked."""
+    debug = mocker.patch.object(uvicorn_worker.log, "debug")
+    warning = mocker.patch.object(uvicorn_worker.log, "warning")
+    uvicorn_worker.MONITOR_INTERVAL = 0.01
+    uvicorn_worker.lag_warning = 0.02
+    server = mocker.Mock(should_exit=False)
+
+    async def block() -> None:
+        monitor = asyncio.create_task(uvicorn_worker._monitor(server))  # pyright: ignore[reportPrivateUsage]
+        await asyncio.sleep(0)
+        time.sleep(0.05)
+        await asyncio.sleep(0.02)
+        server.should_exit = True
+        await monitor
+
+    asyncio.run(block())
+    assert uvicorn_worker.loop_lag.quantile(1) >= 0.025
+    assert debug.call_args.kwargs["extra"]["metric"] == "inboard.worker.loop_lag"
+    warning.assert_called_once()
+    message = cast("str", warning.call_args.args[0])
+    assert "Event loop blocked for" in message
+    assert re.search(r"\(p50 [\d.]+s, p99 [\d.]+s over", message)
+
+
+def test_loop_lag() -> None:
+    """Test counting event loop lag in a rolling histogram."""
+    from inboard.gunicorn_workers import LoopLag
+
+    loop_lag = LoopLag(window=4)
+    assert loop_lag.quantile(0.5) == 0.0
+    for lag in (10.0, 0.0005, 0.002, 0.002, 0.3):
+        loop_lag.observe(lag)
+    assert sum(loop_lag.counts) == 4
+    assert loop_lag.counts[-1] == 0
+    assert loop_lag.quantile(0.25) == 0.001
+    assert loop_lag.quantile(0.5) == 0.005
+    assert loop_lag.quantile(0.99) == 0.5
+    assert loop_lag.format_quantile(0.99) == "0.5s"
+    for lag in (6.0, 10.0):
+        loop_lag.observe(lag)
+    assert loop_lag.quantile(0.99) == math.inf
+    assert loop_lag.format_quantile(0.99) == ">5s"
+
+
+def test_get_private_memory(tmp_path: Path) -> None:
+    """Test reading the private memory of the current process, if available,
+    from `smaps_rollup`, or from `statm` if `smaps_rollup` can't be read.
+    """
+    from inboard.gunicorn_workers import get_private_memory
+
+    assert (get_private_memory() or 1) > 0
+    smaps_rollup_path, statm_path = tmp_path / "smaps_rollup", tmp_path / "statm"
+    assert get_private_memory(smaps_rollup_path, statm_path) is None
+    _ = statm_path.write_text("100 25 10 1 0 20 0\n")
+    assert get_private_memory(smaps_rollup_path, statm_path) == 15 * mmap.PAGESIZE
+    smaps_rollup = (
+        "Rss: 1252 kB",
+        "Shared_Clean: 1108 kB",
+        "Private_Clean: 40 kB",
+        "Private_Dirty: 104 kB",
+        "Private_Hugetlb: 0 kB",
+    )
+    _ = smaps_rollup_path.write_text("\n".join(smaps_rollup))
+    assert get_private_memory(smaps_rollup_path, statm_path) == 144 * 1024
+    _ = smaps_rollup_path.write_text("Private_Dirty:\n")
+    assert get_private_memory(smaps_rollup_path, statm_path) == 15 * mmap.PAGESIZE
+
+
+@pytest.mark.parametrize(
+    "max_rss,jitter,expected",
+    ((None, None, (None, None)), ("512", "0", (512, 512)), ("500", None, (450, 500))),
+)
+def test_get_max_rss(
+    expected: tuple[float | None, float | None],
+    jitter: str | None,
+    max_rss: str | None,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that the RSS limit is lowered by a random jitter for each worker."""
+    from inboard.gunicorn_workers import get_max_rss
+
+    for name, value in (
+        ("WORKER_MAX_RSS_MB", max_rss),
+        ("WORKER_MAX_RSS_JITTER_MB", jitter),
+    ):
+        if value is None:
+            monkeypatch.delenv(name, raising=False)
+        else:
+            monkeypatch.setenv(name, value)
+    result = get_max_rss()
+    low, high = expected
+    if low is None or high is None:
+        assert result is None
+    else:
+        assert result is not None
+        assert low * 2**20 <= result <= high * 2**20
+
+
+def test_worker_max_rss(mocker: MockerFixture, uvicorn_worker: UvicornWorker) -> None:
+    """Test that the worker exits gracefully if its private memory exceeds the
+    limit.
+    """
+    _ = mocker.patch("inboard.gunicorn_workers.get_private_memory", return_value=2**30)
+    info = mocker.patch.object(uvicorn_worker.log, "info")
+    uvicorn_worker.MONITOR_INTERVAL = 0.01
+    uvicorn_worker.max_rss = 2**29
+    from uvicorn.server import Server
+
+    server = Server(config=uvicorn_worker.config)
+    asyncio.run(uvicorn_worker._monitor(server))  # pyright: ignore[reportPrivateUsage]
+    assert server.should_exit is True
+    info.assert_called_once_with(
+        "Worker private memory 1024 MB exceeds 512 MB. Restarting worker."
+    )
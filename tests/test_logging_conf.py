@@ -1,18 +1,26 @@
 from __future__ import annotations
 
+import io
+import json
 import logging
 import os
-from typing import TYPE_CHECKING
+import sys
+import time
+import zlib
+from typing import TYPE_CHECKING, TextIO
 
 import pytest
 
 from inboard import logging_conf
 
 if TYPE_CHECKING:
+    from collections.abc import Generator
     from pathlib import Path
 
     from pytest_mock import MockerFixture
 
+    from inboard.types import DictConfig
+
 
 class TestConfigureLogging:
     """Test logging configuration method.
@@ -153,6 +161,72 @@ class TestConfigureLogging:
         )
 
 
+class TestLoadLoggingConf:
+    """Test loading logging configuration dictionaries without applying them.
+    ---
+    """
+
+    def test_find_and_load_logging_conf_cache(
+        self,
+        logging_conf_cache: dict[tuple[str, int], DictConfig],
+        logging_conf_tmp_file_path: Path,
+    ) -> None:
+        """Test that logging configuration files are only loaded again if modified."""
+        logging_conf_file = logging_conf_tmp_file_path / "tmp_log.py"
+        logging_conf_dict = logging_conf.find_and_load_logging_conf(
+            str(logging_conf_file)
+        )
+        assert len(logging_conf_cache) == 1
+        assert (
+            logging_conf.find_and_load_logging_conf(str(logging_conf_file))
+            is logging_conf_dict
+        )
+        mtime_ns = logging_conf_file.stat().st_mtime_ns + 1_000_000_000
+        os.utime(logging_conf_file, ns=(mtime_ns, mtime_ns))
+        assert (
+            logging_conf.find_and_load_logging_conf(str(logging_conf_file))
+            is not logging_conf_dict
+        )
+        assert len(logging_conf_cache) == 2
+
+    def test_load_logging_conf_snapshot(
+        self, logging_conf_dict: DictConfig, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that logging configuration snapshots are loaded from the environment
+        instead of loading the logging configuration module again, and that the
+        snapshot is removed from the environment so that it is only loaded once.
+        """
+        snapshot = logging_conf.dump_logging_conf(logging_conf_dict)
+        assert snapshot
+        monkeypatch.setenv("LOGGING_CONF", "no.module.here")
+        monkeypatch.setenv("LOGGING_CONF_SNAPSHOT", snapshot)
+        with pytest.raises(ModuleNotFoundError):
+            _ = logging_conf.load_logging_conf(logging_conf="no.module.here")
+        assert os.environ["LOGGING_CONF_SNAPSHOT"] == snapshot
+        snapshot_dict = logging_conf.load_logging_conf()
+        assert snapshot_dict == logging_conf_dict
+        assert snapshot_dict is not logging_conf_dict
+        assert "LOGGING_CONF_SNAPSHOT" not in os.environ
+        with pytest.raises(ModuleNotFoundError):
+            _ = logging_conf.load_logging_conf()
+
+    def test_load_logging_conf_snapshot_incorrect(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that the logging configuration is loaded if the snapshot is invalid."""
+        monkeypatch.setenv("LOGGING_CONF_SNAPSHOT", "not a snapshot")
+        assert logging_conf.load_logging_conf() is logging_conf.LOGGING_CONFIG
+
+    def test_dump_logging_conf_incorrect(self, logging_conf_dict: DictConfig) -> None:
+        """Test that logging configurations with local classes are not serialized."""
+
+        class LocalFilter(logging.Filter):
+            pass
+
+        logging_conf_dict["filters"] = {"local": {"()": LocalFilter}}
+        assert logging_conf.dump_logging_conf(logging_conf_dict) is None
+
+
 class TestLoggingOutput:
     """Test logger output after configuring logging.
     ---
@@ -172,7 +246,12 @@ class TestLoggingOutput:
 
     @pytest.mark.parametrize(
         "log_format,log_level_output",
-        (("gunicorn", "[DEBUG]"), ("uvicorn", "DEBUG: "), ("verbose", "DEBUG  ")),
+        (
+            ("gunicorn", "[DEBUG]"),
+            ("json", '"level":"DEBUG"'),
+            ("uvicorn", "DEBUG: "),
+            ("verbose", "DEBUG  "),
+        ),
     )
     def test_logging_output_custom_format(
         self,
@@ -265,3 +344,823 @@ class TestLoggingOutput:
             assert "/healthy" not in captured.out
         else:
             assert "/healthy" in captured.out
+
+    @pytest.mark.parametrize(
+        "log_filters_input", ("/health?probe=true", "[bot]", "/metrics.*, (probe)")
+    )
+    def test_logging_filters_with_regex_special_characters(
+        self,
+        capfd: pytest.CaptureFixture[str],
+        log_filters_input: str,
+        mocker: MockerFixture,
+    ) -> None:
+        """Test that log message filters are matched as plain substrings.
+
+        Filters are compiled into a single regular expression, so any regular
+        expression special characters in the filters must be escaped.
+        """
+        filters = logging_conf.LogFilter.set_filters(log_filters_input)
+        assert filters
+        mocker.patch.dict(
+            logging_conf.LOGGING_CONFIG["filters"]["filter_log_message"],
+            {"()": logging_conf.LogFilter, "filters": filters},
+            clear=True,
+        )
+        logger = logging.getLogger("test.logging_conf.output.filterregex")
+        _ = logging_conf.configure_logging(logger=logger)
+        for log_filter in filters:
+            logger.info(f"GET {log_filter} 200")
+        logger.info("GET /health 200")
+        logger.info("GET b 200")
+        captured = capfd.readouterr()
+        for log_filter in filters:
+            assert log_filter not in captured.out
+        assert "GET /health 200" in captured.out
+        assert "GET b 200" in captured.out
+
+    @pytest.mark.parametrize(
+        "access_filters_input,filtered_paths,logged_paths",
+        (
+            ("path=/health", ("/health", "/health?probe=true"), ("/healthy", "/")),
+            ("prefix=/metrics", ("/metrics", "/metrics/workers"), ("/", "/status")),
+            ("method=options, status=3xx", ("/options", "/redirect"), ("/status",)),
+        ),
+    )
+    def test_logging_access_filters(
+        self,
+        access_filters_input: str,
+        capfd: pytest.CaptureFixture[str],
+        filtered_paths: tuple[str, ...],
+        logged_paths: tuple[str, ...],
+        mocker: MockerFixture,
+    ) -> None:
+        """Test that access log filters are applied to structured access log fields.
+
+        Access log records that are filtered out should not be formatted.
+        """
+        access_filters = logging_conf.LogFilter.set_access_filters(access_filters_input)
+        mocker.patch.dict(
+            logging_conf.LOGGING_CONFIG["filters"]["filter_log_message"],
+            {"()": logging_conf.LogFilter, "access_filters": access_filters},
+            clear=True,
+        )
+        get_message = mocker.spy(logging.LogRecord, "getMessage")
+        logger = logging.getLogger("test.logging_conf.output.accessfilters")
+        _ = logging_conf.configure_logging(logger=logger)
+        get_message.reset_mock()
+        for path in filtered_paths:
+            method = "OPTIONS" if path == "/options" else "GET"
+            status = 307 if path == "/redirect" else 200
+            args = ("127.0.0.1:60364", method, path, "1.1", status)
+            logger.info(logging_conf.UVICORN_ACCESS_LOG_FORMAT, *args)
+        get_message.assert_not_called()
+        for path in logged_paths:
+            logger.info(*self._uvicorn_access_log_args(path))
+        captured = capfd.readouterr()
+        for path in filtered_paths:
+            assert f"GET {path} " not in captured.out
+            assert f"OPTIONS {path} " not in captured.out
+        for path in logged_paths:
+            assert f"GET {path} " in captured.out
+
+    def test_logging_access_filters_gunicorn(self) -> None:
+        """Test that access log filters are applied to Gunicorn access log atoms."""
+        log_filter = logging_conf.LogFilter(
+            access_filters=logging_conf.LogFilter.set_access_filters("path=/health")
+        )
+        atoms = {"h": "127.0.0.1", "m": "GET", "U": "/health", "H": "HTTP/1.1"}
+        record = logging.LogRecord(
+            "gunicorn.access", logging.INFO, __file__, 0, "%(r)s", (), None
+        )
+        record.args = {**atoms, "s": "200"}
+        fields = logging_conf.get_access_log_fields(record)
+        assert fields == ("127.0.0.1", "GET", "/health", "1.1", 200)
+        assert log_filter.filter(record) is False
+        record.args = {**atoms, "U": "/status", "s": 200}
+        assert log_filter.filter(record) is True
+        record.name = "gunicorn.error"
+        assert logging_conf.get_access_log_fields(record) is None
+
+    def test_logging_access_filters_non_access_records(self) -> None:
+        """Test that records other than access log records use message filters."""
+        log_filter = logging_conf.LogFilter(
+            filters={"/health"},
+            access_filters=logging_conf.LogFilter.set_access_filters("status=2xx"),
+        )
+        record = logging.LogRecord(
+            "uvicorn.access",
+            logging.INFO,
+            __file__,
+            0,
+            logging_conf.UVICORN_ACCESS_LOG_FORMAT,
+            self._uvicorn_access_log_args("/health")[1:],
+            None,
+        )
+        fields = logging_conf.get_access_log_fields(record)
+        assert fields
+        assert fields.status == 200
+        assert fields == ("127.0.0.1:60364", "GET", "/health", "1.1", 200)
+        record = logging.LogRecord(
+            "uvicorn.error", logging.INFO, __file__, 0, "GET %s", ("/health",), None
+        )
+        assert logging_conf.get_access_log_fields(record) is None
+        assert log_filter.filter(record) is False
+        record.args = ("/status",)
+        assert log_filter.filter(record) is True
+        assert log_filter.match_access_log("GET", "/", 200)
+        assert not logging_conf.LogFilter().match_access_log("GET", "/", 200)
+
+    @pytest.mark.parametrize(
+        "access_filters_input", ("path", "prefix=", "status=200", "host=localhost")
+    )
+    def test_logging_access_filters_incorrect(self, access_filters_input: str) -> None:
+        """Test that incorrect access log filters raise errors."""
+        with pytest.raises(ValueError, match="Invalid access log filter"):
+            _ = logging_conf.LogFilter.set_access_filters(access_filters_input)
+
+    def test_logging_access_filters_from_environment(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that access log filters are read from the environment."""
+        assert logging_conf.LogFilter.set_access_filters() is None
+        monkeypatch.setenv("LOG_ACCESS_FILTERS", "path=/health, prefix=/metrics")
+        access_filters = logging_conf.LogFilter.set_access_filters()
+        assert access_filters == {
+            "paths": frozenset({"/health"}),
+            "path_prefixes": ("/metrics",),
+            "status_classes": frozenset(),
+            "methods": frozenset(),
+        }
+
+
+class TestLogSampleFilter:
+    """Test access log sampling with `LogSampleFilter`.
+    ---
+    """
+
+    def _access_log_record(self, status: int, created: float = 0) -> logging.LogRecord:
+        args = ("127.0.0.1:60364", "GET", "/", "1.1", status)
+        record = logging.LogRecord(
+            "test.logging_conf.sample",
+            logging.INFO,
+            __file__,
+            0,
+            logging_conf.UVICORN_ACCESS_LOG_FORMAT,
+            args,
+            None,
+        )
+        record.created = created
+        return record
+
+    @pytest.mark.parametrize(
+        "sample_rates_input,sample_rates_output",
+        (
+            ("2xx=0.01", {2: 0.01}),
+            ("2xx=0.01, 3XX=0.1", {2: 0.01, 3: 0.1}),
+            ("2xx=0, 4xx=1", {2: 0, 4: 1}),
+        ),
+    )
+    def test_set_sample_rates(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        sample_rates_input: str,
+        sample_rates_output: dict[int, float],
+    ) -> None:
+        """Test that sample rates are parsed from the environment."""
+        assert logging_conf.LogSampleFilter.set_sample_rates() is None
+        monkeypatch.setenv("LOG_SAMPLE_RATES", sample_rates_input)
+        assert logging_conf.LogSampleFilter.set_sample_rates() == sample_rates_output
+
+    @pytest.mark.parametrize(
+        "sample_rates_input", ("2xx", "2xx=1.5", "6xx=0.1", "200=0.1", "2xx=some")
+    )
+    def test_set_sample_rates_incorrect(self, sample_rates_input: str) -> None:
+        """Test that incorrect sample rates raise errors."""
+        with pytest.raises(ValueError, match="Invalid log sample rate"):
+            _ = logging_conf.LogSampleFilter.set_sample_rates(sample_rates_input)
+
+    def test_sample_filter(self) -> None:
+        """Test that access log records are sampled at even intervals per status class.
+
+        Status classes without a sample rate, and other records, are always logged.
+        """
+        sample_filter = logging_conf.LogSampleFilter(rates={2: 0.1, 3: 0})
+        kept = [sample_filter.filter(self._access_log_record(200)) for _ in range(100)]
+        assert kept.count(True) == 10
+        assert not any(
+            sample_filter.filter(self._access_log_record(301)) for _ in range(10)
+        )
+        assert all(
+            sample_filter.filter(self._access_log_record(500)) for _ in range(10)
+        )
+        assert sample_filter.dropped == {2: 90, 3: 10}
+        record = logging.LogRecord(
+            "test", logging.INFO, __file__, 0, "Hello, World!", (), None
+        )
+        assert sample_filter.filter(record)
+        assert logging_conf.LogSampleFilter().filter(self._access_log_record(200))
+
+    def test_sample_filter_request_id(self) -> None:
+        """Test that records are sampled deterministically by request ID."""
+        sample_filters = [logging_conf.LogSampleFilter(rates={2: 0.5}) for _ in "ab"]
+        decisions: list[list[bool]] = []
+        for sample_filter in sample_filters:
+            decisions.append([])
+            for i in range(100):
+                record = self._access_log_record(200)
+                record.request_id = f"request-{i}"
+                decisions[-1].append(sample_filter.filter(record))
+        assert decisions[0] == decisions[1]
+        assert 0 < decisions[0].count(True) < 100
+        assert not sample_filters[0].counts
+
+    def test_sample_filter_request_id_gunicorn(self) -> None:
+        """Test that request IDs are read from Gunicorn access log request headers."""
+        record = logging.LogRecord(
+            "gunicorn.access", logging.INFO, __file__, 0, "%(r)s", (), None
+        )
+        atoms = {"h": "127.0.0.1", "m": "GET", "U": "/", "H": "HTTP/1.1", "s": "200"}
+        record.args = atoms
+        assert logging_conf.LogSampleFilter.get_request_id(record) is None
+        record.args = {**atoms, "{x-request-id}i": "abc123"}
+        assert logging_conf.LogSampleFilter.get_request_id(record) == "abc123"
+        keep = zlib.crc32(b"abc123") < 0.5 * 0x100000000
+        assert logging_conf.LogSampleFilter(rates={2: 0.5}).filter(record) is keep
+        record.args = ("abc123",)
+        assert logging_conf.LogSampleFilter.get_request_id(record) is None
+
+    def test_sample_filter_summary(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test that dropped record counts are logged periodically."""
+        caplog.set_level(logging.INFO)
+        sample_filter = logging_conf.LogSampleFilter(rates={2: 0, 3: 0}, interval=10)
+        assert not sample_filter.filter(self._access_log_record(200, created=100))
+        assert sample_filter.next_summary == 110
+        assert not caplog.records
+        for created in range(101, 110):
+            assert not sample_filter.filter(self._access_log_record(301, created))
+        assert not caplog.records
+        assert not sample_filter.filter(self._access_log_record(200, created=111))
+        assert caplog.records[0].name == "test.logging_conf.sample"
+        assert caplog.records[0].getMessage() == (
+            "Access log sampling dropped 10 records (2xx=1, 3xx=9)."
+        )
+        assert sample_filter.dropped == {2: 1}
+        assert sample_filter.next_summary == 121
+
+    def test_sample_filter_flush(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Test that dropped record counts are logged when log samples are flushed,
+        at the level of the access logger if it is higher than `INFO`.
+        """
+        caplog.set_level(logging.INFO)
+        logger = logging.getLogger("test.logging_conf.sample")
+        sample_filter = logging_conf.LogSampleFilter(rates={2: 0}, interval=10)
+        assert not sample_filter.filter(self._access_log_record(200, created=100))
+        assert sample_filter.logger_name == "test.logging_conf.sample"
+        logger.setLevel(logging.WARNING)
+        try:
+            logging_conf.flush_log_samples()
+        finally:
+            logger.setLevel(logging.NOTSET)
+        assert [(r.levelno, r.getMessage()) for r in caplog.records] == [
+            (logging.WARNING, "Access log sampling dropped 1 records (2xx=1).")
+        ]
+        assert not sample_filter.dropped
+        logging_conf.flush_log_samples()
+        assert len(caplog.records) == 1
+
+
+class TestJsonFormatter:
+    """Test JSON log formatting with `JsonFormatter`.
+    ---
+    """
+
+    def test_json_formatter(self) -> None:
+        """Test that log records are formatted as JSON with a fixed key layout."""
+        formatter = logging_conf.JsonFormatter()
+        record = logging.LogRecord(
+            "test.logging_conf.json",
+            logging.INFO,
+            __file__,
+            0,
+            'Hello, "JSON" World! \u2728 %s',
+            ("\n",),
+            None,
+        )
+        output: dict[str, object] = json.loads(formatter.format(record))  # pyright: ignore[reportAny]
+        assert list(output) == ["time", "level", "logger", "process", "message"]
+        assert output["level"] == "INFO"
+        assert output["logger"] == "test.logging_conf.json"
+        assert output["process"] == record.process
+        assert output["message"] == 'Hello, "JSON" World! \u2728 \n'
+        assert str(output["time"]).startswith(
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+        )
+        record.process = None
+        assert json.loads(formatter.format(record))["process"] is None
+
+    def test_json_formatter_access_log(self) -> None:
+        """Test that structured fields are added from access log records."""
+        formatter = logging_conf.JsonFormatter()
+        args = ("127.0.0.1:60364", "GET", "/status?verbose=true", "1.1", 200)
+        record = logging.LogRecord(
+            "uvicorn.access",
+            logging.INFO,
+            __file__,
+            0,
+            logging_conf.UVICORN_ACCESS_LOG_FORMAT,
+            args,
+            None,
+        )
+        output: dict[str, object] = json.loads(formatter.format(record))  # pyright: ignore[reportAny]
+        assert output["message"] == (
+            '127.0.0.1:60364 - "GET /status?verbose=true HTTP/1.1" 200'
+        )
+        assert output["client"] == "127.0.0.1:60364"
+        assert output["method"] == "GET"
+        assert output["path"] == "/status?verbose=true"
+        assert output["http_version"] == "1.1"
+        assert output["status"] == 200
+
+    def test_json_formatter_exception(self) -> None:
+        """Test that exceptions and stack info are added to JSON log records."""
+        formatter = logging_conf.JsonFormatter()
+        try:
+            raise RuntimeError("Testing JSON exception formatting")
+        except RuntimeError:
+            exc_info = sys.exc_info()
+        record = logging.LogRecord(
+            "test.logging_conf.json",
+            logging.ERROR,
+            __file__,
+            0,
+            "Error",
+            (),
+            exc_info,
+            sinfo="Stack (most recent call last):",
+        )
+        output: dict[str, object] = json.loads(formatter.format(record))  # pyright: ignore[reportAny]
+        assert "RuntimeError: Testing JSON exception" in str(output["exc_info"])
+        assert output["stack_info"] == "Stack (most recent call last):"
+
+
+class TestLogLevels:
+    """Test per-logger log levels set with `set_log_levels`.
+    ---
+    """
+
+    def test_set_log_levels(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that log levels are parsed from comma-separated items."""
+        assert logging_conf.set_log_levels() == {}
+        monkeypatch.setenv("LOG_LEVELS", " uvicorn.access = warning, fastapi=DEBUG")
+        assert logging_conf.set_log_levels() == {
+            "uvicorn.access": "WARNING",
+            "fastapi": "DEBUG",
+        }
+
+    @pytest.mark.parametrize(
+        "log_levels", ("uvicorn.access", "=debug", "fastapi=loud", "fastapi=debug,")
+    )
+    def test_set_log_levels_incorrect(self, log_levels: str) -> None:
+        """Test that incorrect log levels raise errors."""
+        with pytest.raises(ValueError, match="Invalid log level"):
+            _ = logging_conf.set_log_levels(log_levels)
+
+    def test_log_levels_module(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that log levels are set in the inboard logging configuration module."""
+        monkeypatch.setenv("LOG_LEVELS", "uvicorn.access=warning")
+        logging_conf_dict = logging_conf.find_and_load_logging_conf(
+            "inboard.logging_conf"
+        )
+        assert logging_conf_dict["loggers"]["uvicorn.access"] == {
+            "level": "WARNING",
+            "propagate": True,
+        }
+
+    def test_log_levels_config(
+        self,
+        capfd: pytest.CaptureFixture[str],
+        logging_conf_tmp_file_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test that log levels are set on loggers with environment variables."""
+        logging_conf_file = f"{logging_conf_tmp_file_path}/tmp_log.py"
+        monkeypatch.setenv("LOG_LEVEL", "info")
+        monkeypatch.setenv(
+            "LOG_LEVELS", "test.logging_conf.levels=debug,uvicorn.access=warning"
+        )
+        logging_conf_dict = logging_conf.configure_logging(
+            logging_conf=logging_conf_file
+        )
+        assert logging_conf_dict["loggers"]["uvicorn.access"] == {
+            "level": "WARNING",
+            "propagate": True,
+        }
+        access_logger = logging.getLogger("uvicorn.access")
+        assert access_logger.level == logging.WARNING
+        assert not access_logger.isEnabledFor(logging.INFO)
+        logger = logging.getLogger("test.logging_conf.levels")
+        assert logger.level == logging.DEBUG
+        logger.debug("Hello, debugging World!")
+        access_logger.info("Hello, access World!")
+        logging.getLogger("test.logging_conf").debug("Hello, other World!")
+        captured = capfd.readouterr()
+        assert "Hello, debugging World!" in captured.out
+        assert "Hello, access World!" not in captured.out
+        assert "Hello, other World!" not in captured.out
+        access_logger.setLevel(logging.NOTSET)
+        logger.setLevel(logging.NOTSET)
+
+
+class TestLogQueueHandler:
+    """Test queue-based logging with `LogQueueHandler`.
+    ---
+    """
+
+    def _log_record(self, message: str) -> logging.LogRecord:
+        return logging.LogRecord(
+            "test.logging_conf.queue", logging.INFO, __file__, 0, message, (), None
+        )
+
+    def test_log_queue_handler(self, capfd: pytest.CaptureFixture[str]) -> None:
+        """Test that queued records are passed to the target handlers."""
+        target = logging.StreamHandler(sys.stdout)
+        handler = logging_conf.LogQueueHandler([target])
+        assert handler.listener is None
+        _ = handler.handle(self._log_record("Hello, queued World!"))
+        assert handler.listener is not None
+        handler.close()
+        assert handler.listener is None
+        assert "Hello, queued World!" in capfd.readouterr().out
+
+    def test_log_queue_handler_overflow_drop(self, mocker: MockerFixture) -> None:
+        """Test that records are dropped and counted when the queue is full."""
+        handler = logging_conf.LogQueueHandler([], maxsize=2, overflow="drop")
+        start = mocker.patch.object(handler, "start", autospec=True)
+        for i in range(4):
+            _ = handler.handle(self._log_record(f"Record {i}"))
+        assert start.call_count == 4
+        assert handler.dropped == 2
+        assert handler.log_queue.get_nowait().getMessage() == "Record 0"
+        _ = handler.handle(self._log_record("Record 4"))
+        assert handler.dropped == 2
+        assert handler.log_queue.get_nowait().getMessage() == "Record 1"
+        assert handler.log_queue.get_nowait().getMessage() == "Record 4"
+        _ = handler.handle(self._log_record("Record 5"))
+        assert handler.dropped == 0
+        assert handler.log_queue.get_nowait().getMessage() == "Record 5"
+        dropped_record = handler.log_queue.get_nowait()
+        assert dropped_record.levelno == logging.WARNING
+        assert dropped_record.getMessage() == (
+            "Dropped 2 log records because the log queue was full."
+        )
+
+    def test_log_queue_handler_overflow_incorrect(self) -> None:
+        """Test that an incorrect overflow policy raises an error."""
+        with pytest.raises(ValueError, match="overflow policy must be block or drop"):
+            _ = logging_conf.LogQueueHandler([], overflow="wait")  # type: ignore[arg-type] # pyright: ignore[reportArgumentType]
+
+    def test_log_queue_handler_reset(self) -> None:
+        """Test that log queues are started, stopped, and reset after a fork."""
+        handler = logging_conf.LogQueueHandler([])
+        logging_conf.start_log_queues()
+        assert (listener := handler.listener) is not None
+        logging_conf.start_log_queues()
+        assert handler.listener is listener
+        log_queue = handler.log_queue
+        reset_log_queues = getattr(logging_conf, "_reset_log_queues")  # pyright: ignore[reportAny]
+        reset_log_queues()
+        assert handler.listener is None
+        assert handler.log_queue is not log_queue
+        assert handler.queue is handler.log_queue
+        logging_conf.start_log_queues()
+        assert handler.listener is not None
+        logging_conf.stop_log_queues()
+        assert handler.listener is None
+
+    def test_log_queue_config(
+        self,
+        capfd: pytest.CaptureFixture[str],
+        logging_conf_tmp_file_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test queue-based logging configured with environment variables."""
+        logging_conf_file = f"{logging_conf_tmp_file_path}/tmp_log.py"
+        monkeypatch.setenv("LOG_FILTERS", "/health")
+        monkeypatch.setenv("LOG_QUEUE", "true")
+        monkeypatch.setenv("LOG_QUEUE_OVERFLOW", "drop")
+        monkeypatch.setenv("LOG_QUEUE_SIZE", "100")
+        logging_conf_dict = logging_conf.configure_logging(
+            logging_conf=logging_conf_file
+        )
+        assert logging_conf_dict["root"].get("handlers") == ["queue"]
+        logger = logging.getLogger("test.logging_conf.queue.config")
+        handler = logging.getLogger().handlers[0]
+        assert type(handler).__name__ == "LogQueueHandler"
+        assert getattr(handler, "maxsize") == 100
+        assert getattr(handler, "overflow") == "drop"
+        logger.info("Hello, queued World!")
+        logger.info("GET /health 200")
+        handler.close()
+        captured = capfd.readouterr()
+        assert "Hello, queued World!" in captured.out
+        assert "/health" not in captured.out
+
+
+class TestLogDedupHandler:
+    """Test duplicate log message suppression with `LogDedupFilter`
+    and `LogDedupHandler`.
+    ---
+    """
+
+    def _log_record(
+        self,
+        message: str,
+        created: float,
+        level: int = logging.WARNING,
+        args: tuple[object, ...] = (),
+    ) -> logging.LogRecord:
+        record = logging.LogRecord(
+            "test.logging_conf.dedup", level, __file__, 0, message, args, None
+        )
+        record.created = created
+        return record
+
+    def test_log_dedup_filter(self) -> None:
+        """Test that repeated messages are suppressed and summarized per window."""
+        dedup = logging_conf.LogDedupFilter(window=10)
+        assert dedup.filter(self._log_record("Retrying %s", 100, args=("a",)))
+        for i in range(3):
+            assert not dedup.filter(self._log_record("Retrying %s", 101 + i, args=(i,)))
+        assert dedup.filter(self._log_record("Another message", 105))
+        assert dedup.filter(self._log_record("Retrying %s", 100, level=logging.INFO))
+        assert not dedup.summaries
+        assert dedup.filter(self._log_record("Retrying %s", 110, args=("b",)))
+        assert len(dedup.summaries) == 1
+        summary = dedup.summaries.popleft()
+        assert summary.levelno == logging.WARNING
+        assert summary.getMessage() == (
+            "Message repeated 3 times in 3.0 seconds: Retrying a"
+        )
+        assert dedup.filter(summary)
+        dedup.expire(float("inf"))
+        assert not dedup.entries
+        assert not dedup.summaries
+
+    def test_log_dedup_filter_expire_below_min_level(self) -> None:
+        """Test that records below the minimum level end expired windows, and that
+        the summary includes the time from the first to the last duplicate.
+        """
+        dedup = logging_conf.LogDedupFilter(window=10)
+        for created in (100, 101, 107.5):
+            _ = dedup.filter(self._log_record("Retrying", created))
+        assert dedup.filter(self._log_record("Request", 109.9, level=logging.INFO))
+        assert not dedup.summaries
+        assert dedup.filter(self._log_record("Request", 250, level=logging.INFO))
+        assert not dedup.entries
+        assert [summary.getMessage() for summary in dedup.summaries] == [
+            "Message repeated 2 times in 7.5 seconds: Retrying"
+        ]
+
+    def test_log_dedup_filter_message_error(self) -> None:
+        """Test that the message template is summarized if arguments can't be
+        added to it.
+        """
+        dedup = logging_conf.LogDedupFilter(window=10)
+        for created in (100, 101):
+            _ = dedup.filter(self._log_record("Retrying %d", created, args=("a",)))
+        dedup.expire(float("inf"))
+        assert [summary.getMessage() for summary in dedup.summaries] == [
+            "Message repeated 1 times in 1.0 seconds: Retrying %d"
+        ]
+
+    def test_log_dedup_filter_exception_type(self) -> None:
+        """Test that records with different exception types are not duplicates."""
+        dedup = logging_conf.LogDedupFilter(window=10, min_level="error")
+        records: list[logging.LogRecord] = []
+        for exc in (RuntimeError(), ValueError(), ValueError()):
+            record = self._log_record("Failed", 100, level=logging.ERROR)
+            record.exc_info = (type(exc), exc, None)
+            records.append(record)
+        assert [dedup.filter(record) for record in records] == [True, True, False]
+
+    def test_log_dedup_filter_maxsize(self) -> None:
+        """Test that the oldest fingerprints are evicted and summarized."""
+        dedup = logging_conf.LogDedupFilter(window=10, maxsize=2)
+        for message in ("One", "One", "Two", "Three"):
+            _ = dedup.filter(self._log_record(message, 100))
+        assert len(dedup.entries) == 2
+        assert [summary.getMessage() for summary in dedup.summaries] == [
+            "Message repeated 1 times in 0.0 seconds: One"
+        ]
+
+    def test_log_dedup_handler(self, capfd: pytest.CaptureFixture[str]) -> None:
+        """Test that summaries are passed to the target handlers."""
+        target = logging.StreamHandler(sys.stdout)
+        handler = logging_conf.LogDedupHandler([target], window=10)
+        for created in (100, 101, 102):
+            _ = handler.handle(self._log_record("Hello, duplicate World!", created))
+        assert not handler.handle(self._log_record("Hello, duplicate World!", 103))
+        assert capfd.readouterr().out == "Hello, duplicate World!\n"
+        assert not handler.handle(self._log_record("Hello, duplicate World!", 104))
+        _ = handler.handle(self._log_record("Hello, duplicate World!", 110))
+        assert capfd.readouterr().out == (
+            "Message repeated 4 times in 4.0 seconds: Hello, duplicate World!\n"
+            "Hello, duplicate World!\n"
+        )
+        _ = handler.handle(self._log_record("Hello, duplicate World!", 111))
+        handler.close()
+        assert capfd.readouterr().out == (
+            "Message repeated 1 times in 1.0 seconds: Hello, duplicate World!\n"
+        )
+
+    def test_log_dedup_config(
+        self,
+        capfd: pytest.CaptureFixture[str],
+        logging_conf_tmp_file_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test duplicate log message suppression configured with environment
+        variables.
+        """
+        logging_conf_file = f"{logging_conf_tmp_file_path}/tmp_log.py"
+        monkeypatch.setenv("LOG_DEDUP_LEVEL", "info")
+        monkeypatch.setenv("LOG_DEDUP_MAXSIZE", "100")
+        monkeypatch.setenv("LOG_DEDUP_WINDOW", "60")
+        monkeypatch.setenv("LOG_FILTERS", "/health")
+        logging_conf_dict = logging_conf.configure_logging(
+            logging_conf=logging_conf_file
+        )
+        assert logging_conf_dict["root"].get("handlers") == ["dedup"]
+        logger = logging.getLogger("test.logging_conf.dedup.config")
+        handler = logging.getLogger().handlers[0]
+        assert type(handler).__name__ == "LogDedupHandler"
+        for _ in range(3):
+            logger.info("Hello, duplicate World!")
+        logger.info("GET /health 200")
+        handler.close()
+        captured = capfd.readouterr()
+        assert captured.out.count("Hello, duplicate World!") == 2
+        assert "Message repeated 2 times in " in captured.out
+        assert "/health" not in captured.out
+
+
+class TestLogBatchHandler:
+    """Test batched log output with `LogBatchHandler`.
+    ---
+    """
+
+    def _log_record(
+        self, message: str, level: int = logging.INFO, created: float | None = None
+    ) -> logging.LogRecord:
+        record = logging.LogRecord(
+            "test.logging_conf.batch", level, __file__, 0, message, (), None
+        )
+        record.created = record.created if created is None else created
+        return record
+
+    @pytest.fixture
+    def pipe(self) -> Generator[tuple[int, TextIO], None, None]:
+        """Yield the read end of a pipe, and the write end as a text stream."""
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        with open(write_fd, "w") as stream:
+            yield read_fd, stream
+        os.close(read_fd)
+
+    def _read(self, read_fd: int) -> str:
+        try:
+            return os.read(read_fd, 65536).decode()
+        except BlockingIOError:
+            return ""
+
+    def test_log_batch_handler_flush_level(
+        self, pipe: tuple[int, TextIO], mocker: MockerFixture
+    ) -> None:
+        """Test that records are buffered until a warning is emitted."""
+        read_fd, stream = pipe
+        handler = logging_conf.LogBatchHandler(stream, maxage=60)
+        start = mocker.patch.object(handler, "start", autospec=True)
+        writev = mocker.spy(os, "writev")
+        _ = handler.handle(self._log_record("Hello, batched World!"))
+        _ = handler.handle(self._log_record("Hello again, batched World!"))
+        assert self._read(read_fd) == ""
+        start.assert_called_with()
+        _ = handler.handle(self._log_record("Warning!", level=logging.WARNING))
+        assert self._read(read_fd) == (
+            "Hello, batched World!\nHello again, batched World!\nWarning!\n"
+        )
+        writev.assert_called_once()
+        handler.close()
+
+    def test_log_batch_handler_maxsize_maxage(
+        self, pipe: tuple[int, TextIO], mocker: MockerFixture
+    ) -> None:
+        """Test that the buffer is flushed when it reaches its size or age limit."""
+        read_fd, stream = pipe
+        handler = logging_conf.LogBatchHandler(stream, maxsize=10, maxage=1)
+        _ = mocker.patch.object(handler, "start", autospec=True)
+        _ = handler.handle(self._log_record("Size", created=100))
+        assert self._read(read_fd) == ""
+        _ = handler.handle(self._log_record("Limit", created=100))
+        assert self._read(read_fd) == "Size\nLimit\n"
+        _ = handler.handle(self._log_record("Age", created=100))
+        assert self._read(read_fd) == ""
+        _ = handler.handle(self._log_record("Limit", created=101))
+        assert self._read(read_fd) == "Age\nLimit\n"
+        handler.close()
+
+    def test_log_batch_handler_flusher(self, pipe: tuple[int, TextIO]) -> None:
+        """Test that buffered records are flushed by the flusher thread."""
+        read_fd, stream = pipe
+        handler = logging_conf.LogBatchHandler(stream, maxage=0.01)
+        _ = handler.handle(self._log_record("Hello, flushed World!"))
+        assert handler.flusher is not None
+        output = ""
+        for _ in range(100):
+            if output := self._read(read_fd):
+                break
+            time.sleep(0.01)
+        assert output == "Hello, flushed World!\n"
+        handler.close()
+        handler.flusher.join(timeout=1)
+        assert not handler.flusher.is_alive()
+
+    def test_log_batch_handler_partial_writes(
+        self, pipe: tuple[int, TextIO], mocker: MockerFixture
+    ) -> None:
+        """Test that the rest of the buffer is written after partial writes."""
+        read_fd, stream = pipe
+        handler = logging_conf.LogBatchHandler(stream, maxage=60)
+        _ = mocker.patch.object(handler, "start", autospec=True)
+        writev = os.writev
+
+        def write_partially(fd: int, buffers: list[bytes]) -> int:
+            return writev(fd, [b"".join(buffers)[:3]])
+
+        _ = mocker.patch.object(os, "writev", side_effect=write_partially)
+        for message in ("One", "Two", "Three"):
+            _ = handler.handle(self._log_record(message))
+        handler.flush()
+        assert self._read(read_fd) == "One\nTwo\nThree\n"
+        handler.close()
+
+    def test_log_batch_handler_no_fileno(self, mocker: MockerFixture) -> None:
+        """Test that streams without file descriptors are written to directly."""
+        stream = io.StringIO()
+        handler = logging_conf.LogBatchHandler(stream)
+        _ = mocker.patch.object(handler, "start", autospec=True)
+        assert handler.fileno is None
+        _ = handler.handle(self._log_record("Hello, unbatched World!"))
+        assert stream.getvalue() == ""
+        logging_conf.flush_log_batches()
+        assert stream.getvalue() == "Hello, unbatched World!\n"
+        handler.close()
+
+    def test_log_batch_handler_reset(self, mocker: MockerFixture) -> None:
+        """Test that the buffer and flusher thread are reset after a fork."""
+        handler = logging_conf.LogBatchHandler(io.StringIO())
+        _ = mocker.patch.object(handler, "start", autospec=True)
+        _ = handler.handle(self._log_record("Hello, forked World!"))
+        handler.flusher = mocker.Mock()
+        reset_log_batches = getattr(logging_conf, "_reset_log_batches")  # pyright: ignore[reportAny]
+        reset_log_batches()
+        assert handler.buffer == []
+        assert handler.buffer_size == 0
+        assert handler.flusher is None
+        handler.close()
+        handler.reset()
+        assert handler.closed.is_set()
+
+    def test_log_batch_handler_error(self, mocker: MockerFixture) -> None:
+        """Test that errors when writing records are handled by the handler."""
+        handler = logging_conf.LogBatchHandler(io.StringIO())
+        handle_error = mocker.patch.object(handler, "handleError", autospec=True)
+        _ = mocker.patch.object(handler, "write", side_effect=OSError)
+        record = self._log_record("Error!", level=logging.ERROR)
+        _ = handler.handle(record)
+        handle_error.assert_called_once_with(record)
+        _ = mocker.patch.object(handler, "format", side_effect=RecursionError)
+        with pytest.raises(RecursionError):
+            _ = handler.handle(record)
+
+    def test_log_batch_config(
+        self,
+        capfd: pytest.CaptureFixture[str],
+        logging_conf_tmp_file_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test batched log output configured with environment variables."""
+        logging_conf_file = f"{logging_conf_tmp_file_path}/tmp_log.py"
+        monkeypatch.setenv("LOG_BATCH", "true")
+        monkeypatch.setenv("LOG_BATCH_AGE", "60")
+        monkeypatch.setenv("LOG_BATCH_SIZE", "4096")
+        _ = logging_conf.configure_logging(logging_conf=logging_conf_file)
+        logger = logging.getLogger("test.logging_conf.batch.config")
+        handler = logging.getLogger().handlers[0]
+        assert type(handler).__name__ == "LogBatchHandler"
+        assert getattr(handler, "maxage") == 60
+        assert getattr(handler, "maxsize") == 4096
+        logger.info("Hello, batched World!")
+        assert "Hello, batched World!" not in capfd.readouterr().out
+        handler.close()
+        assert "Hello, batched World!" in capfd.readouterr().out
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import math
+import os
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, cast
+
+import pytest
+from starlette.testclient import TestClient
+
+from inboard import metrics
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+    from uvicorn._types import ASGISendCallable, Scope
+
+
+def make_scope(**items: object) -> Scope:
+    """Make an ASGI connection scope with only the keys used by middleware."""
+    return cast("Scope", cast("object", items))
+
+
+@pytest.fixture
+def registry(tmp_path: Path) -> metrics.Registry:
+    """Create a registry for metrics with files in a temporary directory."""
+    return metrics.Registry(str(tmp_path))
+
+
+class TestMetricFile:
+    """Test recording metrics in memory-mapped files.
+    ---
+    """
+
+    def test_metric_file(self, tmp_path: Path) -> None:
+        """Test that values are added up, and read by other processes."""
+        path = tmp_path / "1.metrics"
+        metric_file = metrics.MetricFile(path)
+        metric_file.add("a", 1.0)
+        metric_file.add("b", 2.5)
+        metric_file.add("a", 0.5)
+        assert metric_file.values() == {"a": 1.5, "b": 2.5}
+        assert metrics.MetricFile.read(path) == {"a": 1.5, "b": 2.5}
+        metric_file.close()
+        reopened = metrics.MetricFile(path)
+        assert reopened.offsets.keys() == {"a", "b"}
+        reopened.add("a", 1.0)
+        assert reopened.values() == {"a": 2.5, "b": 2.5}
+        reopened.close()
+
+    def test_metric_file_grows(self) -> None:
+        """Test that a file grows when entries exceed its size."""
+        metric_file = metrics.MetricFile(size=64)
+        for i in range(10):
+            metric_file.add(f"key-{i}", i)
+        assert len(metric_file.buffer) > 64
+        assert metric_file.values() == {f"key-{i}": i for i in range(10)}
+        metric_file.close()
+
+    def test_metric_file_read_missing(self, tmp_path: Path) -> None:
+        """Test that files that are missing or empty have no values."""
+        (empty := tmp_path / "empty.metrics").touch()
+        assert metrics.MetricFile.read(tmp_path / "missing.metrics") == {}
+        assert metrics.MetricFile.read(empty) == {}
+
+
+class TestRegistry:
+    """Test metrics recorded by multiple processes, and exposed for Prometheus.
+    ---
+    """
+
+    def test_counter(self, registry: metrics.Registry) -> None:
+        """Test that counters add up, with labels escaped when exposed."""
+        counter = registry.counter(
+            "requests_total", 'Requests\n"made"\\', labelnames=("path",)
+        )
+        counter.inc(labelvalues=("/",))
+        counter.inc(2, labelvalues=('/"quoted"\\\n',))
+        counter.inc(labelvalues=("/",))
+        assert registry.expose() == (
+            '# HELP requests_total Requests\\n"made"\\\\\n'
+            + "# TYPE requests_total counter\n"
+            + 'requests_total{path="/"} 2.0\n'
+            + 'requests_total{path="/\\"quoted\\"\\\\\\n"} 2.0\n'
+        )
+
+    def test_histogram(self, registry: metrics.Registry) -> None:
+        """Test that histograms expose cumulative buckets, count, and sum."""
+        histogram = registry.histogram(
+            "latency_seconds", "Latency", labelnames=("path",), buckets=(1, 0.1)
+        )
+        assert histogram.buckets == (0.1, 1.0, math.inf)
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, labelvalues=("/",))
+        histogram.observe(0.1, labelvalues=("/health",))
+        assert registry.expose().splitlines()[2:] == [
+            'latency_seconds_bucket{path="/",le="0.1"} 1.0',
+            'latency_seconds_bucket{path="/",le="1.0"} 2.0',
+            'latency_seconds_bucket{path="/",le="+Inf"} 3.0',
+            'latency_seconds_count{path="/"} 3.0',
+            'latency_seconds_sum{path="/"} 5.55',
+            'latency_seconds_bucket{path="/health",le="0.1"} 1.0',
+            'latency_seconds_bucket{path="/health",le="1.0"} 1.0',
+            'latency_seconds_bucket{path="/health",le="+Inf"} 1.0',
+            'latency_seconds_count{path="/health"} 1.0',
+            'latency_seconds_sum{path="/health"} 0.1',
+        ]
+        infinite = registry.histogram("infinite", "", buckets=(1, math.inf))
+        assert infinite.buckets == (1.0, math.inf)
+        assert metrics.format_value(-math.inf) == "-Inf"
+
+    def test_incorrect_metrics(self, registry: metrics.Registry) -> None:
+        """Test that incorrect names and labels raise errors."""
+        counter = registry.counter("requests_total", "", labelnames=("path",))
+        with pytest.raises(ValueError, match="already registered: requests_total"):
+            _ = registry.counter("requests_total", "")
+        with pytest.raises(ValueError, match="Histograms can't have an le label"):
+            _ = registry.histogram("latency_seconds", "", labelnames=("le",))
+        with pytest.raises(ValueError, match="Incorrect label values"):
+            counter.inc(labelvalues=())
+
+    def test_collect_processes(
+        self, mocker: MockerFixture, registry: metrics.Registry, tmp_path: Path
+    ) -> None:
+        """Test that each process has its own file, and that metrics are collected
+        from all files, including the archive of processes that have exited.
+        """
+        counter = registry.counter("requests_total", "")
+        counter.inc()
+        pid = os.getpid()
+        _ = mocker.patch.object(os, "getpid", return_value=pid + 1)
+        counter.inc(2)
+        assert {path.name for path in tmp_path.iterdir()} == {
+            f"{pid}.metrics",
+            f"{pid + 1}.metrics",
+        }
+        assert registry.expose().endswith("requests_total 3.0\n")
+        metrics.archive_metrics(str(tmp_path), pid + 1)
+        metrics.archive_metrics(str(tmp_path), pid + 2)
+        assert {path.name for path in tmp_path.iterdir()} == {
+            f"{pid}.metrics",
+            metrics.ARCHIVE_FILE,
+        }
+        assert registry.expose().endswith("requests_total 3.0\n")
+        metrics.clear_metrics(str(tmp_path))
+        assert not list(tmp_path.iterdir())
+
+    def test_collect_unknown_metrics(
+        self, registry: metrics.Registry, tmp_path: Path
+    ) -> None:
+        """Test that samples of metrics that aren't registered are skipped."""
+        other = metrics.Registry(str(tmp_path))
+        other.counter("other_total", "").inc()
+        _ = registry.counter("requests_total", "")
+        assert registry.expose() == (
+            "# HELP requests_total \n# TYPE requests_total counter\n"
+        )
+
+    def test_collect_in_memory(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        """Test that metrics are only collected from the current process if there
+        is no directory for metric files.
+        """
+        monkeypatch.delenv("METRICS_DIR", raising=False)
+        registry = metrics.Registry()
+        counter = registry.counter("requests_total", "")
+        assert registry.collect() == {}
+        counter.inc()
+        assert registry.collect() == {'["requests_total", []]': 1.0}
+        monkeypatch.setenv("METRICS_DIR", str(tmp_path))
+        assert registry.get_directory() == str(tmp_path)
+
+
+def test_metrics_app(registry: metrics.Registry) -> None:
+    """Test that the ASGI app responds with metrics in the Prometheus format."""
+    registry.counter("requests_total", "Requests").inc()
+    app = metrics.MetricsApp(registry)
+    client = TestClient(app)  # type: ignore[arg-type] # pyright: ignore[reportArgumentType]
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE.decode()
+    assert response.text.endswith("requests_total 1.0\n")
+    assert metrics.MetricsApp().registry is metrics.REGISTRY
+
+
+class TestLatencyMiddleware:
+    """Test recording request latency with ASGI middleware.
+    ---
+    """
+
+    @pytest.fixture
+    def histogram(self, registry: metrics.Registry) -> metrics.Histogram:
+        """Create a histogram for request latency in a temporary registry."""
+        return registry.histogram(
+            "latency_seconds",
+            "",
+            labelnames=("route", "status"),
+            buckets=metrics.LATENCY_BUCKETS,
+        )
+
+    def test_latency_buckets(self) -> None:
+        """Test that latency buckets have a relative error of at most 25%."""
+        buckets = metrics.LATENCY_BUCKETS
+        assert buckets[0] < 0.001 and 60 > buckets[-2] > 50
+        assert all(1 < b / a <= 1.25 for a, b in zip(buckets[:-2], buckets[1:-1]))
+
+    @pytest.mark.parametrize(
+        "app_module", ("main_base", "main_fastapi", "main_starlette")
+    )
+    def test_latency_apps(self, app_module: str) -> None:
+        """Test that the inboard apps record latency by route and status class."""
+        module = importlib.import_module(f"inboard.app.{app_module}")
+        app = getattr(module, "app")  # pyright: ignore[reportAny]
+        client = TestClient(app)  # pyright: ignore[reportAny]
+        response = client.get("/health")
+        assert response.status_code in {200, 401, 403}
+        status = f"{response.status_code // 100}xx"
+        route = "" if app_module == "main_base" else "/health"
+        samples = metrics.REGISTRY.collect()
+        key = (
+            '["inboard_request_duration_seconds_count", '
+            + f'[["route", "{route}"], ["status", "{status}"]]]'
+        )
+        assert samples[key] >= 1
+
+    def test_latency_summary(
+        self,
+        histogram: metrics.Histogram,
+        mocker: MockerFixture,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """Test that latency is recorded when the final response body is sent,
+        and that a summary is logged after the interval.
+        """
+        caplog.set_level(logging.INFO, logger="inboard.metrics")
+        clock = SimpleNamespace(
+            monotonic=iter((0, 1, 61)).__next__,
+            perf_counter_ns=iter((0, 2_000_000, 0, 600_000_000)).__next__,
+        )
+        _ = mocker.patch.object(metrics, "time", clock)
+        sent: list[object] = []
+
+        async def send(message: object) -> None:
+            sent.append(message)
+
+        async def app(_scope: Scope, _receive: object, send: ASGISendCallable) -> None:
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"", "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        middleware = metrics.LatencyMiddleware(app, histogram=histogram, interval=60)
+        scope = make_scope(type="http", route=mocker.Mock(path="/users"))
+        receive = mocker.AsyncMock()
+        asyncio.run(middleware(scope, receive, send))
+        assert len(sent) == 3
+        assert not caplog.records
+        asyncio.run(middleware(scope, receive, send))
+        assert caplog.messages == [
+            "Latency of /users 2xx responses: p50 2.4 ms, p99 625.0 ms "
+            + "(2 requests in 60s)."
+        ]
+        assert not middleware.counts
+        assert histogram.registry.expose().count("latency_seconds_count") == 1
+
+    def test_latency_error(
+        self, histogram: metrics.Histogram, mocker: MockerFixture
+    ) -> None:
+        """Test that requests raising errors are recorded as server errors, and
+        that other scopes and disabled summaries are passed through.
+        """
+
+        async def app(scope: Scope, _receive: object, _send: object) -> None:
+            if scope["type"] == "http":
+                raise RuntimeError("Error")
+
+        middleware = metrics.LatencyMiddleware(app, histogram=histogram, interval=0)
+        receive, send = mocker.AsyncMock(), mocker.AsyncMock()
+        with pytest.raises(RuntimeError, match="Error"):
+            asyncio.run(middleware(make_scope(type="http"), receive, send))
+        asyncio.run(middleware(make_scope(type="lifespan"), receive, send))
+        assert not middleware.counts
+        samples = histogram.registry.collect()
+        assert (
+            samples['["latency_seconds_count", [["route", ""], ["status", "5xx"]]]']
+            == 1
+        )
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import subprocess
+import sys
+from typing import TYPE_CHECKING
+
+import pytest
+
+from inboard import resources
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+
+class TestCPUCount:
+    """Test detection of the number of CPUs available to worker processes.
+    ---
+    """
+
+    @pytest.mark.parametrize(
+        "cgroup_files,expected",
+        (
+            ({"cpu.max": "200000 100000\n"}, (2.0, "cgroup cpu.max")),
+            ({"cpu.max": "max 100000\n"}, None),
+            ({"cpu.max": "invalid\n"}, None),
+            (
+                {
+                    "cpu/cpu.cfs_quota_us": "150000\n",
+                    "cpu/cpu.cfs_period_us": "100000\n",
+                },
+                (1.5, "cgroup cpu.cfs_quota_us"),
+            ),
+            (
+                {"cpu/cpu.cfs_quota_us": "-1\n", "cpu/cpu.cfs_period_us": "100000\n"},
+                None,
+            ),
+            (
+                {"cpu/cpu.cfs_quota_us": "150000\n", "cpu/cpu.cfs_period_us": "0\n"},
+                None,
+            ),
+            ({}, None),
+        ),
+    )
+    def test_get_cgroup_cpu_quota(
+        self,
+        cgroup_files: dict[str, str],
+        expected: tuple[float, str] | None,
+        tmp_path: Path,
+    ) -> None:
+        """Test reading CPU quotas from cgroup v2 and cgroup v1 files."""
+        for name, content in cgroup_files.items():
+            (path := tmp_path / name).parent.mkdir(exist_ok=True)
+            _ = path.write_text(content)
+        assert resources.get_cgroup_cpu_quota(tmp_path) == expected
+
+    @pytest.mark.parametrize(
+        "cpu_max,affinity,expected",
+        (
+            ("max 100000", 64, (64, "cpu_count")),
+            ("max 100000", 8, (8, "sched_getaffinity")),
+            ("150000 100000", 8, (2, "cgroup cpu.max")),
+            ("10000 100000", 8, (1, "cgroup cpu.max")),
+        ),
+    )
+    def test_get_cpu_count(
+        self,
+        affinity: int,
+        cpu_max: str,
+        expected: tuple[int, str],
+        mocker: MockerFixture,
+        tmp_path: Path,
+    ) -> None:
+        """Test that the least CPU count is used, with cgroup quotas rounded up."""
+        _ = mocker.patch.object(multiprocessing, "cpu_count", return_value=64)
+        _ = mocker.patch.object(
+            os, "sched_getaffinity", create=True, return_value=set(range(affinity))
+        )
+        _ = (tmp_path / "cpu.max").write_text(cpu_max)
+        assert resources.get_cpu_count(tmp_path) == expected
+
+
+class TestMemoryLimit:
+    """Test detection of the memory available to worker processes.
+    ---
+    """
+
+    @pytest.mark.parametrize(
+        "cgroup_files,expected",
+        (
+            ({"memory.max": "1073741824\n"}, (2**30, "cgroup memory.max")),
+            ({"memory.max": "max\n"}, (2**32, "physical memory")),
+            (
+                {"memory/memory.limit_in_bytes": "536870912\n"},
+                (2**29, "cgroup memory.limit_in_bytes"),
+            ),
+            (
+                {"memory/memory.limit_in_bytes": "9223372036854771712\n"},
+                (2**32, "physical memory"),
+            ),
+            ({}, (2**32, "physical memory")),
+        ),
+    )
+    def test_get_memory_limit(
+        self,
+        cgroup_files: dict[str, str],
+        expected: tuple[int, str],
+        mocker: MockerFixture,
+        tmp_path: Path,
+    ) -> None:
+        """Test that the lesser of the cgroup limit and physical memory is used."""
+        sysconf = {"SC_PAGE_SIZE": 4096, "SC_PHYS_PAGES": 2**20}
+        _ = mocker.patch.object(os, "sysconf", create=True, side_effect=sysconf.get)
+        for name, content in cgroup_files.items():
+            (path := tmp_path / name).parent.mkdir(exist_ok=True)
+            _ = path.write_text(content)
+        assert resources.get_memory_limit(tmp_path) == expected
+
+    def test_get_memory_limit_without_sysconf(
+        self, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        """Test that the memory limit is None if it cannot be determined."""
+        _ = mocker.patch.object(os, "sysconf", create=True, side_effect=ValueError)
+        assert resources.get_memory_limit(tmp_path) is None
+
+    def test_measure_worker_memory(self) -> None:
+        """Test measuring worker memory by importing an app module."""
+        worker_memory = resources.measure_worker_memory("inboard.app.main_base:app")
+        assert worker_memory > 0
+
+    @pytest.mark.parametrize(
+        "platform,max_rss", (("darwin", 256 * 2**20), ("linux", 256 * 2**10))
+    )
+    def test_measure_worker_memory_units(
+        self, max_rss: int, mocker: MockerFixture, platform: str
+    ) -> None:
+        """Test that the peak RSS is converted from bytes on macOS and KB on Linux."""
+        process = subprocess.CompletedProcess(
+            args=[], returncode=0, stdout=str(max_rss)
+        )
+        _ = mocker.patch.object(subprocess, "run", return_value=process)
+        _ = mocker.patch.object(sys, "platform", platform)
+        measure_worker_memory = resources.measure_worker_memory.__wrapped__
+        assert measure_worker_memory("package.module:app") == 256
+
+    @pytest.mark.parametrize(
+        "worker_memory,app_module,expected",
+        ((None, None, None), ("512", None, 512), ("auto", None, None)),
+    )
+    def test_get_worker_memory(
+        self,
+        app_module: str | None,
+        expected: float | None,
+        monkeypatch: pytest.MonkeyPatch,
+        worker_memory: str | None,
+    ) -> None:
+        """Test getting worker memory from a number, or without an app module."""
+        monkeypatch.delenv("APP_MODULE", raising=False)
+        monkeypatch.delenv("UVICORN_APP", raising=False)
+        assert resources.get_worker_memory(worker_memory, app_module) == expected
+
+    def test_get_worker_memory_auto(
+        self, mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test measuring worker memory from the app module environment variable."""
+        measure_worker_memory = mocker.patch.object(
+            resources, "measure_worker_memory", return_value=256.0
+        )
+        monkeypatch.setenv("APP_MODULE", "package.module:app")
+        assert resources.get_worker_memory("AUTO") == 256
+        measure_worker_memory.assert_called_once_with("package.module:app")
+
+    @pytest.mark.parametrize(
+        "memory_limit,worker_memory,expected",
+        (
+            ((2**30, "cgroup memory.max"), "256", 4),
+            ((2**30, "cgroup memory.max"), "2048", 1),
+            ((2**34, "physical memory"), "256", 8),
+            (None, "256", 8),
+            ((2**30, "cgroup memory.max"), None, 8),
+        ),
+    )
+    def test_calculate_workers_memory(
+        self,
+        expected: int,
+        memory_limit: tuple[int, str] | None,
+        mocker: MockerFixture,
+        worker_memory: str | None,
+    ) -> None:
+        """Test that the number of workers is capped by the memory limit."""
+        _ = mocker.patch.object(resources, "get_cpu_count", return_value=(8, ""))
+        _ = mocker.patch.object(
+            resources, "get_memory_limit", return_value=memory_limit
+        )
+        result = resources.calculate_workers(worker_memory=worker_memory)
+        assert result == expected
+
+    def test_calculate_workers_memory_with_total(self, mocker: MockerFixture) -> None:
+        """Test that an explicit total number of workers is not capped by memory."""
+        _ = mocker.patch.object(resources, "get_memory_limit", return_value=(2**30, ""))
+        result = resources.calculate_workers(None, "10", worker_memory="512")
+        assert result == 10
+
+
+class TestCalculateWorkers:
+    """Test calculation of the number of worker processes.
+    ---
+    """
+
+    @pytest.mark.parametrize("max_workers", (None, "1", "2", "5", "10"))
+    def test_calculate_workers_max(self, max_workers: str | None) -> None:
+        """Test Worker process calculation with custom maximum."""
+        cores, _ = resources.get_cpu_count()
+        default = max(cores, 2)
+        result = resources.calculate_workers(max_workers, None)
+        if max_workers and default > (m := int(max_workers)):
+            assert result == m
+        else:
+            assert result == default
+
+    @pytest.mark.parametrize("total_workers", (None, "1", "2", "5", "10"))
+    def test_calculate_workers_total(self, total_workers: str | None) -> None:
+        """Test Worker process calculation with custom total."""
+        cores, _ = resources.get_cpu_count()
+        result = resources.calculate_workers(None, total_workers)
+        assert result == int(total_workers) if total_workers else max(cores, 2)
+
+    @pytest.mark.parametrize("workers_per_core", ("0.5", "1.5", "5", "10"))
+    def test_calculate_workers_per_core(self, workers_per_core: str) -> None:
+        """Test Worker process calculation with custom workers per core.
+        Worker number should be the greater of 2 or the workers per core setting.
+        """
+        cores, _ = resources.get_cpu_count()
+        result = resources.calculate_workers(workers_per_core=workers_per_core)
+        assert result == max(int(float(workers_per_core) * cores), 2)
+
+    @pytest.mark.parametrize("max_workers", ("1", "2", "5", "10"))
+    @pytest.mark.parametrize("total_workers", ("1", "2", "5", "10"))
+    def test_calculate_workers_both_max_and_total(
+        self, max_workers: str, total_workers: str
+    ) -> None:
+        """Test Worker process calculation if max workers and total workers
+        (web concurrency) are both set. Worker number should be the lesser of the two.
+        """
+        result = resources.calculate_workers(max_workers, total_workers)
+        assert result == min(int(max_workers), int(total_workers))
+
+    @pytest.mark.parametrize("max_workers", ("1", "2", "5", "10"))
+    @pytest.mark.parametrize("workers_per_core", ("0.5", "1.5", "5", "10"))
+    def test_calculate_workers_both_max_and_workers_per_core(
+        self, max_workers: str, workers_per_core: str
+    ) -> None:
+        """Test Worker process calculation if max workers and workers per core
+        are both set. Worker number should always be less than the maximum.
+        """
+        result = resources.calculate_workers(
+            max_workers, None, workers_per_core=workers_per_core
+        )
+        assert result <= int(max_workers)
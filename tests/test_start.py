@@ -3,12 +3,19 @@ from __future__ import annotations
 import json
 import logging
 import os
+import signal
 import subprocess
-from typing import TYPE_CHECKING, final
+import sys
+import time
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, cast, final
 
+import httpxyz
 import pytest
+import uvicorn
 
-from inboard import start
+from inboard import logging_conf, start, uvicorn_conf
+from inboard.gunicorn_app import GunicornApplication
 
 if TYPE_CHECKING:
     from pathlib import Path
@@ -33,12 +40,16 @@ class TestRunPreStartScript:
         logger = mocker.patch.object(logging, "root", autospec=True)
         monkeypatch.setenv("PRE_START_PATH", str(pre_start_script_tmp_py))
         pre_start_path = os.getenv("PRE_START_PATH")
+        clock = SimpleNamespace(perf_counter=iter((0.0, 1.0, 1.25)).__next__)
+        _ = mocker.patch.object(start, "time", clock)
         _ = start.run_pre_start_script(logger=logger)
         logger.debug.assert_has_calls(
             calls=[
                 mocker.call("Checking for pre-start script."),
                 mocker.call(f"Running pre-start script with python {pre_start_path}."),
-                mocker.call(f"Ran pre-start script with python {pre_start_path}."),
+                mocker.call(
+                    f"Ran pre-start script with python {pre_start_path} in 0.25s."
+                ),
             ]
         )
 
@@ -52,12 +63,14 @@ class TestRunPreStartScript:
         logger = mocker.patch.object(logging, "root", autospec=True)
         monkeypatch.setenv("PRE_START_PATH", str(pre_start_script_tmp_sh))
         pre_start_path = os.getenv("PRE_START_PATH")
+        clock = SimpleNamespace(perf_counter=iter((0.0, 1.0, 1.25)).__next__)
+        _ = mocker.patch.object(start, "time", clock)
         _ = start.run_pre_start_script(logger=logger)
         logger.debug.assert_has_calls(
             calls=[
                 mocker.call("Checking for pre-start script."),
                 mocker.call(f"Running pre-start script with sh {pre_start_path}."),
-                mocker.call(f"Ran pre-start script with sh {pre_start_path}."),
+                mocker.call(f"Ran pre-start script with sh {pre_start_path} in 0.25s."),
             ]
         )
 
@@ -111,6 +124,109 @@ class TestRunPreStartScript:
             ]
         )
 
+    @pytest.mark.parametrize("in_process", ("false", "true"))
+    @pytest.mark.timeout(10)
+    def test_run_pre_start_script_groups(
+        self,
+        in_process: str,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """Test that pre-start scripts separated by commas run concurrently, and that
+        groups of scripts separated by semicolons run in order.
+
+        The first two scripts each wait for a file created by the other, so they
+        only finish if they run at the same time.
+        """
+        logger = mocker.patch.object(logging, "root", autospec=True)
+        first, second = tmp_path / "1", tmp_path / "2"
+        first_script = tmp_path / "first.sh"
+        _ = first_script.write_text(
+            f"touch {first}\nwhile [ ! -f {second} ]; do sleep 0.01; done\n"
+        )
+        second_script = tmp_path / "second.py"
+        _ = second_script.write_text(
+            "import pathlib, time\n"
+            + f"while not pathlib.Path({str(first)!r}).exists():\n"
+            + "    time.sleep(0.01)\n"
+            + f"pathlib.Path({str(second)!r}).touch()\n"
+        )
+        third_script = tmp_path / "third.sh"
+        _ = third_script.write_text(f"test -f {first} && test -f {second}\n")
+        missing = tmp_path / "missing.sh"
+        monkeypatch.setenv(
+            "PRE_START_PATH",
+            f"{first_script}, {second_script}, {missing}; {third_script}",
+        )
+        monkeypatch.setenv("PRE_START_IN_PROCESS", in_process)
+        monkeypatch.setenv("PRE_START_TIMEOUT", "5")
+        message = start.run_pre_start_script(logger=logger)
+        assert message.startswith("Ran 3 pre-start scripts in ")
+        messages = [call.args[0] for call in logger.debug.call_args_list]  # pyright: ignore[reportAny]
+        process = "runpy" if in_process == "true" else "python"
+        for prefix in (
+            f"Ran pre-start script with sh {first_script} in ",
+            f"Ran pre-start script with {process} {second_script} in ",
+            f"Ran pre-start script with sh {third_script} in ",
+        ):
+            assert any(str(m).startswith(prefix) for m in messages)  # pyright: ignore[reportAny]
+        assert f"No pre-start script found at {missing}." in messages
+        assert messages[-1] == message
+        assert str(tmp_path) not in sys.path
+
+    @pytest.mark.parametrize(
+        "script,exception",
+        (
+            ("import sys\nsys.exit(0)\n", None),
+            ("import sys\nsys.exit(1)\n", SystemExit),
+            ('raise RuntimeError("Testing pre-start script error")\n', RuntimeError),
+            ("import time\ntime.sleep(5)\n", TimeoutError),
+        ),
+    )
+    @pytest.mark.timeout(2)
+    def test_run_pre_start_script_in_process(
+        self,
+        exception: type[BaseException] | None,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        script: str,
+        tmp_path: Path,
+    ) -> None:
+        """Test that Python pre-start scripts run in the current process, and that
+        errors, nonzero exit codes, and timeouts are raised.
+        """
+        logger = mocker.patch.object(logging, "root", autospec=True)
+        path = tmp_path / "prestart.py"
+        _ = path.write_text(script)
+        monkeypatch.setenv("PRE_START_PATH", str(path))
+        monkeypatch.setenv("PRE_START_IN_PROCESS", "true")
+        monkeypatch.setenv("PRE_START_TIMEOUT", "0.2")
+        handler = signal.getsignal(signal.SIGALRM)
+        if exception is None:
+            message = start.run_pre_start_script(logger=logger)
+            assert message.startswith(f"Ran pre-start script with runpy {path} in ")
+        else:
+            with pytest.raises(exception):
+                _ = start.run_pre_start_script(logger=logger)
+        assert signal.getsignal(signal.SIGALRM) is handler
+        assert 0 < signal.getitimer(signal.ITIMER_REAL)[0] <= 2
+
+    @pytest.mark.timeout(2)
+    def test_run_pre_start_script_timeout(
+        self,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        pre_start_script_tmp_sh: Path,
+    ) -> None:
+        """Test that pre-start scripts in subprocesses are stopped after the timeout."""
+        logger = mocker.patch.object(logging, "root", autospec=True)
+        _ = pre_start_script_tmp_sh.write_text("sleep 5\n")
+        monkeypatch.setenv("PRE_START_PATH", str(pre_start_script_tmp_sh))
+        monkeypatch.setenv("PRE_START_TIMEOUT", "0.2")
+        with pytest.raises(subprocess.TimeoutExpired):
+            _ = start.run_pre_start_script(logger=logger)
+
 
 class TestSetAppModule:
     """Set app module string using the method in `start.py`.
@@ -269,6 +385,56 @@ class TestSetUvicornOptions:
         )
         assert result == uvicorn_options_custom
 
+    def test_set_uvicorn_options_log_levels(
+        self, logging_conf_dict: DictConfig, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that the Uvicorn log level is not set if the logging config sets
+        levels on Uvicorn loggers, so that Uvicorn does not override those levels.
+        """
+        monkeypatch.setenv("LOG_LEVEL", "debug")
+        result = start.set_uvicorn_options(
+            "inboard.app.main_fastapi:app", log_config=logging_conf_dict
+        )
+        assert result.get("log_level") == "debug"
+        loggers = logging_conf_dict["loggers"]
+        log_config: DictConfig = {
+            **logging_conf_dict,
+            "loggers": {**loggers, "uvicorn.access": {"level": "WARNING"}},
+        }
+        result = start.set_uvicorn_options(
+            "inboard.app.main_fastapi:app", log_config=log_config
+        )
+        assert result.get("log_level") is None
+
+    def test_set_uvicorn_options_workers(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that the number of Uvicorn worker processes is calculated like the
+        number of Gunicorn worker processes, unless reloading is enabled or the
+        number is set in `UVICORN_CONFIG_OPTIONS`.
+        """
+        monkeypatch.setenv("MAX_WORKERS", "3")
+        monkeypatch.setenv("WEB_CONCURRENCY", "4")
+        result = start.set_uvicorn_options("inboard.app.main_fastapi:app")
+        assert result.get("workers") == 3
+        monkeypatch.setenv("UVICORN_CONFIG_OPTIONS", '{"workers": 5}')
+        result = start.set_uvicorn_options("inboard.app.main_fastapi:app")
+        assert result.get("workers") == 5
+        monkeypatch.delenv("UVICORN_CONFIG_OPTIONS")
+        monkeypatch.setenv("WITH_RELOAD", "true")
+        result = start.set_uvicorn_options("inboard.app.main_fastapi:app")
+        assert "workers" not in result
+
+    @pytest.mark.subprocess
+    def test_set_uvicorn_options_workers_without_gunicorn_conf(self) -> None:
+        """Test that the number of Uvicorn worker processes is calculated without
+        importing the Gunicorn configuration file, which has side effects on import.
+        """
+        code = (
+            "import sys; from inboard import start; "
+            + "start.set_uvicorn_options('inboard.app.main_base:app'); "
+            + "assert 'inboard.gunicorn_conf' not in sys.modules"
+        )
+        _ = subprocess.run([sys.executable, "-c", code], check=True)
+
     def test_set_uvicorn_options_default_from_json(
         self,
         uvicorn_options_default: UvicornOptions,
@@ -296,19 +462,77 @@ class TestSetUvicornOptions:
         when the `UVICORN_CONFIG_OPTIONS` environment variable is also set.
 
         The `LOGGING_CONFIG` dictionary can't be encoded as a JSON string when it has
-        a class definition (the filter class), so the "filters" dict has to be removed.
+        class definitions (the filter classes and the JSON formatter class), so the
+        "filters" dict and the "json" formatter have to be removed.
         """
         log_config = uvicorn_options_custom.get("log_config")
         assert log_config is not None
         filters = log_config.get("filters")
         assert filters is not None
         mocker.patch.dict(filters, clear=True)
+        formatters = log_config.get("formatters")
+        assert formatters is not None
+        formatters_without_classes = {
+            name: formatter
+            for name, formatter in formatters.items()
+            if formatter.get("()") is not logging_conf.JsonFormatter
+        }
+        mocker.patch.dict(formatters, formatters_without_classes, clear=True)
         uvicorn_options_json = json.dumps(uvicorn_options_custom)
         monkeypatch.setenv("UVICORN_CONFIG_OPTIONS", uvicorn_options_json)
         monkeypatch.setenv("WITH_RELOAD", "false")
         result = start.set_uvicorn_options("inboard.app.main_base:app")
         assert result == uvicorn_options_custom
 
+    @pytest.mark.parametrize(
+        "options_json,expected",
+        (
+            (None, {}),
+            (
+                '{"limit_concurrency": 100, "ws_ping_interval": 5, "loop": "uvloop"}',
+                {"limit_concurrency": 100, "ws_ping_interval": 5, "loop": "uvloop"},
+            ),
+            (
+                '{"timeout_graceful_shutdown": null, "server_header": false}',
+                {"timeout_graceful_shutdown": None, "server_header": False},
+            ),
+        ),
+    )
+    def test_get_uvicorn_config_options(
+        self,
+        expected: dict[str, object],
+        monkeypatch: pytest.MonkeyPatch,
+        options_json: str | None,
+    ) -> None:
+        """Assert that Uvicorn options are loaded from `UVICORN_CONFIG_OPTIONS`."""
+        if options_json is None:
+            monkeypatch.delenv("UVICORN_CONFIG_OPTIONS", raising=False)
+        else:
+            monkeypatch.setenv("UVICORN_CONFIG_OPTIONS", options_json)
+        assert uvicorn_conf.get_uvicorn_config_options() == expected
+
+    @pytest.mark.parametrize(
+        "options_json,exception,match",
+        (
+            ("[]", TypeError, "must be a JSON object"),
+            ('{"max_connections": 10}', ValueError, "Invalid Uvicorn option"),
+            ('{"access_log": "false"}', TypeError, "expected bool"),
+            ('{"limit_concurrency": true}', TypeError, "expected int | None"),
+            ('{"ws_max_size": 1.5}', TypeError, "expected int"),
+        ),
+    )
+    def test_get_uvicorn_config_options_incorrect(
+        self,
+        exception: type[Exception],
+        match: str,
+        monkeypatch: pytest.MonkeyPatch,
+        options_json: str,
+    ) -> None:
+        """Assert that invalid options in `UVICORN_CONFIG_OPTIONS` raise errors."""
+        monkeypatch.setenv("UVICORN_CONFIG_OPTIONS", options_json)
+        with pytest.raises(exception, match=match):
+            _ = uvicorn_conf.get_uvicorn_config_options()
+
 
 class TestStartServer:
     """Start Uvicorn and Gunicorn servers using the method in `start.py`.
@@ -335,6 +559,7 @@ class TestStartServer:
         logger = mocker.patch.object(logging, "root", autospec=True)
         run = mocker.patch("inboard.start.uvicorn.run", autospec=True)
         monkeypatch.setenv("PROCESS_MANAGER", "uvicorn")
+        monkeypatch.setenv("WEB_CONCURRENCY", "1")
         start.start_server(
             str(os.getenv("PROCESS_MANAGER")),
             app_module=app_module,
@@ -353,6 +578,7 @@ class TestStartServer:
             reload_dirs=None,
             reload_excludes=None,
             reload_includes=None,
+            workers=1,
         )
 
     @pytest.mark.parametrize(
@@ -407,6 +633,190 @@ class TestStartServer:
             reload_excludes=None,
         )
 
+    @pytest.mark.parametrize("option", ("app_dir", "uds"))
+    @pytest.mark.timeout(2)
+    def test_start_server_uvicorn_workers(
+        self,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        option: str,
+        tmp_path: Path,
+    ) -> None:
+        """Test `start.start_server` with multiple Uvicorn worker processes."""
+        logger = mocker.patch.object(logging, "root", autospec=True)
+        run = mocker.patch.object(uvicorn_conf.UvicornSupervisor, "run", autospec=True)
+        monkeypatch.setattr(sys, "path", [*sys.path])
+        value = str(tmp_path / "uvicorn.sock") if option == "uds" else str(tmp_path)
+        monkeypatch.setenv("HOST", "127.0.0.1")
+        monkeypatch.setenv("PORT", "0")
+        monkeypatch.setenv("UVICORN_CONFIG_OPTIONS", json.dumps({option: value}))
+        monkeypatch.setenv("WEB_CONCURRENCY", "2")
+        start.start_server(
+            "uvicorn", app_module="inboard.app.main_base:app", logger=logger
+        )
+        logger.debug.assert_called_with("Running 2 Uvicorn worker processes.")
+        run.assert_called_once()
+        supervisor = cast("uvicorn_conf.UvicornSupervisor", run.call_args.args[0])
+        assert supervisor.config.workers == 2
+        assert len(supervisor.sockets) == 1
+        if option == "uds":
+            assert not (tmp_path / "uvicorn.sock").exists()
+        else:
+            assert sys.path[0] == value
+
+    @pytest.mark.timeout(2)
+    def test_start_server_uvicorn_workers_unpicklable(
+        self,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """Test that a single Uvicorn process is run if the Uvicorn configuration
+        can't be sent to worker processes, like when the logging configuration file
+        defines its own classes.
+        """
+        path = tmp_path / "custom_logging_conf.py"
+        _ = path.write_text(
+            "import logging\n\n\nclass CustomFilter(logging.Filter):\n    pass\n\n\n"
+            + 'LOGGING_CONFIG = {"version": 1, "disable_existing_loggers": False, '
+            + '"filters": {"custom": {"()": CustomFilter}}}\n'
+        )
+        logger = mocker.patch.object(logging, "root", autospec=True)
+        run = mocker.patch.object(uvicorn.Server, "run", autospec=True)
+        supervisor_run = mocker.patch.object(
+            uvicorn_conf.UvicornSupervisor, "run", autospec=True
+        )
+        monkeypatch.setenv("WEB_CONCURRENCY", "2")
+        start.start_server(
+            "uvicorn",
+            app_module="inboard.app.main_base:app",
+            logger=logger,
+            logging_conf_dict=logging_conf.load_logging_conf(str(path)),
+        )
+        run.assert_called_once()
+        supervisor_run.assert_not_called()
+        warning = cast("str", logger.warning.call_args.args[0])
+        assert warning.startswith(
+            "Running a single Uvicorn process, because the Uvicorn configuration "
+            + "can't be sent to worker processes: PicklingError"
+        )
+
+    @pytest.mark.parametrize("boot_timeout,boot_failures", ((0, 0), (10, 1)))
+    def test_uvicorn_supervisor(
+        self, boot_failures: int, boot_timeout: float, mocker: MockerFixture
+    ) -> None:
+        """Test that the Uvicorn supervisor starts new worker processes in place of
+        worker processes that exit, until it is told to stop, and counts processes
+        that exit within the boot timeout as boot failures.
+        """
+        exited = mocker.Mock(
+            exitcode=1, pid=1001, is_alive=mocker.Mock(return_value=False)
+        )
+        running = mocker.Mock(pid=1002, is_alive=mocker.Mock(return_value=True))
+        replacement = mocker.Mock(pid=1003)
+        get_subprocess = mocker.patch(
+            "inboard.uvicorn_conf.get_subprocess",
+            autospec=True,
+            side_effect=(exited, running, replacement),
+        )
+        _ = mocker.patch(
+            "uvicorn.supervisors.multiprocess.get_subprocess", get_subprocess
+        )
+        _ = mocker.patch("signal.signal", autospec=True)
+        logger = mocker.patch("inboard.uvicorn_conf.logger", autospec=True)
+        config = uvicorn.Config("inboard.app.main_base:app", log_config=None, workers=2)
+        supervisor = uvicorn_conf.UvicornSupervisor(
+            config,
+            target=mocker.Mock(),
+            sockets=[],
+            interval=0,
+            boot_timeout=boot_timeout,
+        )
+        _ = mocker.patch.object(
+            supervisor.should_exit, "wait", side_effect=(False, True)
+        )
+        supervisor.run()
+        assert supervisor.boot_failures == boot_failures
+        assert get_subprocess.call_count == 3
+        assert supervisor.processes == [replacement, running]
+        replacement.start.assert_called_once_with()
+        for process in (exited, running, replacement):
+            process.join.assert_called_with()
+        running.terminate.assert_called_once_with()
+        logger.warning.assert_called_once_with(
+            "Worker process [1001] exited with code 1. Starting a new worker process."
+        )
+
+    def test_uvicorn_supervisor_boot_failures(self, mocker: MockerFixture) -> None:
+        """Test that the Uvicorn supervisor stops restarting worker processes, and
+        exits with the Gunicorn worker boot error code, if worker processes fail to
+        boot repeatedly.
+        """
+        get_subprocess = mocker.patch(
+            "inboard.uvicorn_conf.get_subprocess",
+            autospec=True,
+            side_effect=lambda **_: mocker.Mock(
+                exitcode=1, is_alive=mocker.Mock(return_value=False)
+            ),
+        )
+        _ = mocker.patch(
+            "uvicorn.supervisors.multiprocess.get_subprocess", get_subprocess
+        )
+        _ = mocker.patch("signal.signal", autospec=True)
+        logger = mocker.patch("inboard.uvicorn_conf.logger", autospec=True)
+        config = uvicorn.Config("inboard.app.main_base:app", log_config=None, workers=2)
+        supervisor = uvicorn_conf.UvicornSupervisor(
+            config, target=mocker.Mock(), sockets=[], interval=0, max_boot_failures=3
+        )
+        with pytest.raises(SystemExit) as e:
+            supervisor.run()
+        assert e.value.code == uvicorn_conf.WORKER_BOOT_ERROR
+        assert get_subprocess.call_count == 4
+        assert logger.warning.call_count == 2
+        logger.error.assert_called_once_with(
+            "Worker processes failed to boot 3 times in a row. Stopping."
+        )
+
+    @pytest.mark.subprocess
+    @pytest.mark.timeout(20)
+    def test_start_server_uvicorn_workers_process(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path, unused_tcp_port: int
+    ) -> None:
+        """Test that Uvicorn worker processes share the listening socket, and that a
+        worker process that is killed is replaced.
+        """
+        monkeypatch.setenv("APP_MODULE", "inboard.app.main_base:app")
+        monkeypatch.setenv("PORT", str(unused_tcp_port))
+        monkeypatch.setenv("PROCESS_MANAGER", "uvicorn")
+        monkeypatch.setenv("WEB_CONCURRENCY", "2")
+        log_path = tmp_path / "uvicorn.log"
+        started = "Started server process ["
+        with (
+            log_path.open("w") as log_file,
+            subprocess.Popen(
+                [sys.executable, "-m", "inboard.start"],
+                stderr=subprocess.STDOUT,
+                stdout=log_file,
+            ) as process,
+        ):
+            time.sleep(4)
+            pids = [
+                int(line.split(started)[1].split("]")[0])
+                for line in log_path.read_text().splitlines()
+                if started in line
+            ]
+            os.kill(pids[0], signal.SIGKILL)
+            time.sleep(4)
+            response = httpxyz.get(f"http://127.0.0.1:{unused_tcp_port}/")
+            process.terminate()
+            _ = process.wait(timeout=5)
+        output = log_path.read_text()
+        assert len(pids) == 2
+        assert response.status_code == 200
+        assert process.returncode == 0
+        assert f"Worker process [{pids[0]}] exited with code -9." in output
+        assert output.count(started) == 3
+
     @pytest.mark.parametrize(
         "app_module",
         (
@@ -457,7 +867,8 @@ class TestStartServer:
                 "-c",
                 gunicorn_conf_path,
                 app_module,
-            ]
+            ],
+            env=None,
         )
 
     @pytest.mark.parametrize(
@@ -472,6 +883,7 @@ class TestStartServer:
         "worker_class", ("asgi", "inboard.gunicorn_workers.UvicornWorker")
     )
     @pytest.mark.timeout(2)
+    @pytest.mark.usefixtures("logging_conf_file_path")
     def test_start_server_gunicorn_custom_config(
         self,
         app_module: str,
@@ -481,7 +893,11 @@ class TestStartServer:
         monkeypatch: pytest.MonkeyPatch,
         worker_class: str,
     ) -> None:
-        """Test customized `start.start_server` with Uvicorn managed by Gunicorn."""
+        """Test customized `start.start_server` with Uvicorn managed by Gunicorn.
+
+        The logging configuration loaded from `LOGGING_CONF` is passed to Gunicorn in
+        a snapshot.
+        """
         logger = mocker.patch.object(logging, "root", autospec=True)
         monkeypatch.setenv(
             "GUNICORN_CMD_ARGS",
@@ -512,7 +928,73 @@ class TestStartServer:
                 "-c",
                 str(gunicorn_conf_tmp_file_path),
                 app_module,
-            ]
+            ],
+            env=mocker.ANY,
+        )
+        env: dict[str, str] = run.call_args.kwargs["env"]  # pyright: ignore[reportAny]
+        snapshot = env["LOGGING_CONF_SNAPSHOT"]
+        monkeypatch.setenv("LOGGING_CONF_SNAPSHOT", snapshot)
+        assert logging_conf.load_logging_conf() == logging_conf_dict
+
+    @pytest.mark.timeout(2)
+    def test_start_server_gunicorn_embedded(
+        self,
+        gunicorn_conf_path: str,
+        logging_conf_dict: DictConfig,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """Test `start.start_server` with Gunicorn in the current process."""
+        logger = mocker.patch.object(logging, "root", autospec=True)
+        run = mocker.patch.object(GunicornApplication, "run", autospec=True)
+        subprocess_run = mocker.patch("subprocess.run", autospec=True)
+        monkeypatch.setenv("GUNICORN_CMD_ARGS", f"--worker-tmp-dir {tmp_path}")
+        monkeypatch.setenv("GUNICORN_CONF", gunicorn_conf_path)
+        monkeypatch.setenv("GUNICORN_EMBEDDED", "true")
+        argv = sys.argv.copy()
+        start.start_server(
+            "gunicorn",
+            app_module="inboard.app.main_base:app",
+            logger=logger,
+            logging_conf_dict=logging_conf_dict,
+        )
+        logger.debug.assert_called_once_with("Running Uvicorn with Gunicorn.")
+        subprocess_run.assert_not_called()
+        application = cast("GunicornApplication", run.call_args.args[0])
+        assert application.app_uri == "inboard.app.main_base:app"
+        assert application.cfg.worker_class_str == (
+            "inboard.gunicorn_workers.UvicornWorker"
+        )
+        assert cast("str", application.cfg.worker_tmp_dir) == str(tmp_path)
+        assert sys.argv == argv
+
+    @pytest.mark.subprocess
+    @pytest.mark.timeout(15)
+    def test_start_server_gunicorn_embedded_process(
+        self, monkeypatch: pytest.MonkeyPatch, unused_tcp_port: int
+    ) -> None:
+        """Test that Gunicorn runs in the launcher process, so that signals sent to
+        the launcher reach the Gunicorn arbiter directly.
+        """
+        monkeypatch.setenv("APP_MODULE", "inboard.app.main_base:app")
+        monkeypatch.setenv("GUNICORN_EMBEDDED", "true")
+        monkeypatch.setenv("PORT", str(unused_tcp_port))
+        monkeypatch.setenv("WEB_CONCURRENCY", "1")
+        with subprocess.Popen(
+            [sys.executable, "-m", "inboard.start"],
+            stderr=subprocess.STDOUT,
+            stdout=subprocess.PIPE,
+            text=True,
+        ) as process:
+            time.sleep(3)
+            response = httpxyz.get(f"http://127.0.0.1:{unused_tcp_port}/")
+            process.terminate()
+            output, _ = process.communicate(timeout=5)
+        assert response.status_code == 200
+        assert process.returncode == 0
+        assert f"Listening at: http://0.0.0.0:{unused_tcp_port} ({process.pid})" in (
+            output
         )
 
     @pytest.mark.parametrize(